@@ -0,0 +1,281 @@
+"""
+Accounting of the memory allocated through the shared library.
+
+tracemalloc only sees Python allocations. Accounting wraps the library functions that acquire and release objects
+(TRACKED) and counts every call per kind of object, so the objects and bytes still live can be read at any point,
+per phase. It is off by default: call enable() before creating any object, or set the LBVS_ACCOUNTING environment
+variable before lbvs_lib is imported, which also logs the objects still live when the process exits.
+
+Objects acquired through a tracked call (or built by arena.new_polys) are tracked by address, with the phase and
+the Python caller that acquired them. Their bytes are read when a snapshot is taken: the coefficient buffers of
+the polynomials they hold (8 bytes per allocated coefficient; fmpz values too large to be stored inline are not
+counted), or the length of a string. Tracked objects are kept alive until they are released, so accounting is a
+diagnostic mode. Releases of objects acquired inside the library (e.g. the polynomials of commit_doit or
+vericrypt_doit) are counted as foreign.
+"""
+import atexit
+import contextlib
+import contextvars
+import ctypes
+import os
+import sys
+import threading
+from collections import Counter, defaultdict, deque
+
+from . import hooks
+from .hooks import FunctionHook
+
+ACCOUNTING_ENV = "LBVS_ACCOUNTING"
+
+ACQUIRE = "acquire"
+RELEASE = "release"
+# the object is the return value rather than an argument
+RESULT = -1
+
+# library function: (kind of object, acquire or release, position of the object)
+TRACKED = {
+    "nmod_poly_init": ("nmod_poly", ACQUIRE, 0),
+    "nmod_poly_clear": ("nmod_poly", RELEASE, 0),
+    "fmpz_mod_poly_init": ("fmpz_mod_poly", ACQUIRE, 0),
+    "fmpz_mod_poly_clear": ("fmpz_mod_poly", RELEASE, 0),
+    "fmpz_init": ("fmpz", ACQUIRE, 0),
+    "fmpz_clear": ("fmpz", RELEASE, 0),
+    "flint_randinit": ("flint_rand", ACQUIRE, 0),
+    "flint_randclear": ("flint_rand", RELEASE, 0),
+    "commit_ptr_init": ("commitment_ptr", ACQUIRE, RESULT),
+    "commit_ptr_free": ("commitment_ptr", RELEASE, 0),
+    "commit_keygen": ("commitment_key", ACQUIRE, 0),
+    "commit_keyfree": ("commitment_key", RELEASE, 0),
+    "encrypt_keygen": ("encryption_key", ACQUIRE, 1),
+    "encrypt_keyfree": ("encryption_key", RELEASE, 1),
+    "utils_nmod_poly_to_string": ("string", ACQUIRE, RESULT),
+    "utils_fmpz_mod_poly_to_string": ("string", ACQUIRE, RESULT),
+    "fmpz_get_str": ("string", ACQUIRE, RESULT),
+    "utils_flint_free": ("string", RELEASE, 0),
+}
+
+# kinds whose bytes are those of the polynomials they hold
+POLY_KINDS = ("nmod_poly", "fmpz_mod_poly", "commitment_ptr", "commitment_key", "encryption_key")
+
+_phase = contextvars.ContextVar("lbvs_accounting_phase", default="main")
+_lock = threading.Lock()
+_enabled = False
+_library = None
+
+
+class _Entry:
+    __slots__ = ("kind", "phase", "caller", "obj", "size")
+
+    def __init__(self, kind: str, phase: str, caller: str, obj, size: int):
+        self.kind = kind
+        self.phase = phase
+        self.caller = caller
+        self.obj = obj
+        self.size = size
+
+    @property
+    def bytes(self) -> int:
+        if self.kind not in POLY_KINDS:
+            return self.size
+        from .layouts import polys
+        return sum(poly[0].alloc * 8 for poly, _ in polys(self.obj, type(self.obj)))
+
+
+_live: dict[int, _Entry] = {}
+# per phase and kind: acquired, released, released foreign objects, and lost (re-acquired while live)
+_counts = defaultdict(lambda: defaultdict(Counter))
+# long-running processes take a snapshot per phase, only the latest are kept
+_snapshots = deque(maxlen=1000)
+
+
+def _target(arg):
+    """
+    The ctypes object an argument or result refers to, and its address
+    """
+    if isinstance(arg, int):
+        return None, arg
+    if isinstance(arg, ctypes._Pointer):
+        return arg.contents, ctypes.cast(arg, ctypes.c_void_p).value
+    obj = getattr(arg, "_obj", arg)  # byref
+    return obj, ctypes.addressof(obj)
+
+
+def _caller(depth: int) -> str:
+    frame = sys._getframe(depth)
+    return f"{frame.f_code.co_filename}:{frame.f_lineno} ({frame.f_code.co_name})"
+
+
+def _acquired(kind: str, obj, address: int, size: int, caller: str):
+    phase = _phase.get()
+    with _lock:
+        if address in _live:
+            _counts[phase][kind]["lost"] += 1
+        _live[address] = _Entry(kind, phase, caller, obj, size)
+        _counts[phase][kind]["acquired"] += 1
+
+
+def _released(kind: str, address: int):
+    phase = _phase.get()
+    with _lock:
+        entry = _live.pop(address, None)
+        _counts[phase][kind]["released" if entry is not None else "foreign"] += 1
+
+
+class AccountedCall(FunctionHook):
+    def __init__(self, function, kind: str, action: str, position: int):
+        super().__init__(function)
+        self.kind = kind
+        self.action = action
+        self.position = position
+
+    def __call__(self, *args):
+        if self.action == RELEASE:
+            _, address = _target(args[self.position])
+            _released(self.kind, address)
+            return self.function(*args)
+
+        result = self.function(*args)
+        if self.position == RESULT:
+            if not result:
+                return result
+            if self.kind == "string":
+                obj, address, size = None, result, len(ctypes.string_at(result)) + 1
+            else:
+                obj, address = _target(result)
+                size = 0
+        else:
+            obj, address = _target(args[self.position])
+            size = 0
+        _acquired(self.kind, obj, address, size, _caller(2))
+        return result
+
+
+def acquired(kind: str, obj, depth: int = 0):
+    """
+    Records an object initialized without a tracked call, e.g. a block copied from an initialized template
+    :param depth: the number of frames between the caller to report and the caller of this function
+    """
+    if _enabled:
+        _acquired(kind, obj, ctypes.addressof(obj), 0, _caller(2 + depth))
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def from_env() -> bool:
+    """
+    Whether accounting is requested through the environment, and enabled when lbvs_lib.compile is imported
+    """
+    return bool(os.environ.get(ACCOUNTING_ENV))
+
+
+def enable(shared_library=None):
+    global _enabled, _library
+    if shared_library is None:
+        from .compile import shared_library
+    for name, (kind, action, position) in TRACKED.items():
+        hooks.install(shared_library, name, AccountedCall, kind, action, position)
+    _library = shared_library
+    _enabled = True
+
+
+def disable():
+    """
+    Stops counting. Objects acquired so far stay tracked
+    """
+    global _enabled
+    if _library is not None:
+        for name in TRACKED:
+            hooks.uninstall(_library, name, AccountedCall)
+    _enabled = False
+
+
+def reset():
+    with _lock:
+        _live.clear()
+        _counts.clear()
+        _snapshots.clear()
+
+
+@contextlib.contextmanager
+def phase(name: str):
+    """
+    Attributes the objects acquired and released inside the block to a phase, and takes a snapshot when it ends.
+    Does nothing but set the phase when accounting is disabled
+    """
+    token = _phase.set(name)
+    try:
+        yield
+    finally:
+        _phase.reset(token)
+        if _enabled:
+            _snapshots.append(snapshot(name))
+
+
+def live() -> dict[str, dict[str, int]]:
+    """
+    The objects and bytes still live per kind
+    """
+    with _lock:
+        entries = list(_live.values())
+    totals = defaultdict(Counter)
+    for entry in entries:
+        totals[entry.kind]["objects"] += 1
+        totals[entry.kind]["bytes"] += entry.bytes
+    return {kind: dict(counter) for kind, counter in totals.items()}
+
+
+def snapshot(label: str = None) -> dict:
+    with _lock:
+        counts = {phase_name: {kind: dict(counter) for kind, counter in kinds.items()}
+                  for phase_name, kinds in _counts.items()}
+    return {"label": label, "live": live(), "phases": counts}
+
+
+def snapshots() -> list[dict]:
+    """
+    The snapshots taken at the end of every phase, oldest first
+    """
+    return list(_snapshots)
+
+
+def live_objects() -> list[dict]:
+    """
+    The live objects grouped by kind, phase and caller, largest first
+    """
+    with _lock:
+        entries = list(_live.values())
+    groups = defaultdict(Counter)
+    for entry in entries:
+        group = groups[(entry.kind, entry.phase, entry.caller)]
+        group["objects"] += 1
+        group["bytes"] += entry.bytes
+    rows = [{"kind": kind, "phase": phase_name, "caller": caller, **counter}
+            for (kind, phase_name, caller), counter in groups.items()]
+    return sorted(rows, key=lambda row: (row["bytes"], row["objects"]), reverse=True)
+
+
+def report(limit: int = 20) -> str:
+    lines = ["kind                 objects        bytes"]
+    for kind, totals in sorted(live().items()):
+        lines.append(f"{kind:<20} {totals['objects']:>7} {totals['bytes']:>12}")
+    rows = live_objects()
+    if rows:
+        lines.append("")
+        lines.append("still live, by caller:")
+        for row in rows[:limit]:
+            lines.append(f"{row['objects']:>7} {row['kind']:<16} {row['bytes']:>12} B  "
+                         f"[{row['phase']}] {row['caller']}")
+        if len(rows) > limit:
+            lines.append(f"... {len(rows) - limit} more")
+    return "\n".join(lines)
+
+
+def _exit_report():
+    if _enabled and _live:
+        from .logger import LOGGER
+        LOGGER.warning("Library objects still live at exit:\n" + report())
+
+
+atexit.register(_exit_report)
@@ -0,0 +1,150 @@
+"""
+Preallocated polynomial workspaces.
+
+An initialized empty polynomial holds no memory of its own (nmod_poly_init and fmpz_mod_poly_init only fill in the
+struct), so blocks of them are built by copying the bytes of one initialized template instead of calling the
+library once per polynomial. A PolyArena also keeps the blocks it hands out, with the coefficient buffers they
+grew, and hands them out again after the scope that took them ends.
+"""
+import contextlib
+import math
+import threading
+
+from . import accounting
+from .compile import shared_library, MODP
+from .classes import NMOD_POLY_TYPE, FMPZ_MOD_POLY_T, ctype_shape
+
+_templates = {}
+
+
+def _template(element) -> bytes:
+    if element not in _templates:
+        poly = element()
+        if element is NMOD_POLY_TYPE:
+            shared_library.nmod_poly_init(poly, MODP)
+        # fmpz_mod_poly_init only zeroes the struct, which a new ctypes object already is
+        _templates[element] = bytes(poly)
+    return _templates[element]
+
+
+def new_polys(ctype):
+    """
+    A new polynomial, or nested array of polynomials, every one initialized (nmod polynomials modulo MODP).
+    The caller owns them and clears them as usual
+    """
+    shape, element = ctype_shape(ctype)
+    if element not in (NMOD_POLY_TYPE, FMPZ_MOD_POLY_T):
+        raise TypeError(f"{element.__name__} is not a polynomial type")
+    block = ctype.from_buffer_copy(_template(element) * math.prod(shape))
+    if accounting.is_enabled():
+        kind = "nmod_poly" if element is NMOD_POLY_TYPE else "fmpz_mod_poly"
+        for poly in flat_polys(block, ctype):
+            accounting.acquired(kind, poly, depth=1)
+    return block
+
+
+def flat_polys(obj, ctype):
+    """
+    Yields the polynomials of a polynomial or nested array of polynomials
+    """
+    shape, _ = ctype_shape(ctype)
+    if not shape:
+        yield obj
+        return
+    for i in range(shape[0]):
+        yield from flat_polys(obj[i], ctype._type_)
+
+
+class PolyArena:
+    """
+    A stack of initialized polynomial blocks.
+
+    take hands out blocks, which stay owned by the arena: they are only valid until the scope that took them
+    ends, and must not be cleared by the caller. Blocks are reused by later scopes taking the same types in the
+    same order, so repeated calls (one per ballot) no longer initialize, allocate and clear their workspaces.
+    release clears every block.
+    """
+    def __init__(self, ctx=None):
+        """
+        :param ctx: the context fmpz_mod blocks are in, needed to zero and clear them
+        """
+        self.ctx = ctx
+        self.__blocks = []
+        self.__top = 0
+
+    def take(self, ctype):
+        """
+        Returns a block of ctype whose polynomials are initialized and zero
+        """
+        if self.__top < len(self.__blocks):
+            block_type, block = self.__blocks[self.__top]
+            if block_type is ctype:
+                self.__top += 1
+                self.__zero(block, ctype)
+                return block
+            # a different sequence of types than the last time: the remaining blocks cannot be reused
+            self.__clear_from(self.__top)
+        block = new_polys(ctype)
+        self.__blocks.append((ctype, block))
+        self.__top += 1
+        return block
+
+    @contextlib.contextmanager
+    def scope(self):
+        """
+        Blocks taken inside the scope are handed back when it ends
+        """
+        mark = self.__top
+        try:
+            yield self
+        finally:
+            self.__top = mark
+
+    def __zero(self, block, ctype):
+        if ctype_shape(ctype)[1] is NMOD_POLY_TYPE:
+            # nmod coefficients past the length are never read
+            for poly in flat_polys(block, ctype):
+                poly[0].length = 0
+        else:
+            for poly in flat_polys(block, ctype):
+                shared_library.fmpz_mod_poly_zero(poly, self.ctx)
+
+    def __clear_from(self, index: int):
+        for ctype, block in self.__blocks[index:]:
+            if ctype_shape(ctype)[1] is NMOD_POLY_TYPE:
+                for poly in flat_polys(block, ctype):
+                    shared_library.nmod_poly_clear(poly)
+            else:
+                for poly in flat_polys(block, ctype):
+                    shared_library.fmpz_mod_poly_clear(poly, self.ctx)
+        del self.__blocks[index:]
+
+    def release(self):
+        """
+        Clears every block. The arena can still be used afterwards
+        """
+        self.__clear_from(0)
+        self.__top = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+        return False
+
+
+_local = threading.local()
+
+
+def thread_arena() -> PolyArena:
+    """
+    The arena of the calling thread, for the conversions of the scheme algorithms (fmpz_mod blocks are in the
+    plaintext context of vericrypt)
+    """
+    arena = getattr(_local, "arena", None)
+    if arena is None:
+        from . import primitives
+        arena = PolyArena(primitives.vericrypt.context_p)
+        _local.arena = arena
+    return arena
@@ -0,0 +1,105 @@
+import itertools
+import math
+
+from .compile import shared_library, MODP, DEGREE
+from .classes import NMOD_POLY_TYPE
+
+# The valid packed ballots are the product of the combinations of every question, so their number grows
+# exponentially with the questions (e.g. ten 1-of-4 questions give 4 ** 10 ballots). A return code table holds one
+# code per packed ballot, so a layout refuses to enumerate more than this many of them
+MAX_COMBINATIONS = 2 ** 20
+
+
+class BallotLayout:
+    """
+    Packs every question of a ballot into a single plaintext polynomial.
+
+    Question i owns the coefficients [offsets[i], offsets[i] + sizes[i]), one per answer, so one
+    cast, code, count and verify cover the whole ballot. The tally is read back by range.
+    """
+    def __init__(self, sizes: list[int]):
+        self.sizes = list(sizes)
+        self.offsets = []
+        offset = 0
+        for size in self.sizes:
+            if size <= 0:
+                raise ValueError("Every question needs at least one answer")
+            self.offsets.append(offset)
+            offset += size
+        if offset > DEGREE:
+            raise ValueError(f"The ballot needs {offset} coefficients but the plaintext only has {DEGREE}")
+        self.size = offset
+
+    @staticmethod
+    def from_questions(questions: list[dict]) -> "BallotLayout":
+        return BallotLayout([len(question['answers']) for question in questions])
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def question_range(self, question: int) -> range:
+        return range(self.offsets[question], self.offsets[question] + self.sizes[question])
+
+    def to_global(self, question: int, answers) -> tuple:
+        """
+        Maps answer indices of a question to coefficient indices of the packed ballot
+        """
+        offset = self.offsets[question]
+        for answer in answers:
+            if not 0 <= answer < self.sizes[question]:
+                raise ValueError(f"Answer {answer} is out of range for question {question}")
+        return tuple(offset + answer for answer in answers)
+
+    def pack(self, votes, poly: NMOD_POLY_TYPE = None) -> NMOD_POLY_TYPE:
+        """
+        Encodes the answers chosen for every question into one polynomial
+        :param votes: the chosen answer indices of each question
+        :param poly: if not None, an initialized polynomial to overwrite
+        :return: the packed vote
+        """
+        if len(votes) != len(self.sizes):
+            raise ValueError(f"Expected votes for {len(self.sizes)} questions, got {len(votes)}")
+        if poly is None:
+            poly = NMOD_POLY_TYPE()
+            shared_library.nmod_poly_init(poly, MODP)
+        shared_library.nmod_poly_zero(poly)
+        for question, answers in enumerate(votes):
+            for index in self.to_global(question, answers):
+                shared_library.nmod_poly_set_coeff_ui(poly, index, 1)
+        return poly
+
+    def unpack(self, coefficients: list[int]) -> list[list[int]]:
+        """
+        Splits the coefficients of a packed polynomial (e.g. a tally) by question
+        """
+        coefficients = list(coefficients[:self.size])
+        coefficients.extend([0] * (self.size - len(coefficients)))
+        return [coefficients[offset:offset + size] for offset, size in zip(self.offsets, self.sizes)]
+
+    def read_tally(self, poly: NMOD_POLY_TYPE) -> list[list[int]]:
+        """
+        Reads the per-answer counts of every question from a summed polynomial
+        """
+        return self.unpack([shared_library.nmod_poly_get_coeff_ui(poly, i) for i in range(self.size)])
+
+    def check_combinations(self, combinations_per_question, limit: int = MAX_COMBINATIONS) -> int:
+        """
+        The number of valid packed ballots, checked against the limit of a return code table
+        :param combinations_per_question: the valid answer combinations of each question
+        """
+        count = math.prod(len(combinations) for combinations in combinations_per_question)
+        if count > limit:
+            raise ValueError(f"The packed ballot has {count} valid combinations, more than the {limit} a return code "
+                             f"table can hold: cast the questions as separate ballots instead")
+        return count
+
+    def combinations(self, combinations_per_question, limit: int = MAX_COMBINATIONS):
+        """
+        Enumerates the valid packed ballots as coefficient indices
+        :param combinations_per_question: the valid answer combinations of each question
+        :param limit: the most packed ballots to enumerate (see MAX_COMBINATIONS)
+        """
+        self.check_combinations(combinations_per_question, limit)
+        for ballot in itertools.product(*combinations_per_question):
+            yield tuple(index for question, answers in enumerate(ballot)
+                        for index in self.to_global(question, answers))
@@ -0,0 +1,92 @@
+"""
+Builds of the shared library.
+
+Besides the generic shared_lib.so, builds optimized for CPU features can be installed next to the package as
+shared_lib.<variant>.so (e.g. shared_lib.avx2.so, built with -march=x86-64-v3). When lbvs_lib.compile is imported
+it loads the most specific installed build the CPU supports, so one image runs the fastest build on every host.
+The LBVS_SHARED_LIB environment variable overrides the choice, with a variant name or the path of a build.
+"""
+import os
+import platform
+from typing import NamedTuple
+
+LIBRARY_ENV = "LBVS_SHARED_LIB"
+
+GENERIC = "generic"
+
+# variant: the CPU features it needs, most specific first
+VARIANTS = {
+    "avx512": ("avx512f", "avx512dq", "avx512bw", "avx512vl", "avx2", "bmi2", "fma"),
+    "avx2": ("avx2", "bmi2", "fma"),
+    GENERIC: (),
+}
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+
+class Build(NamedTuple):
+    variant: str
+    path: str
+    # why it was selected
+    reason: str
+
+
+def path(variant: str) -> str:
+    if variant == GENERIC:
+        return os.path.join(DIRECTORY, "shared_lib.so")
+    return os.path.join(DIRECTORY, f"shared_lib.{variant}.so")
+
+
+def installed() -> list[str]:
+    """
+    The variants installed next to the package, most specific first
+    """
+    return [variant for variant in VARIANTS if os.path.exists(path(variant))]
+
+
+def cpu_features() -> frozenset[str]:
+    """
+    The features of the CPU, as named in the flags of /proc/cpuinfo. Empty where they cannot be read
+    """
+    if platform.system() == "Darwin":
+        import subprocess
+        try:
+            output = subprocess.run(["sysctl", "-n", "machdep.cpu.features", "machdep.cpu.leaf7_features"],
+                                    capture_output=True, text=True, check=True).stdout
+        except (OSError, subprocess.CalledProcessError):
+            return frozenset()
+        return frozenset(flag.lower().replace(".", "_") for flag in output.split())
+    try:
+        with open("/proc/cpuinfo") as cpuinfo:
+            for line in cpuinfo:
+                # flags on x86, Features on ARM
+                if line.startswith(("flags", "Features")):
+                    return frozenset(line.split(":", 1)[1].split())
+    except OSError:
+        pass
+    return frozenset()
+
+
+def select() -> Build:
+    """
+    The build to load: the one named by LBVS_SHARED_LIB, or the most specific installed build the CPU supports
+    """
+    override = os.environ.get(LIBRARY_ENV)
+    if override:
+        if override in VARIANTS:
+            build = Build(override, path(override), f"set by {LIBRARY_ENV}")
+        else:
+            build = Build(os.path.basename(override), os.path.abspath(override), f"set by {LIBRARY_ENV}")
+        if not os.path.exists(build.path):
+            raise FileNotFoundError(f"{LIBRARY_ENV}={override}: no build at {build.path}")
+        return build
+
+    features = cpu_features()
+    for variant in installed():
+        missing = [feature for feature in VARIANTS[variant] if feature not in features]
+        if not missing:
+            if variant == GENERIC:
+                return Build(variant, path(variant), "no optimized build supported by the CPU")
+            return Build(variant, path(variant), f"CPU supports {', '.join(VARIANTS[variant])}")
+    # nothing installed: let the library loader report the missing generic build
+    return Build(GENERIC, path(GENERIC), "default")
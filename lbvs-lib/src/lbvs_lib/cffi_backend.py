@@ -0,0 +1,326 @@
+"""
+cffi binding of the shared library, an alternative to ctypes selected with LBVS_FFI_BACKEND=cffi (see compile).
+
+CffiLibrary has the interface of the ctypes.CDLL it replaces: functions are attributes, declared by setting their
+argtypes and restype to ctypes types (classes.register_*), and take and return ctypes objects, so callers are
+unchanged. On its first call, each function is bound to a call with its conversions inlined: arrays, structures
+and pointers are passed as their address, as integers, and integers and strings as they are. The arguments ctypes
+converts itself are converted first, as cffi rejects them: ctypes instances such as c_ulong(1) are passed as their
+value, None for a char * as NULL, and objects with an _as_parameter_ (ThreadLocalRand) as what it holds. Functions
+without argtypes, or with a restype cffi cannot return as ctypes does (arrays, structures), are called through
+ctypes.
+
+Calls go through API mode when the _lbvs_cffi extension is built (python -m lbvs_lib.cffi_backend, or make cffi):
+it holds one compiled trampoline per signature of the registered functions, taking the address of the function
+and its arguments, so it does not link against the library. Other calls go through ABI mode, a cffi function
+pointer, which costs about as much as ctypes; structures passed by value (Commitment in sum_prover and lin_prover)
+are then declared to cffi with the layout ctypes gives them.
+"""
+import ctypes
+import hashlib
+import os
+
+import cffi
+
+ffi = cffi.FFI()
+
+try:
+    from ._lbvs_cffi import lib as _trampolines
+except ImportError:
+    _trampolines = None
+
+EXTENSION = "_lbvs_cffi"
+
+# ctypes simple types, by their type code
+_SIMPLE = {
+    'b': "signed char", 'B': "unsigned char", 'c': "char", '?': "_Bool",
+    'h': "short", 'H': "unsigned short", 'i': "int", 'I': "unsigned int",
+    'l': "long", 'L': "unsigned long", 'q': "long long", 'Q': "unsigned long long",
+    'f': "float", 'd': "double", 'g': "long double",
+}
+
+_CArgObject = type(ctypes.byref(ctypes.c_int()))
+
+# ctypes structure: (C type, definition), nested structures first
+_structs = {}
+_declared = set()
+
+
+def _struct(ctype) -> str:
+    """
+    The C type of a ctypes structure or union, with the same layout
+    """
+    if ctype not in _structs:
+        keyword = "union" if issubclass(ctype, ctypes.Union) else "struct"
+        name = f"{keyword} lbvs_{ctype.__name__}"
+        if any(c_type == name for c_type, _ in _structs.values()):
+            name = f"{name}_{len(_structs)}"
+        fields = "".join(f"{_declaration(field[1], f'f{i}')}; " for i, field in enumerate(ctype._fields_))
+        _structs[ctype] = name, f"{name} {{ {fields}}};"
+    return _structs[ctype][0]
+
+
+def _declaration(ctype, name: str) -> str:
+    """
+    The C declaration of a structure field
+    """
+    if issubclass(ctype, ctypes.Array):
+        return _declaration(ctype._type_, f"{name}[{ctype._length_}]")
+    if issubclass(ctype, (ctypes.Structure, ctypes.Union)):
+        return f"{_struct(ctype)} {name}"
+    if issubclass(ctype, (ctypes._Pointer, ctypes.c_void_p, ctypes.c_char_p)) or ctype._type_ not in _SIMPLE:
+        return f"void *{name}"
+    return f"{_SIMPLE[ctype._type_]} {name}"
+
+
+def _declare(ctype) -> str:
+    """
+    Declares a structure to cffi, for ABI mode calls passing it by value
+    """
+    name = _struct(ctype)
+    for struct, (c_type, definition) in _structs.items():
+        if c_type not in _declared:
+            ffi.cdef(definition)
+            if ffi.sizeof(c_type) != ctypes.sizeof(struct):
+                raise TypeError(f"{struct.__name__} has no equivalent cffi layout")
+            _declared.add(c_type)
+    return name
+
+
+def _address(arg) -> int:
+    arg = getattr(arg, "_as_parameter_", arg)
+    if arg is None:
+        return 0
+    if isinstance(arg, int):
+        return arg
+    if isinstance(arg, _CArgObject):
+        # byref, the library never takes an offset
+        return ctypes.addressof(arg._obj)
+    if isinstance(arg, (ctypes._Pointer, ctypes.c_void_p, ctypes.c_char_p)):
+        return ctypes.c_void_p.from_buffer(arg).value or 0
+    return ctypes.addressof(arg)
+
+
+def _addressof(arg) -> int:
+    """
+    The address of an array or structure argument, or of what its _as_parameter_ holds (e.g. ThreadLocalRand)
+    """
+    try:
+        return ctypes.addressof(arg)
+    except TypeError:
+        return _address(arg)
+
+
+def _simple(arg):
+    """
+    The Python value of a simple argument given as a ctypes instance (c_ulong(1)) or through _as_parameter_
+    """
+    arg = getattr(arg, "_as_parameter_", arg)
+    if isinstance(arg, ctypes._SimpleCData):
+        return arg.value
+    return arg
+
+
+def _char_p(arg):
+    """
+    A char * argument: NULL for None, bytes as they are, anything else (c_char_p, string buffers, addresses) by
+    address, so the library writes to the buffer of the caller
+    """
+    arg = getattr(arg, "_as_parameter_", arg)
+    if arg is None:
+        return ffi.NULL
+    if isinstance(arg, bytes):
+        return arg
+    return ffi.cast("char *", _address(arg))
+
+
+def _parameter(ctype):
+    """
+    The C type of a parameter and the expression converting its ctypes argument {}, or None if cffi cannot pass it.
+    Pointers are passed as integers of the same size, which cffi converts faster than pointers
+    """
+    if issubclass(ctype, (ctypes.Structure, ctypes.Union)):
+        return _struct(ctype), "_addressof({})"
+    if issubclass(ctype, ctypes.Array):
+        return "uintptr_t", "_addressof({})"
+    if issubclass(ctype, (ctypes._Pointer, ctypes.c_void_p)):
+        return "uintptr_t", "_address({})"
+    if issubclass(ctype, ctypes.c_char_p):
+        return "char *", "({0} if {0}.__class__ is bytes else _char_p({0}))"
+    if issubclass(ctype, ctypes._SimpleCData) and ctype._type_ in _SIMPLE:
+        # the common case, a Python value, is passed with no call
+        native = {'f': "float", 'd': "float", 'g': "float", 'c': "bytes", '?': "bool"}.get(ctype._type_, "int")
+        return _SIMPLE[ctype._type_], f"({{0}} if {{0}}.__class__ is {native} else _simple({{0}}))"
+    return None
+
+
+def _result(ctype):
+    """
+    The C type of a result and the expression converting it {} to what ctypes returns, or None if cffi cannot
+    return it
+    """
+    if ctype is None:
+        return "void", "{}"
+    if issubclass(ctype, ctypes.c_char_p):
+        return "char *", "(None if {0} == _ffi.NULL else _ffi.string({0}))"
+    if issubclass(ctype, ctypes.c_void_p):
+        return "uintptr_t", "({} or None)"
+    if issubclass(ctype, ctypes._Pointer):
+        return "uintptr_t", "_ctypes.cast({}, _restype)"
+    if issubclass(ctype, ctypes._SimpleCData) and ctype._type_ in _SIMPLE:
+        return _SIMPLE[ctype._type_], "{}"
+    return None
+
+
+def _signature(function):
+    """
+    The C result type, parameter types and conversions of a ctypes function, or None if cffi cannot call it
+    """
+    argtypes = getattr(function, "argtypes", None)
+    result = _result(function.restype)
+    if argtypes is None or result is None:
+        return None
+    parameters = [_parameter(ctype) for ctype in argtypes]
+    if None in parameters:
+        return None
+    return result, parameters
+
+
+def _trampoline_name(restype: str, parameters: list) -> str:
+    key = f"{restype}({', '.join(c_type for c_type, _ in parameters)})"
+    return "lbvs_call_" + hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+_NAMESPACE = {"_ffi": ffi, "_ctypes": ctypes, "_addressof": _addressof, "_address": _address, "_simple": _simple,
+              "_char_p": _char_p}
+
+
+def _bind(function):
+    """
+    The __call__ of a function, with its conversions inlined, or None if it has to be called through ctypes
+    """
+    signature = _signature(function)
+    if signature is None:
+        return None
+    (restype, convert_result), parameters = signature
+    address = ctypes.cast(function, ctypes.c_void_p).value
+    names = [f"a{i}" for i in range(len(parameters))]
+    arguments = [convert.format(name) for (_, convert), name in zip(parameters, names)]
+    trampoline = getattr(_trampolines, _trampoline_name(restype, parameters), None)
+    if trampoline is not None:
+        # API mode: the trampoline takes the address of the function first, and structures by address
+        call = f"_trampoline({', '.join(['_function'] + arguments)})"
+    else:
+        for i, (c_type, _) in enumerate(parameters):
+            if c_type.startswith(("struct ", "union ")):
+                _declare(function.argtypes[i])
+                arguments[i] = f"_ffi.cast('{c_type} *', {arguments[i]})[0]"
+        pointer_type = f"{restype}(*)({', '.join(c_type for c_type, _ in parameters) or 'void'})"
+        trampoline = ffi.cast(pointer_type, address)
+        call = f"_trampoline({', '.join(arguments)})"
+    errcheck = getattr(function, "errcheck", None)
+    body = f"return {convert_result.format('_result')}"
+    if errcheck is not None:
+        body = f"return _errcheck({convert_result.format('_result')}, self, ({''.join(n + ', ' for n in names)}))"
+    if convert_result == "{}" and errcheck is None:
+        source = f"def __call__(self, {', '.join(names)}):\n    return {call}\n"
+    else:
+        source = f"def __call__(self, {', '.join(names)}):\n    _result = {call}\n    {body}\n"
+    namespace = dict(_NAMESPACE, _trampoline=trampoline, _function=address, _restype=function.restype,
+                     _errcheck=errcheck)
+    exec(source, namespace)
+    return namespace["__call__"]
+
+
+class CffiFunction:
+    """
+    A function of the library. argtypes, restype and errcheck are those of the ctypes function of the same symbol,
+    which is called instead whenever cffi cannot make the call.
+
+    The call is bound on the first call after the types are set: the instance moves to a subclass whose __call__
+    converts the arguments as its argtypes say and makes the call, with no lookup in between
+    """
+    def __init__(self, function):
+        object.__setattr__(self, "_ctypes", function)
+
+    def __getattr__(self, name):
+        return getattr(self._ctypes, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._ctypes, name, value)
+        if name in ("argtypes", "restype", "errcheck"):
+            object.__setattr__(self, "__class__", CffiFunction)
+
+    def __call__(self, *args):
+        call = _bind(self._ctypes)
+        if call is None:
+            return self._ctypes(*args)
+        object.__setattr__(self, "__class__", type("BoundCffiFunction", (CffiFunction,), {"__call__": call}))
+        return call(self, *args)
+
+
+class CffiLibrary:
+    """
+    Drop-in replacement of the ctypes.CDLL of the shared library. Functions are looked up once and cached as
+    attributes, so the hooks of hooks.install wrap them as they wrap ctypes functions
+    """
+    def __init__(self, path: str):
+        self._ctypes = ctypes.CDLL(path)
+
+    def __getattr__(self, name):
+        if name.startswith('__') and name.endswith('__'):
+            raise AttributeError(name)
+        function = CffiFunction(getattr(self._ctypes, name))
+        setattr(self, name, function)
+        return function
+
+
+def build(shared_library=None, directory: str = None):
+    """
+    Compiles the _lbvs_cffi extension, with a trampoline for the signature of every registered function
+    :param shared_library: the library whose functions are declared, compile.shared_library with every subsystem
+    registered by default
+    :param directory: where to write the extension, the directory holding the package by default
+    """
+    if shared_library is None:
+        from . import classes
+        from .compile import shared_library
+        classes.register_encryption()
+        classes.register_commitment()
+        classes.register_vericrypt()
+        classes.register_protocols()
+
+    trampolines = {}
+    for name, function in vars(shared_library).items():
+        if name.startswith('_') or not callable(function):
+            continue
+        signature = _signature(function)
+        if signature is not None:
+            (restype, _), parameters = signature
+            trampolines[_trampoline_name(restype, parameters)] = restype, [c_type for c_type, _ in parameters]
+
+    declarations, definitions = [], []
+    for trampoline, (restype, parameters) in sorted(trampolines.items()):
+        # structures are taken by address and passed on by value
+        by_value = [c_type.startswith(("struct ", "union ")) for c_type in parameters]
+        c_parameters = ["uintptr_t function"] + [f"uintptr_t a{i}" if by_value[i] else f"{c_type} a{i}"
+                                                 for i, c_type in enumerate(parameters)]
+        arguments = [f"*({c_type} *) a{i}" if by_value[i] else f"a{i}" for i, c_type in enumerate(parameters)]
+        pointer = f"{restype} (*)({', '.join(parameters) or 'void'})"
+        declaration = f"{restype} {trampoline}({', '.join(c_parameters)})"
+        declarations.append(declaration + ";")
+        definitions.append(f"static {declaration} {{ {'' if restype == 'void' else 'return '}"
+                           f"(({pointer}) function)({', '.join(arguments)}); }}")
+
+    builder = cffi.FFI()
+    builder.cdef("\n".join(declarations))
+    source = ["#include <stddef.h>", "#include <stdint.h>"]
+    source += [definition for _, definition in _structs.values()]
+    source += definitions
+    builder.set_source(f"lbvs_lib.{EXTENSION}", "\n".join(source))
+    directory = directory or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return builder.compile(tmpdir=directory)
+
+
+if __name__ == "__main__":
+    print(build())
@@ -282,268 +282,306 @@ class Commitment(ctypes.Structure):
 
 COMMITMENT_TYPE = Commitment * 1
 
+POLY_TYPES = (NMOD_POLY_TYPE, FMPZ_MOD_POLY_T)
+
+
+def ctype_shape(ctype) -> tuple[tuple[int, ...], type]:
+    """
+    Splits a (possibly nested) ctypes array type into its shape and element type.
+    Polynomial types are arrays of one struct themselves, so they are treated as elements
+    :return: the shape, outermost dimension first, and the element type
+    """
+    shape = []
+    while issubclass(ctype, ctypes.Array) and ctype not in POLY_TYPES:
+        shape.append(ctype._length_)
+        ctype = ctype._type_
+    return tuple(shape), ctype
+
+
 """
 Loading functions
+
+The argument types are registered per subsystem: register_flint runs on import since every module uses FLINT
+and the utilities, the others run when the module wrapping that part of the library is imported.
 """
-# Flint
-shared_library.flint_randinit.argtypes = (FLINT_RAND_T,)
-shared_library.flint_randseed.argtypes = (FLINT_RAND_T, ctypes.c_ulong, ctypes.c_ulong)
-shared_library.flint_randclear.argtypes = (FLINT_RAND_T,)
-
-shared_library.nmod_poly_init.argtypes = (NMOD_POLY_TYPE, ctypes.c_ulong)
-shared_library.nmod_poly_randtest.argtypes = (NMOD_POLY_TYPE, FLINT_RAND_T, ctypes.c_long)
-shared_library.nmod_poly_zero.argtypes = (NMOD_POLY_TYPE,)
-shared_library.nmod_poly_add.argtypes = (NMOD_POLY_TYPE, NMOD_POLY_TYPE, NMOD_POLY_TYPE)
-shared_library.nmod_poly_sub.argtypes = (NMOD_POLY_TYPE, NMOD_POLY_TYPE, NMOD_POLY_TYPE)
-shared_library.nmod_poly_mul.argtypes = (NMOD_POLY_TYPE, NMOD_POLY_TYPE, NMOD_POLY_TYPE)
-shared_library.nmod_poly_mulmod.argtypes = (NMOD_POLY_TYPE, NMOD_POLY_TYPE, NMOD_POLY_TYPE)
-shared_library.nmod_poly_get_coeff_ui.argtypes = (NMOD_POLY_TYPE, ctypes.c_long)
-shared_library.nmod_poly_rem.argtypes = (NMOD_POLY_TYPE, NMOD_POLY_TYPE, NMOD_POLY_TYPE)
-shared_library.nmod_poly_clear.argtypes = (NMOD_POLY_TYPE,)
-shared_library.nmod_poly_set.argtypes = (NMOD_POLY_TYPE, NMOD_POLY_TYPE)
-shared_library.nmod_poly_set_coeff_ui.argtypes = (NMOD_POLY_TYPE, ctypes.c_long, ctypes.c_ulong)
-
-shared_library.fmpz_mod_poly_init.argtypes = (FMPZ_MOD_POLY_T, FMPZ_MOD_CTX_T)
-shared_library.fmpz_mod_poly_randtest.argtypes = (FMPZ_MOD_POLY_T, FLINT_RAND_T, ctypes.c_long, FMPZ_MOD_CTX_T)
-shared_library.fmpz_mod_poly_rem.argtypes = (FMPZ_MOD_POLY_T, FMPZ_MOD_POLY_T, FMPZ_MOD_POLY_T, FMPZ_MOD_CTX_T)
-shared_library.fmpz_mod_poly_equal.argtypes = (FMPZ_MOD_POLY_T, FMPZ_MOD_POLY_T, FMPZ_MOD_CTX_T)
-shared_library.fmpz_mod_poly_equal.restype = ctypes.c_int
-shared_library.fmpz_mod_poly_clear.argtypes = (FMPZ_MOD_POLY_T, FMPZ_MOD_CTX_T)
-shared_library.fmpz_mod_poly_add.argtypes = (FMPZ_MOD_POLY_T, FMPZ_MOD_POLY_T, FMPZ_MOD_POLY_T, FMPZ_MOD_CTX_T)
-shared_library.fmpz_mod_poly_mulmod.argtypes = (FMPZ_MOD_POLY_T, FMPZ_MOD_POLY_T, FMPZ_MOD_POLY_T,
-                                                FMPZ_MOD_POLY_T, FMPZ_MOD_CTX_T)
-
-# Utilities
-shared_library.utils_fmpz_to_nmod.argtypes = (NMOD_POLY_TYPE, FMPZ_MOD_POLY_T)
-shared_library.utils_nmod_to_fmpz.argtypes = (FMPZ_MOD_POLY_T, NMOD_POLY_TYPE)
-shared_library.utils_fmpz_mod_poly_one.argtypes = (FMPZ_MOD_POLY_T, FMPZ_MOD_CTX_T)
-shared_library.utils_nmod_poly_one.argtypes = (NMOD_POLY_TYPE,)
-shared_library.utils_nmod_poly_zero.argtypes = (NMOD_POLY_TYPE,)
-shared_library.utils_print_nmod_poly.argtypes = (NMOD_POLY_TYPE,)
-shared_library.utils_pretty_print_nmod_poly.argtypes = (NMOD_POLY_TYPE,)
-shared_library.utils_print_fmpz_poly.argtypes = (FMPZ_MOD_POLY_T, FMPZ_MOD_CTX_T)
-shared_library.utils_pretty_print_fmpz_poly.argtypes = (FMPZ_MOD_POLY_T, FMPZ_MOD_CTX_T)
-shared_library.utils_nmod_poly_to_string.argtypes = (NMOD_POLY_TYPE,)
-shared_library.utils_nmod_poly_to_string.restype = ctypes.c_char_p
-shared_library.utils_nmod_poly_from_string.argtypes = (NMOD_POLY_TYPE, ctypes.c_char_p)
-shared_library.utils_fmpz_mod_poly_to_string.argtypes = (FMPZ_MOD_POLY_T, FMPZ_MOD_CTX_T)
-shared_library.utils_fmpz_mod_poly_to_string.restype = ctypes.c_char_p
-shared_library.utils_fmpz_mod_poly_from_string.argtypes = (FMPZ_MOD_POLY_T, ctypes.c_char_p)
-
-shared_library.utils_flint_free.argtypes = (ctypes.c_void_p,)
-
-# Encryption scheme
-shared_library.qcrt_poly_rec.argtypes = (ENCRYPTION_SCHEME_TYPE, FMPZ_MOD_POLY_T, QCRT_POLY_TYPE)
-shared_library.encrypt_setup.argtypes = (ENCRYPTION_SCHEME_TYPE,)
-shared_library.encrypt_finish.argtypes = (ENCRYPTION_SCHEME_TYPE,)
-shared_library.encrypt_keygen.argtypes = (ENCRYPTION_SCHEME_TYPE, ctypes.POINTER(PublicKey),
-                                          ctypes.POINTER(PrivateKey), FLINT_RAND_T)
-shared_library.encrypt_keyfree.argtypes = (ENCRYPTION_SCHEME_TYPE, ctypes.POINTER(PublicKey),
-                                           ctypes.POINTER(PrivateKey))
-shared_library.encrypt_doit.argtypes = (ENCRYPTION_SCHEME_TYPE, ctypes.POINTER(Ciphertext),
-                                        # Message
-                                        FMPZ_MOD_POLY_T, ctypes.POINTER(PublicKey), FLINT_RAND_T)
-shared_library.encrypt_undo.argtypes = (ENCRYPTION_SCHEME_TYPE,
-                                        # Message        Challenge
-                                        FMPZ_MOD_POLY_T, ctypes.POINTER(FmpzModPoly),
-                                        ctypes.POINTER(Ciphertext), ctypes.POINTER(PrivateKey))
-shared_library.encrypt_undo.restype = ctypes.c_int
-shared_library.encrypt_free.argtypes = (ENCRYPTION_SCHEME_TYPE, ctypes.POINTER(Ciphertext),)
-shared_library.encrypt_sample_short.argtypes = (FMPZ_MOD_POLY_T, FMPZ_MOD_CTX_T)
-shared_library.encrypt_sample_short_crt.argtypes = (ENCRYPTION_SCHEME_TYPE, QCRT_POLY_TYPE, FMPZ_MOD_CTX_T)
-shared_library.encrypt_modulus_ctx.argtypes = (ENCRYPTION_SCHEME_TYPE,)
-shared_library.encrypt_modulus_ctx.restype = FMPZ_MOD_CTX_T
-shared_library.encrypt_poly.argtypes = (ENCRYPTION_SCHEME_TYPE,)
-shared_library.encrypt_poly.restype = FMPZ_MOD_POLY_T
-
-# Commitment scheme
-shared_library.commit_scheme_init.argtypes = (COMMITMENT_SCHEME_TYPE,)
-shared_library.commit_scheme_finish.argtypes = (COMMITMENT_SCHEME_TYPE,)
-shared_library.commit_keygen.argtypes = (ctypes.POINTER(CommitmentKey), FLINT_RAND_T)
-shared_library.commit_keyfree.argtypes = (ctypes.POINTER(CommitmentKey),)
-shared_library.commit_doit.argtypes = (COMMITMENT_SCHEME_TYPE, ctypes.POINTER(Commitment),
-                                       NMOD_POLY_TYPE, ctypes.POINTER(CommitmentKey), PCRT_POLY_TYPE * 3)
-shared_library.commit_open.argtypes = (
-    COMMITMENT_SCHEME_TYPE,
-    # Commitment
-    ctypes.POINTER(Commitment),
-    # Message
-    NMOD_POLY_TYPE,
-    # Key
-    ctypes.POINTER(CommitmentKey),
-    # Randomness
-    PCRT_POLY_TYPE * WIDTH,
-    # Challenge
-    PCRT_POLY_TYPE
-)
-shared_library.commit_open.restype = ctypes.c_int
-shared_library.commit_message_rec.argtypes = (
-    COMMITMENT_SCHEME_TYPE,
-    # Message
-    NMOD_POLY_TYPE,
-    # Commitment
-    ctypes.POINTER(Commitment),
-    # Key
-    ctypes.POINTER(CommitmentKey),
-    # Randomness
-    PCRT_POLY_TYPE * WIDTH
-)
-shared_library.commit_message_rec.restype = ctypes.c_int
-shared_library.commit_sample_rand.argtypes = (NMOD_POLY_TYPE, FLINT_RAND_T, ctypes.c_int)
-shared_library.commit_sample_short_crt.argtypes = (COMMITMENT_SCHEME_TYPE, PCRT_POLY_TYPE,)
-shared_library.commit_sample_chall_crt.argtypes = (COMMITMENT_SCHEME_TYPE, PCRT_POLY_TYPE,)
-shared_library.commit_sample_chall.argtypes = (NMOD_POLY_TYPE,)
-shared_library.commit_irred.argtypes = (COMMITMENT_SCHEME_TYPE, ctypes.c_int)
-shared_library.commit_irred.restype = ctypes.POINTER(NMOD_POLY_TYPE)
-shared_library.commit_free.argtypes = (ctypes.POINTER(Commitment),)
-
-shared_library.commit_ptr_init.argtypes = ()
-shared_library.commit_ptr_init.restype = ctypes.POINTER(Commitment)
-shared_library.commit_ptr_free.argtypes = (ctypes.POINTER(Commitment),)
-
-shared_library.pcrt_poly_conv.argtypes = (COMMITMENT_SCHEME_TYPE, PCRT_POLY_TYPE, NMOD_POLY_TYPE)
-shared_library.pcrt_poly_rec.argtypes = (COMMITMENT_SCHEME_TYPE, NMOD_POLY_TYPE, PCRT_POLY_TYPE)
-
-# Vericrypt
-shared_library.vericrypt_doit.argtypes = (ctypes.POINTER(Veritext), FMPZ_MOD_POLY_T * VECTOR, FMPZ_MOD_POLY_T,
-                                          FMPZ_MOD_POLY_T * VECTOR, ENCRYPTION_SCHEME_TYPE, ctypes.POINTER(PublicKey),
-                                          FLINT_RAND_T)
-shared_library.vericrypt_doit.restype = ctypes.c_int
-shared_library.vericrypt_undo.argtypes = (FMPZ_MOD_POLY_T * VECTOR, FMPZ_MOD_POLY_T, ctypes.POINTER(Veritext),
-                                          FMPZ_MOD_POLY_T * VECTOR, FMPZ_MOD_POLY_T, ENCRYPTION_SCHEME_TYPE,
-                                          ctypes.POINTER(PublicKey), ctypes.POINTER(PrivateKey))
-shared_library.vericrypt_undo.restype = ctypes.c_int
-shared_library.vericrypt_verify.argtypes = (ctypes.POINTER(Veritext), FMPZ_MOD_POLY_T * VECTOR, FMPZ_MOD_POLY_T,
-                                            ENCRYPTION_SCHEME_TYPE, ctypes.POINTER(PublicKey))
-shared_library.vericrypt_verify.restype = ctypes.c_int
-shared_library.vericrypt_cipher_clear.argtypes = (ctypes.POINTER(Veritext), ENCRYPTION_SCHEME_TYPE)
-
-# Shuffle
-shared_library.sum_prover.argtypes = (NMOD_POLY_TYPE * 2 * WIDTH,  # y1
-                                      NMOD_POLY_TYPE * 2 * WIDTH,  # y2
-                                      NMOD_POLY_TYPE * 2 * WIDTH,  # _y1
-                                      NMOD_POLY_TYPE * 2,  # t1
-                                      NMOD_POLY_TYPE * 2,  # t2
-                                      NMOD_POLY_TYPE * 2,  # t3
-                                      NMOD_POLY_TYPE * 2,  # u
-                                      COMMITMENT_SCHEME_TYPE,
-                                      Commitment,  # x1
-                                      Commitment,  # x2
-                                      Commitment,  # x3
-                                      ctypes.POINTER(CommitmentKey),
-                                      NMOD_POLY_TYPE,  # alpha
-                                      NMOD_POLY_TYPE,  # beta
-                                      NMOD_POLY_TYPE * 2 * WIDTH,  # r1
-                                      NMOD_POLY_TYPE * 2 * WIDTH,  # r2
-                                      NMOD_POLY_TYPE * 2 * WIDTH  # r3
-                                      )
-
-shared_library.sum_verifier.argtypes = (NMOD_POLY_TYPE * 2 * WIDTH,  # y1
-                                        NMOD_POLY_TYPE * 2 * WIDTH,  # y2
-                                        NMOD_POLY_TYPE * 2 * WIDTH,  # _y1
-                                        NMOD_POLY_TYPE * 2,  # t1
-                                        NMOD_POLY_TYPE * 2,  # t2
-                                        NMOD_POLY_TYPE * 2,  # t3
-                                        NMOD_POLY_TYPE * 2,  # u
-                                        COMMITMENT_SCHEME_TYPE,
-                                        Commitment,  # x1
-                                        Commitment,  # x2
-                                        Commitment,  # x3
-                                        ctypes.POINTER(CommitmentKey),
-                                        NMOD_POLY_TYPE,  # alpha
-                                        NMOD_POLY_TYPE  # beta
-                                        )
-shared_library.sum_verifier.restype = ctypes.c_int
-
-shared_library.lin_prover.argtypes = (NMOD_POLY_TYPE * 2 * WIDTH,
-                                      NMOD_POLY_TYPE * 2 * WIDTH,
-                                      NMOD_POLY_TYPE * 2,
-                                      NMOD_POLY_TYPE * 2,
-                                      NMOD_POLY_TYPE * 2,
-                                      COMMITMENT_SCHEME_TYPE,
-                                      Commitment,
-                                      Commitment,
-                                      ctypes.POINTER(CommitmentKey),
-                                      NMOD_POLY_TYPE,
-                                      NMOD_POLY_TYPE,
-                                      NMOD_POLY_TYPE * 2 * WIDTH,
-                                      NMOD_POLY_TYPE * 2 * WIDTH,
-                                      ctypes.c_int)
-
-shared_library.lin_verifier.argtypes = (NMOD_POLY_TYPE * 2 * WIDTH,
-                                        NMOD_POLY_TYPE * 2 * WIDTH,
-                                        NMOD_POLY_TYPE * 2,
-                                        NMOD_POLY_TYPE * 2,
-                                        NMOD_POLY_TYPE * 2,
-                                        COMMITMENT_SCHEME_TYPE,
-                                        Commitment,
-                                        Commitment,
-                                        ctypes.POINTER(CommitmentKey),
-                                        NMOD_POLY_TYPE,
-                                        NMOD_POLY_TYPE,
-                                        ctypes.c_int,
-                                        ctypes.c_int)
-
-shared_library.lin_verifier.restype = ctypes.c_int
-
-shared_library.shuffle_prover.argtypes = (ctypes.POINTER(OPENING_TYPE),  # y
-                                          ctypes.POINTER(OPENING_TYPE),  # _y
-                                          ctypes.POINTER(PCRT_POLY_TYPE),  # t
-                                          ctypes.POINTER(PCRT_POLY_TYPE),  # _t
-                                          ctypes.POINTER(PCRT_POLY_TYPE),  # u
-                                          COMMITMENT_SCHEME_TYPE,  # commitment_scheme
-                                          ctypes.POINTER(Commitment),  # d
-                                          ctypes.POINTER(NMOD_POLY_TYPE),  # s
-                                          ctypes.POINTER(ctypes.POINTER(Commitment)),  # com
-                                          ctypes.POINTER(NMOD_POLY_TYPE),  # m
-                                          ctypes.POINTER(NMOD_POLY_TYPE),  # _m
-                                          ctypes.POINTER(OPENING_TYPE),  # r
-                                          NMOD_POLY_TYPE,  # rho
-                                          ctypes.POINTER(CommitmentKey),  # key
-                                          FLINT_RAND_T,  # rng
-                                          ctypes.c_int)  # len
-
-shared_library.shuffle_verifier.argtypes = (ctypes.POINTER(OPENING_TYPE),  # y
-                                            ctypes.POINTER(OPENING_TYPE),  # _y
-                                            ctypes.POINTER(PCRT_POLY_TYPE),  # t
-                                            ctypes.POINTER(PCRT_POLY_TYPE),  # _t
-                                            ctypes.POINTER(PCRT_POLY_TYPE),  # u
-                                            COMMITMENT_SCHEME_TYPE,  # commitment_scheme
-                                            ctypes.POINTER(Commitment),  # d
-                                            ctypes.POINTER(NMOD_POLY_TYPE),  # s
-                                            ctypes.POINTER(ctypes.POINTER(Commitment)),  # com
-                                            ctypes.POINTER(NMOD_POLY_TYPE),  # _m
-                                            NMOD_POLY_TYPE,  # rho
-                                            ctypes.POINTER(CommitmentKey),  # key
-                                            ctypes.c_int)  # len
-shared_library.shuffle_verifier.restype = ctypes.c_int
-
-shared_library.shuffle_run.argtypes = (COMMITMENT_SCHEME_TYPE,  # commitment_scheme
-                                       ctypes.POINTER(ctypes.POINTER(Commitment)),  # com
-                                       ctypes.POINTER(NMOD_POLY_TYPE),  # m
-                                       ctypes.POINTER(NMOD_POLY_TYPE),  # _m
-                                       ctypes.POINTER(OPENING_TYPE),  # r
-                                       ctypes.POINTER(CommitmentKey),  # key
-                                       FLINT_RAND_T,  # rng
-                                       ctypes.c_int)  # len
-shared_library.shuffle_run.restype = ctypes.c_int
-
-shared_library.malloc_opening.argtypes = (ctypes.c_size_t,)
-shared_library.malloc_opening.restype = ctypes.POINTER(OPENING_TYPE)
-
-shared_library.malloc_pcrt_poly.argtypes = (ctypes.c_size_t,)
-shared_library.malloc_pcrt_poly.restype = ctypes.POINTER(PCRT_POLY_TYPE)
-
-shared_library.malloc_poly.argtypes = (ctypes.c_size_t,)
-shared_library.malloc_poly.restype = ctypes.POINTER(NMOD_POLY_TYPE)
-
-shared_library.malloc_commit.argtypes = (ctypes.c_size_t,)
-shared_library.malloc_commit.restype = ctypes.POINTER(Commitment)
-
-shared_library.fmpz_get_ui.argtypes = (FMPZ_T,)
-shared_library.fmpz_get_ui.restype = ctypes.c_ulong
-
-shared_library.fmpz_get_str.argtypes = (ctypes.c_char_p, ctypes.c_int, FMPZ_T)
-shared_library.fmpz_get_str.restype = ctypes.c_char_p
-
-shared_library.fmpz_set_str.argtypes = (FMPZ_T, ctypes.c_char_p, ctypes.c_int)
+
+
+def register_flint():
+    # Flint
+    shared_library.flint_randinit.argtypes = (FLINT_RAND_T,)
+    shared_library.flint_randseed.argtypes = (FLINT_RAND_T, ctypes.c_ulong, ctypes.c_ulong)
+    shared_library.flint_randclear.argtypes = (FLINT_RAND_T,)
+
+    shared_library.nmod_poly_init.argtypes = (NMOD_POLY_TYPE, ctypes.c_ulong)
+    shared_library.nmod_poly_randtest.argtypes = (NMOD_POLY_TYPE, FLINT_RAND_T, ctypes.c_long)
+    shared_library.nmod_poly_zero.argtypes = (NMOD_POLY_TYPE,)
+    shared_library.nmod_poly_add.argtypes = (NMOD_POLY_TYPE, NMOD_POLY_TYPE, NMOD_POLY_TYPE)
+    shared_library.nmod_poly_sub.argtypes = (NMOD_POLY_TYPE, NMOD_POLY_TYPE, NMOD_POLY_TYPE)
+    shared_library.nmod_poly_mul.argtypes = (NMOD_POLY_TYPE, NMOD_POLY_TYPE, NMOD_POLY_TYPE)
+    shared_library.nmod_poly_mulmod.argtypes = (NMOD_POLY_TYPE, NMOD_POLY_TYPE, NMOD_POLY_TYPE)
+    shared_library.nmod_poly_get_coeff_ui.argtypes = (NMOD_POLY_TYPE, ctypes.c_long)
+    shared_library.nmod_poly_get_coeff_ui.restype = ctypes.c_ulong
+    shared_library.nmod_poly_rem.argtypes = (NMOD_POLY_TYPE, NMOD_POLY_TYPE, NMOD_POLY_TYPE)
+    shared_library.nmod_poly_clear.argtypes = (NMOD_POLY_TYPE,)
+    shared_library.nmod_poly_set.argtypes = (NMOD_POLY_TYPE, NMOD_POLY_TYPE)
+    shared_library.nmod_poly_set_coeff_ui.argtypes = (NMOD_POLY_TYPE, ctypes.c_long, ctypes.c_ulong)
+    shared_library.nmod_poly_fit_length.argtypes = (NMOD_POLY_TYPE, ctypes.c_long)
+
+    shared_library.fmpz_mod_poly_init.argtypes = (FMPZ_MOD_POLY_T, FMPZ_MOD_CTX_T)
+    shared_library.fmpz_mod_poly_randtest.argtypes = (FMPZ_MOD_POLY_T, FLINT_RAND_T, ctypes.c_long, FMPZ_MOD_CTX_T)
+    shared_library.fmpz_mod_poly_rem.argtypes = (FMPZ_MOD_POLY_T, FMPZ_MOD_POLY_T, FMPZ_MOD_POLY_T, FMPZ_MOD_CTX_T)
+    shared_library.fmpz_mod_poly_zero.argtypes = (FMPZ_MOD_POLY_T, FMPZ_MOD_CTX_T)
+    shared_library.fmpz_mod_poly_fit_length.argtypes = (FMPZ_MOD_POLY_T, ctypes.c_long, FMPZ_MOD_CTX_T)
+    shared_library.fmpz_mod_poly_equal.argtypes = (FMPZ_MOD_POLY_T, FMPZ_MOD_POLY_T, FMPZ_MOD_CTX_T)
+    shared_library.fmpz_mod_poly_equal.restype = ctypes.c_int
+    shared_library.fmpz_mod_poly_clear.argtypes = (FMPZ_MOD_POLY_T, FMPZ_MOD_CTX_T)
+    shared_library.fmpz_mod_poly_add.argtypes = (FMPZ_MOD_POLY_T, FMPZ_MOD_POLY_T, FMPZ_MOD_POLY_T, FMPZ_MOD_CTX_T)
+    shared_library.fmpz_mod_poly_mulmod.argtypes = (FMPZ_MOD_POLY_T, FMPZ_MOD_POLY_T, FMPZ_MOD_POLY_T,
+                                                    FMPZ_MOD_POLY_T, FMPZ_MOD_CTX_T)
+
+    # Utilities
+    shared_library.utils_fmpz_to_nmod.argtypes = (NMOD_POLY_TYPE, FMPZ_MOD_POLY_T)
+    shared_library.utils_nmod_to_fmpz.argtypes = (FMPZ_MOD_POLY_T, NMOD_POLY_TYPE)
+    shared_library.utils_fmpz_mod_poly_one.argtypes = (FMPZ_MOD_POLY_T, FMPZ_MOD_CTX_T)
+    shared_library.utils_nmod_poly_one.argtypes = (NMOD_POLY_TYPE,)
+    shared_library.utils_nmod_poly_zero.argtypes = (NMOD_POLY_TYPE,)
+    shared_library.utils_print_nmod_poly.argtypes = (NMOD_POLY_TYPE,)
+    shared_library.utils_pretty_print_nmod_poly.argtypes = (NMOD_POLY_TYPE,)
+    shared_library.utils_print_fmpz_poly.argtypes = (FMPZ_MOD_POLY_T, FMPZ_MOD_CTX_T)
+    shared_library.utils_pretty_print_fmpz_poly.argtypes = (FMPZ_MOD_POLY_T, FMPZ_MOD_CTX_T)
+    shared_library.utils_nmod_poly_to_string.argtypes = (NMOD_POLY_TYPE,)
+    # the strings are returned as pointers, not c_char_p, so they can be freed (see utils.take_string)
+    shared_library.utils_nmod_poly_to_string.restype = ctypes.c_void_p
+    shared_library.utils_nmod_poly_from_string.argtypes = (NMOD_POLY_TYPE, ctypes.c_char_p)
+    shared_library.utils_fmpz_mod_poly_to_string.argtypes = (FMPZ_MOD_POLY_T, FMPZ_MOD_CTX_T)
+    shared_library.utils_fmpz_mod_poly_to_string.restype = ctypes.c_void_p
+    shared_library.utils_fmpz_mod_poly_from_string.argtypes = (FMPZ_MOD_POLY_T, ctypes.c_char_p)
+
+    shared_library.utils_flint_free.argtypes = (ctypes.c_void_p,)
+
+    shared_library.fmpz_get_ui.argtypes = (FMPZ_T,)
+    shared_library.fmpz_get_ui.restype = ctypes.c_ulong
+
+    shared_library.fmpz_get_str.argtypes = (ctypes.c_char_p, ctypes.c_int, FMPZ_T)
+    shared_library.fmpz_get_str.restype = ctypes.c_void_p
+
+    shared_library.fmpz_set_str.argtypes = (FMPZ_T, ctypes.c_char_p, ctypes.c_int)
+
+    shared_library.fmpz_bits.argtypes = (FMPZ_T,)
+    shared_library.fmpz_bits.restype = ctypes.c_ulong
+
+
+def register_encryption():
+    shared_library.qcrt_poly_rec.argtypes = (ENCRYPTION_SCHEME_TYPE, FMPZ_MOD_POLY_T, QCRT_POLY_TYPE)
+    shared_library.encrypt_setup.argtypes = (ENCRYPTION_SCHEME_TYPE,)
+    shared_library.encrypt_finish.argtypes = (ENCRYPTION_SCHEME_TYPE,)
+    shared_library.encrypt_keygen.argtypes = (ENCRYPTION_SCHEME_TYPE, ctypes.POINTER(PublicKey),
+                                              ctypes.POINTER(PrivateKey), FLINT_RAND_T)
+    shared_library.encrypt_keyfree.argtypes = (ENCRYPTION_SCHEME_TYPE, ctypes.POINTER(PublicKey),
+                                               ctypes.POINTER(PrivateKey))
+    shared_library.encrypt_doit.argtypes = (ENCRYPTION_SCHEME_TYPE, ctypes.POINTER(Ciphertext),
+                                            # Message
+                                            FMPZ_MOD_POLY_T, ctypes.POINTER(PublicKey), FLINT_RAND_T)
+    shared_library.encrypt_undo.argtypes = (ENCRYPTION_SCHEME_TYPE,
+                                            # Message        Challenge
+                                            FMPZ_MOD_POLY_T, ctypes.POINTER(FmpzModPoly),
+                                            ctypes.POINTER(Ciphertext), ctypes.POINTER(PrivateKey))
+    shared_library.encrypt_undo.restype = ctypes.c_int
+    shared_library.encrypt_free.argtypes = (ENCRYPTION_SCHEME_TYPE, ctypes.POINTER(Ciphertext),)
+    shared_library.encrypt_sample_short.argtypes = (FMPZ_MOD_POLY_T, FMPZ_MOD_CTX_T)
+    shared_library.encrypt_sample_short_crt.argtypes = (ENCRYPTION_SCHEME_TYPE, QCRT_POLY_TYPE, FMPZ_MOD_CTX_T)
+    shared_library.encrypt_modulus_ctx.argtypes = (ENCRYPTION_SCHEME_TYPE,)
+    shared_library.encrypt_modulus_ctx.restype = FMPZ_MOD_CTX_T
+    shared_library.encrypt_poly.argtypes = (ENCRYPTION_SCHEME_TYPE,)
+    shared_library.encrypt_poly.restype = FMPZ_MOD_POLY_T
+
+
+def register_commitment():
+    shared_library.commit_scheme_init.argtypes = (COMMITMENT_SCHEME_TYPE,)
+    shared_library.commit_scheme_finish.argtypes = (COMMITMENT_SCHEME_TYPE,)
+    shared_library.commit_keygen.argtypes = (ctypes.POINTER(CommitmentKey), FLINT_RAND_T)
+    shared_library.commit_keyfree.argtypes = (ctypes.POINTER(CommitmentKey),)
+    shared_library.commit_doit.argtypes = (COMMITMENT_SCHEME_TYPE, ctypes.POINTER(Commitment),
+                                           NMOD_POLY_TYPE, ctypes.POINTER(CommitmentKey), PCRT_POLY_TYPE * 3)
+    shared_library.commit_open.argtypes = (
+        COMMITMENT_SCHEME_TYPE,
+        # Commitment
+        ctypes.POINTER(Commitment),
+        # Message
+        NMOD_POLY_TYPE,
+        # Key
+        ctypes.POINTER(CommitmentKey),
+        # Randomness
+        PCRT_POLY_TYPE * WIDTH,
+        # Challenge
+        PCRT_POLY_TYPE
+    )
+    shared_library.commit_open.restype = ctypes.c_int
+    shared_library.commit_message_rec.argtypes = (
+        COMMITMENT_SCHEME_TYPE,
+        # Message
+        NMOD_POLY_TYPE,
+        # Commitment
+        ctypes.POINTER(Commitment),
+        # Key
+        ctypes.POINTER(CommitmentKey),
+        # Randomness
+        PCRT_POLY_TYPE * WIDTH
+    )
+    shared_library.commit_message_rec.restype = ctypes.c_int
+    shared_library.commit_sample_rand.argtypes = (NMOD_POLY_TYPE, FLINT_RAND_T, ctypes.c_int)
+    shared_library.commit_sample_short_crt.argtypes = (COMMITMENT_SCHEME_TYPE, PCRT_POLY_TYPE,)
+    shared_library.commit_sample_chall_crt.argtypes = (COMMITMENT_SCHEME_TYPE, PCRT_POLY_TYPE,)
+    shared_library.commit_sample_chall.argtypes = (NMOD_POLY_TYPE,)
+    shared_library.commit_irred.argtypes = (COMMITMENT_SCHEME_TYPE, ctypes.c_int)
+    shared_library.commit_irred.restype = ctypes.POINTER(NMOD_POLY_TYPE)
+    shared_library.commit_free.argtypes = (ctypes.POINTER(Commitment),)
+
+    shared_library.commit_ptr_init.argtypes = ()
+    shared_library.commit_ptr_init.restype = ctypes.POINTER(Commitment)
+    shared_library.commit_ptr_free.argtypes = (ctypes.POINTER(Commitment),)
+
+    shared_library.pcrt_poly_conv.argtypes = (COMMITMENT_SCHEME_TYPE, PCRT_POLY_TYPE, NMOD_POLY_TYPE)
+    shared_library.pcrt_poly_rec.argtypes = (COMMITMENT_SCHEME_TYPE, NMOD_POLY_TYPE, PCRT_POLY_TYPE)
+
+
+def register_vericrypt():
+    shared_library.vericrypt_doit.argtypes = (ctypes.POINTER(Veritext), FMPZ_MOD_POLY_T * VECTOR, FMPZ_MOD_POLY_T,
+                                              FMPZ_MOD_POLY_T * VECTOR, ENCRYPTION_SCHEME_TYPE, ctypes.POINTER(PublicKey),
+                                              FLINT_RAND_T)
+    shared_library.vericrypt_doit.restype = ctypes.c_int
+    shared_library.vericrypt_undo.argtypes = (FMPZ_MOD_POLY_T * VECTOR, FMPZ_MOD_POLY_T, ctypes.POINTER(Veritext),
+                                              FMPZ_MOD_POLY_T * VECTOR, FMPZ_MOD_POLY_T, ENCRYPTION_SCHEME_TYPE,
+                                              ctypes.POINTER(PublicKey), ctypes.POINTER(PrivateKey))
+    shared_library.vericrypt_undo.restype = ctypes.c_int
+    shared_library.vericrypt_verify.argtypes = (ctypes.POINTER(Veritext), FMPZ_MOD_POLY_T * VECTOR, FMPZ_MOD_POLY_T,
+                                                ENCRYPTION_SCHEME_TYPE, ctypes.POINTER(PublicKey))
+    shared_library.vericrypt_verify.restype = ctypes.c_int
+    shared_library.vericrypt_cipher_clear.argtypes = (ctypes.POINTER(Veritext), ENCRYPTION_SCHEME_TYPE)
+
+
+def register_protocols():
+    # Sum, linear and shuffle protocols
+    shared_library.sum_prover.argtypes = (NMOD_POLY_TYPE * 2 * WIDTH,  # y1
+                                          NMOD_POLY_TYPE * 2 * WIDTH,  # y2
+                                          NMOD_POLY_TYPE * 2 * WIDTH,  # _y1
+                                          NMOD_POLY_TYPE * 2,  # t1
+                                          NMOD_POLY_TYPE * 2,  # t2
+                                          NMOD_POLY_TYPE * 2,  # t3
+                                          NMOD_POLY_TYPE * 2,  # u
+                                          COMMITMENT_SCHEME_TYPE,
+                                          Commitment,  # x1
+                                          Commitment,  # x2
+                                          Commitment,  # x3
+                                          ctypes.POINTER(CommitmentKey),
+                                          NMOD_POLY_TYPE,  # alpha
+                                          NMOD_POLY_TYPE,  # beta
+                                          NMOD_POLY_TYPE * 2 * WIDTH,  # r1
+                                          NMOD_POLY_TYPE * 2 * WIDTH,  # r2
+                                          NMOD_POLY_TYPE * 2 * WIDTH  # r3
+                                          )
+
+    shared_library.sum_verifier.argtypes = (NMOD_POLY_TYPE * 2 * WIDTH,  # y1
+                                            NMOD_POLY_TYPE * 2 * WIDTH,  # y2
+                                            NMOD_POLY_TYPE * 2 * WIDTH,  # _y1
+                                            NMOD_POLY_TYPE * 2,  # t1
+                                            NMOD_POLY_TYPE * 2,  # t2
+                                            NMOD_POLY_TYPE * 2,  # t3
+                                            NMOD_POLY_TYPE * 2,  # u
+                                            COMMITMENT_SCHEME_TYPE,
+                                            Commitment,  # x1
+                                            Commitment,  # x2
+                                            Commitment,  # x3
+                                            ctypes.POINTER(CommitmentKey),
+                                            NMOD_POLY_TYPE,  # alpha
+                                            NMOD_POLY_TYPE  # beta
+                                            )
+    shared_library.sum_verifier.restype = ctypes.c_int
+
+    shared_library.lin_prover.argtypes = (NMOD_POLY_TYPE * 2 * WIDTH,
+                                          NMOD_POLY_TYPE * 2 * WIDTH,
+                                          NMOD_POLY_TYPE * 2,
+                                          NMOD_POLY_TYPE * 2,
+                                          NMOD_POLY_TYPE * 2,
+                                          COMMITMENT_SCHEME_TYPE,
+                                          Commitment,
+                                          Commitment,
+                                          ctypes.POINTER(CommitmentKey),
+                                          NMOD_POLY_TYPE,
+                                          NMOD_POLY_TYPE,
+                                          NMOD_POLY_TYPE * 2 * WIDTH,
+                                          NMOD_POLY_TYPE * 2 * WIDTH,
+                                          ctypes.c_int)
+
+    shared_library.lin_verifier.argtypes = (NMOD_POLY_TYPE * 2 * WIDTH,
+                                            NMOD_POLY_TYPE * 2 * WIDTH,
+                                            NMOD_POLY_TYPE * 2,
+                                            NMOD_POLY_TYPE * 2,
+                                            NMOD_POLY_TYPE * 2,
+                                            COMMITMENT_SCHEME_TYPE,
+                                            Commitment,
+                                            Commitment,
+                                            ctypes.POINTER(CommitmentKey),
+                                            NMOD_POLY_TYPE,
+                                            NMOD_POLY_TYPE,
+                                            ctypes.c_int,
+                                            ctypes.c_int)
+
+    shared_library.lin_verifier.restype = ctypes.c_int
+
+    shared_library.shuffle_prover.argtypes = (ctypes.POINTER(OPENING_TYPE),  # y
+                                              ctypes.POINTER(OPENING_TYPE),  # _y
+                                              ctypes.POINTER(PCRT_POLY_TYPE),  # t
+                                              ctypes.POINTER(PCRT_POLY_TYPE),  # _t
+                                              ctypes.POINTER(PCRT_POLY_TYPE),  # u
+                                              COMMITMENT_SCHEME_TYPE,  # commitment_scheme
+                                              ctypes.POINTER(Commitment),  # d
+                                              ctypes.POINTER(NMOD_POLY_TYPE),  # s
+                                              ctypes.POINTER(ctypes.POINTER(Commitment)),  # com
+                                              ctypes.POINTER(NMOD_POLY_TYPE),  # m
+                                              ctypes.POINTER(NMOD_POLY_TYPE),  # _m
+                                              ctypes.POINTER(OPENING_TYPE),  # r
+                                              NMOD_POLY_TYPE,  # rho
+                                              ctypes.POINTER(CommitmentKey),  # key
+                                              FLINT_RAND_T,  # rng
+                                              ctypes.c_int)  # len
+
+    shared_library.shuffle_verifier.argtypes = (ctypes.POINTER(OPENING_TYPE),  # y
+                                                ctypes.POINTER(OPENING_TYPE),  # _y
+                                                ctypes.POINTER(PCRT_POLY_TYPE),  # t
+                                                ctypes.POINTER(PCRT_POLY_TYPE),  # _t
+                                                ctypes.POINTER(PCRT_POLY_TYPE),  # u
+                                                COMMITMENT_SCHEME_TYPE,  # commitment_scheme
+                                                ctypes.POINTER(Commitment),  # d
+                                                ctypes.POINTER(NMOD_POLY_TYPE),  # s
+                                                ctypes.POINTER(ctypes.POINTER(Commitment)),  # com
+                                                ctypes.POINTER(NMOD_POLY_TYPE),  # _m
+                                                NMOD_POLY_TYPE,  # rho
+                                                ctypes.POINTER(CommitmentKey),  # key
+                                                ctypes.c_int)  # len
+    shared_library.shuffle_verifier.restype = ctypes.c_int
+
+    shared_library.shuffle_run.argtypes = (COMMITMENT_SCHEME_TYPE,  # commitment_scheme
+                                           ctypes.POINTER(ctypes.POINTER(Commitment)),  # com
+                                           ctypes.POINTER(NMOD_POLY_TYPE),  # m
+                                           ctypes.POINTER(NMOD_POLY_TYPE),  # _m
+                                           ctypes.POINTER(OPENING_TYPE),  # r
+                                           ctypes.POINTER(CommitmentKey),  # key
+                                           FLINT_RAND_T,  # rng
+                                           ctypes.c_int)  # len
+    shared_library.shuffle_run.restype = ctypes.c_int
+
+    shared_library.malloc_opening.argtypes = (ctypes.c_size_t,)
+    shared_library.malloc_opening.restype = ctypes.POINTER(OPENING_TYPE)
+
+    shared_library.malloc_pcrt_poly.argtypes = (ctypes.c_size_t,)
+    shared_library.malloc_pcrt_poly.restype = ctypes.POINTER(PCRT_POLY_TYPE)
+
+    shared_library.malloc_poly.argtypes = (ctypes.c_size_t,)
+    shared_library.malloc_poly.restype = ctypes.POINTER(NMOD_POLY_TYPE)
+
+    shared_library.malloc_commit.argtypes = (ctypes.c_size_t,)
+    shared_library.malloc_commit.restype = ctypes.POINTER(Commitment)
+
+
+register_flint()
@@ -1,40 +1,27 @@
-from .classes import Veritext, PCRT_POLY_TYPE
-from .compile import shared_library, ctypes, WIDTH
-from .primitives import encryption_scheme, commitment_scheme, vericrypt
-from .protocol_sum import ProtocolSum
+from .classes import PCRT_POLY_TYPE
+from .compile import shared_library, WIDTH
+from . import primitives
+from .layouts import VCK, ENCRYPTED_BALLOT, BALLOT_PROOF, clear
 
 
 def clear_keys(code_key, decryption_key, public_key):
     pk_C, pk_V, pk_R = public_key
     _, dk_V = decryption_key
     _, _, dk_R = code_key
-    encryption_scheme.keyfree(pk_R, dk_R)
-    encryption_scheme.keyfree(pk_V, dk_V)
-    commitment_scheme.keyfree(pk_C)
+    primitives.encryption_scheme.keyfree(pk_R, dk_R)
+    primitives.encryption_scheme.keyfree(pk_V, dk_V)
+    primitives.commitment_scheme.keyfree(pk_C)
 
 
 def clear_voter(voter):
     _, vck, _ = voter
-    a, c_a, d_a = vck
-    shared_library.nmod_poly_clear(a)
-    shared_library.commit_free(ctypes.byref(c_a))
-    clear_opening(d_a)
+    clear(vck, VCK)
 
 
 def clear_ev_and_proof(ballot, proof):
-    c, e_cipher, e_c = ballot
-    z, c_r, e_r, sum_proof = proof
-    shared_library.commit_free(ctypes.byref(c))
-    shared_library.commit_free(ctypes.byref(c_r))
-    vericrypt.cipher_clear(Veritext(
-        cipher=e_cipher,
-        c=e_c,
-        r=z[0],
-        e=z[1],
-        e_=z[2],
-        u=z[3]
-    ))
-    ProtocolSum.proof_clear(shared_library, sum_proof)
+    # e_r is part of the proof, the other half of e is split between the ballot (cipher, c) and the proof (z)
+    clear(ballot, ENCRYPTED_BALLOT)
+    clear(proof, BALLOT_PROOF)
 
 
 def clear_opening(opening: PCRT_POLY_TYPE * WIDTH):
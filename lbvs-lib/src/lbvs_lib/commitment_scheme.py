@@ -1,7 +1,10 @@
 from .compile import WIDTH, DEGREE, MODP, ctypes, HEIGHT
-from .classes import FLINT_RAND_T, NMOD_POLY_TYPE, PCRT_POLY_TYPE, CommitmentKey, Commitment, COMMITMENT_SCHEME_TYPE
+from .classes import FLINT_RAND_T, NMOD_POLY_TYPE, PCRT_POLY_TYPE, CommitmentKey, Commitment, COMMITMENT_SCHEME_TYPE, \
+    register_commitment
 from .utils import new_flint_random
 
+register_commitment()
+
 
 class CommitmentScheme:
     def __init__(self, shared_library):
@@ -67,6 +70,20 @@ class CommitmentScheme:
             self.__shared_library.utils_nmod_poly_one(one[i])
         return commitment, (message, r, one)
 
+    def add_message(self, commitment: Commitment, message: NMOD_POLY_TYPE):
+        """
+        Adds a message to a commitment in place, turning Com(m; r) into Com(m + message; r).
+        Only c2 depends on the message, so this is the CRT representation of the message added to c2
+        :param commitment: the commitment to update
+        :param message: the message to add
+        """
+        t = NMOD_POLY_TYPE()
+        self.__shared_library.nmod_poly_init(t, MODP)
+        for i in range(2):
+            self.__shared_library.nmod_poly_rem(t, message, self.scheme[0].irred[i])
+            self.__shared_library.nmod_poly_add(commitment.c2[i], commitment.c2[i], t)
+        self.__shared_library.nmod_poly_clear(t)
+
     def __commit_randomness(self, zero=False) -> PCRT_POLY_TYPE * WIDTH:
         r = (PCRT_POLY_TYPE * WIDTH)()
         for i in range(WIDTH):
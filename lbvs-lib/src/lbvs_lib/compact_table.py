@@ -0,0 +1,168 @@
+"""
+Compact return code tables.
+
+A ReturnCodeTable maps the string of every combination polynomial to its 64-byte code. A CompactTable holds the
+same codes, truncated to code_size bytes, in one byte array indexed by the rank of the combination. Within a
+question, the rank is that of its CombinationSpace (the order of get_all_voting_combinations, computed from the
+combinatorial number system). A table of packed ballots covers several questions, and the index of a ballot is the
+mixed radix number of the ranks of its questions, the first question most significant.
+
+A lookup goes from the answers chosen to an index to a slice, with no dict to load or parse. lookup_encoded reads
+a code straight from the base64 form the phone stores, decoding only the header and the bytes of the code.
+"""
+import base64
+import math
+import struct
+
+from .ballot_layout import BallotLayout
+from .classes import NMOD_POLY_TYPE
+from .compile import shared_library, MODP
+from .utils import CombinationSpace
+
+# the version of the format is in the magic: RCT1 tables ranked the combinations of a size in colexicographic order,
+# RCT2 tables in the order of CombinationSpace, so RCT1 tables are rejected rather than read at the wrong index
+MAGIC = b"RCT2"
+OLD_MAGICS = (b"RCT1",)
+# magic, code size, number of questions
+HEADER = struct.Struct("<4sBB")
+# answers, minimum and maximum of a question
+QUESTION = struct.Struct("<HHH")
+
+CODE_SIZE = 8
+
+
+def _spaces(questions: list[tuple[int, int, int]]) -> list[CombinationSpace]:
+    return [CombinationSpace(*question) for question in questions]
+
+
+def _index(questions: list[tuple[int, int, int]], votes) -> int:
+    if len(votes) != len(questions):
+        raise ValueError(f"Expected votes for {len(questions)} questions, got {len(votes)}")
+    index = 0
+    for space, answers in zip(_spaces(questions), votes):
+        index = index * len(space) + space.rank(answers)
+    return index
+
+
+def _count(questions: list[tuple[int, int, int]]) -> int:
+    return math.prod(len(space) for space in _spaces(questions))
+
+
+def _b64_slice(encoded: str, start: int, end: int) -> bytes:
+    """
+    The bytes [start, end) of base64 data, decoding only the groups of 4 characters holding them
+    """
+    first = start // 3
+    raw = base64.b64decode(encoded[first * 4:-(-end // 3) * 4])
+    return raw[start - first * 3:end - first * 3]
+
+
+def _read_header(data: bytes) -> tuple[list, int, int]:
+    """
+    The questions and code size of a serialized table, and where its codes start
+    """
+    magic, code_size, n_questions = HEADER.unpack_from(data)
+    if magic in OLD_MAGICS:
+        raise ValueError(f"Compact return code table of the old format {magic.decode()}, it must be recomputed")
+    if magic != MAGIC:
+        raise ValueError("Not a compact return code table")
+    questions = [QUESTION.unpack_from(data, HEADER.size + i * QUESTION.size) for i in range(n_questions)]
+    return questions, code_size, HEADER.size + n_questions * QUESTION.size
+
+
+class CompactTable:
+    def __init__(self, questions: list[tuple[int, int, int]], codes: bytes, code_size: int = CODE_SIZE):
+        """
+        :param questions: the (answers, minimum, maximum) of every question the table covers
+        :param codes: the codes of every combination, in the order of their index
+        :param code_size: the size of a code
+        """
+        self.questions = [tuple(question) for question in questions]
+        self.code_size = code_size
+        if len(codes) != len(self) * code_size:
+            raise ValueError(f"Expected {len(self)} codes of {code_size} bytes, got {len(codes)} bytes")
+        self.codes = bytes(codes)
+
+    def __len__(self):
+        return _count(self.questions)
+
+    def index(self, votes) -> int:
+        """
+        The index of a combination
+        :param votes: the answers chosen for every question of the table
+        """
+        return _index(self.questions, votes)
+
+    def unrank(self, index: int) -> list[tuple[int, ...]]:
+        """
+        The answers chosen for every question of the table, from the index of the combination
+        """
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        votes = []
+        for space in reversed(_spaces(self.questions)):
+            index, rank = divmod(index, len(space))
+            votes.append(space.unrank(rank))
+        return list(reversed(votes))
+
+    def lookup(self, votes) -> bytes:
+        index = self.index(votes)
+        return self.codes[index * self.code_size:(index + 1) * self.code_size]
+
+    def to_bytes(self) -> bytes:
+        header = HEADER.pack(MAGIC, self.code_size, len(self.questions))
+        return header + b"".join(QUESTION.pack(*question) for question in self.questions) + self.codes
+
+    @staticmethod
+    def from_bytes(data: bytes) -> "CompactTable":
+        questions, code_size, start = _read_header(data)
+        return CompactTable(questions, data[start:], code_size)
+
+    def encode(self) -> str:
+        return base64.b64encode(self.to_bytes()).decode('utf-8')
+
+    @staticmethod
+    def decode(encoded: str) -> "CompactTable":
+        return CompactTable.from_bytes(base64.b64decode(encoded))
+
+    @staticmethod
+    def lookup_encoded(encoded: str, votes) -> bytes:
+        """
+        The code of a combination in a base64 encoded table, decoding only the header and the code
+        """
+        n_questions = HEADER.unpack(_b64_slice(encoded, 0, HEADER.size))[2]
+        questions, code_size, start = _read_header(_b64_slice(encoded, 0, HEADER.size + n_questions * QUESTION.size))
+        index = _index(questions, votes)
+        return _b64_slice(encoded, start + index * code_size, start + (index + 1) * code_size)
+
+    @staticmethod
+    def compute(key: bytes, questions: list[dict], packed: bool = False, code_size: int = CODE_SIZE,
+                engine: str = None) -> list["CompactTable"]:
+        """
+        The compact tables of a ballot, holding the codes of ReturnCodeTable.compute_table truncated to code_size
+        :param key: the PRF key
+        :param questions: the questions of the ballot
+        :param packed: if True, one table of the packed ballots of every question (see BallotLayout), otherwise one
+        table per question
+        :param engine: the PRF engine of the election (see prf.ENGINES)
+        """
+        from .return_code_table import CombinationEncoder, ReturnCodeTable, _codes, _width
+        specs = [(len(question['answers']), question['min'], question['max']) for question in questions]
+        tables = []
+        for group in ([specs] if packed else [[spec] for spec in specs]):
+            layout = BallotLayout([answers for answers, _, _ in group])
+            # the product of the spaces is in the order of the index
+            combinations = list(layout.combinations(_spaces(group)))
+            width = _width(combinations)
+            if CombinationEncoder(width).matches_library():
+                codes = _codes(key, combinations, width, engine)
+                table_codes = [codes[combination][1] for combination in combinations]
+            else:
+                # the blinding key does not change the codes, and the table keeps the order of the combinations
+                zero = NMOD_POLY_TYPE()
+                shared_library.nmod_poly_init(zero, MODP)
+                table_codes = list(ReturnCodeTable.compute_table_slow(key, zero, combinations=combinations,
+                                                                      engine=engine).values())
+                shared_library.nmod_poly_clear(zero)
+            tables.append(CompactTable(group, b"".join(code[:code_size] for code in table_codes), code_size))
+        return tables
@@ -5,8 +5,36 @@ causing inconsistent c struct mappings
 import ctypes
 import os
 
-file_path = __file__.replace("compile.py", "shared_lib.so")
-shared_library = ctypes.CDLL(file_path)
+from . import builds
+
+# the build of the library optimized for this CPU, see builds
+_build = builds.select()
+file_path = _build.path
+
+if os.environ.get("LBVS_FFI_BACKEND", "ctypes") == "cffi":
+    # same interface as ctypes.CDLL, with cheaper calls, see cffi_backend
+    from .cffi_backend import CffiLibrary
+    shared_library = CffiLibrary(file_path)
+else:
+    shared_library = ctypes.CDLL(file_path)
+
+
+def selected_build() -> builds.Build:
+    """
+    The build of the library loaded: its variant, path and why it was selected
+    """
+    return _build
+
+
+if os.environ.get("LBVS_ACCOUNTING"):
+    # count the objects allocated through the library from the first call on, see accounting
+    from . import accounting
+    accounting.enable(shared_library)
+
+if os.environ.get("LBVS_PROFILE"):
+    # time every call into the library, the report is written to the path on exit, see profiler
+    from . import profiler
+    profiler.enable_from_env(shared_library)
 
 
 
@@ -0,0 +1,77 @@
+from .compile import MODP, WIDTH, shared_library
+from .classes import NMOD_POLY_TYPE
+from . import primitives
+from .utils import b1_to_fmpz
+
+
+class ElectionContext:
+    """
+    The key-dependent values of an election, computed once and shared by every ballot.
+
+    It holds the keys a player has (any of pk, ck and dk), pk_C.B1 converted to the plaintext context (t, used by
+    every verifiable encryption and its verification) and the constant alpha = beta = 1 of the sum proof.
+    cast, code, code_batch, count and verify accept a context in place of their key tuple.
+    Clearing a context frees the precomputed values, not the keys.
+    """
+    def __init__(self, pk: tuple = None, ck: tuple = None, dk: tuple = None):
+        if pk is None and ck is None and dk is None:
+            raise ValueError("An election context needs at least one key")
+        self.pk = pk
+        self.ck = ck
+        self.dk = dk
+        self.pk_C = next(keys[0] for keys in (pk, ck, dk) if keys is not None)
+
+        self.t = b1_to_fmpz(shared_library, self.pk_C.B1, primitives.commitment_scheme.scheme,
+                            primitives.vericrypt.context_p)
+        self.alpha = NMOD_POLY_TYPE()
+        shared_library.nmod_poly_init(self.alpha, MODP)
+        shared_library.utils_nmod_poly_one(self.alpha)
+        self.beta = NMOD_POLY_TYPE()
+        shared_library.nmod_poly_init(self.beta, MODP)
+        shared_library.utils_nmod_poly_one(self.beta)
+        self.cleared = False
+
+    @staticmethod
+    def deserialize(pk=None, ck=None, dk=None) -> "ElectionContext":
+        """
+        Builds a context from keys serialized with serializers2
+        """
+        from .serializers2 import deserialize_pk, deserialize_ck, deserialize_dk
+        return ElectionContext(pk=deserialize_pk(pk) if pk is not None else None,
+                               ck=deserialize_ck(ck) if ck is not None else None,
+                               dk=deserialize_dk(dk) if dk is not None else None)
+
+    @property
+    def code_constants(self) -> tuple:
+        return self.t, self.alpha, self.beta
+
+    def clear(self):
+        if self.cleared:
+            return
+        self.cleared = True
+        for i in range(WIDTH):
+            shared_library.fmpz_mod_poly_clear(self.t[i], primitives.vericrypt.context_p)
+        shared_library.nmod_poly_clear(self.alpha)
+        shared_library.nmod_poly_clear(self.beta)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.clear()
+        return False
+
+
+def unpack(keys, name: str):
+    """
+    Accepts either a key tuple or an ElectionContext
+    :param keys: the key tuple or the context
+    :param name: the key to take from a context ('pk', 'ck' or 'dk')
+    :return: the key tuple and the context (None if a tuple was given)
+    """
+    if isinstance(keys, ElectionContext):
+        key = getattr(keys, name)
+        if key is None:
+            raise ValueError(f"The election context has no {name}")
+        return key, keys
+    return keys, None
@@ -1,8 +1,10 @@
 from .compile import ctypes, shared_library, DEGREE
 from .classes import FLINT_RAND_T, ENCRYPTION_SCHEME_TYPE, PublicKey, PrivateKey, FMPZ_MOD_POLY_T, \
-    Ciphertext
+    Ciphertext, register_encryption
 from .utils import new_flint_random
 
+register_encryption()
+
 
 class EncryptionScheme:
     def __init__(self, shared_library):
@@ -0,0 +1,65 @@
+"""
+Wrappers around functions of the shared library.
+
+Every module calls the library through attribute lookups on compile.shared_library, so a wrapper installed there
+with setattr is seen by every caller. Wrappers forward the ctypes attributes (argtypes, restype, errcheck) to the
+function they wrap, so the registration functions of classes can run before or after a wrapper is installed.
+"""
+FORWARDED = ("argtypes", "restype", "errcheck")
+
+
+class FunctionHook:
+    """
+    Calls the wrapped function, subclasses override __call__
+    """
+    def __init__(self, function):
+        object.__setattr__(self, "function", function)
+
+    def __getattr__(self, name):
+        return getattr(self.function, name)
+
+    def __setattr__(self, name, value):
+        if name in FORWARDED:
+            setattr(self.function, name, value)
+        else:
+            object.__setattr__(self, name, value)
+
+    def __call__(self, *args):
+        return self.function(*args)
+
+
+def install(shared_library, name: str, hook_type, *args) -> bool:
+    """
+    Wraps shared_library.name in hook_type(function, *args), unless a hook of that type is already installed
+    :return: False if the library has no such function
+    """
+    try:
+        function = getattr(shared_library, name)
+    except AttributeError:
+        return False
+    current = function
+    while isinstance(current, FunctionHook):
+        if type(current) is hook_type:
+            return True
+        current = current.function
+    setattr(shared_library, name, hook_type(function, *args))
+    return True
+
+
+def uninstall(shared_library, name: str, hook_type):
+    """
+    Removes the hooks of hook_type from shared_library.name, keeping the others
+    """
+    function = shared_library.__dict__.get(name)
+    if not isinstance(function, FunctionHook):
+        return
+    if type(function) is hook_type:
+        setattr(shared_library, name, function.function)
+        uninstall(shared_library, name, hook_type)
+        return
+    outer = function
+    while isinstance(outer.function, FunctionHook):
+        if type(outer.function) is hook_type:
+            object.__setattr__(outer, "function", outer.function.function)
+        else:
+            outer = outer.function
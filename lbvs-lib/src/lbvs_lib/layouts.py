@@ -0,0 +1,102 @@
+"""
+Layouts of the values the scheme algorithms exchange.
+
+A layout describes a value made of ctypes objects, possibly nested in tuples and lists, so that generic code can
+walk every polynomial in it: parallel packs values following their layout, and clear frees them. Every structure
+of the library only holds polynomials, so clearing all of them frees the whole value.
+"""
+from typing import NamedTuple
+
+from .compile import shared_library, WIDTH, DIM, VECTOR
+from .classes import (NMOD_POLY_TYPE, FMPZ_MOD_POLY_T, PCRT_POLY_TYPE, OPENING_TYPE, Commitment, CommitmentKey,
+                      Ciphertext, PublicKey, PrivateKey, Veritext, ctype_shape)
+from .serializers import CONTEXTS, FIELD_CONTEXTS
+
+
+class Field(NamedTuple):
+    """
+    A ctypes object of a fixed type. Top-level fmpz_mod polynomials are in context ('q' or 'p'), those inside
+    structures in the context given by serializers.FIELD_CONTEXTS
+    """
+    ctype: type
+    context: str = 'q'
+
+
+class Array(NamedTuple):
+    """
+    A ctypes array of element whose length is only known at run time, packed first
+    """
+    element: type
+    context: str = 'q'
+
+
+class Sequence(NamedTuple):
+    """
+    A list of values of one layout, its length packed first
+    """
+    layout: object
+
+
+# a bool, packed as one byte
+FLAG = "flag"
+
+PK = (Field(CommitmentKey), Field(PublicKey), Field(PublicKey))
+CK = (Field(CommitmentKey), Field(PublicKey), Field(PrivateKey))
+DK = (Field(CommitmentKey), Field(PrivateKey))
+KEYS = {'pk': PK, 'ck': CK, 'dk': DK}
+
+VVK = Field(Commitment)
+VCK = (Field(NMOD_POLY_TYPE), Field(Commitment), Field(OPENING_TYPE))
+ENCRYPTED_BALLOT = (Field(Commitment), Field(Ciphertext * VECTOR), Field(FMPZ_MOD_POLY_T, 'p'))
+SUM_PROOF = (Field(NMOD_POLY_TYPE * 2 * WIDTH), Field(NMOD_POLY_TYPE * 2 * WIDTH), Field(NMOD_POLY_TYPE * 2 * WIDTH),
+             Field(PCRT_POLY_TYPE), Field(PCRT_POLY_TYPE), Field(PCRT_POLY_TYPE), Field(PCRT_POLY_TYPE))
+BALLOT_PROOF = ((Field(FMPZ_MOD_POLY_T * 2 * DIM * VECTOR), Field(FMPZ_MOD_POLY_T * 2 * DIM * VECTOR),
+                 Field(FMPZ_MOD_POLY_T * 2 * VECTOR), Field(FMPZ_MOD_POLY_T * VECTOR, 'p')),
+                Field(Commitment), Field(Veritext), SUM_PROOF)
+SHUFFLE_PROOF = (Array(OPENING_TYPE), Array(OPENING_TYPE), Array(PCRT_POLY_TYPE), Array(PCRT_POLY_TYPE),
+                 Array(PCRT_POLY_TYPE), Array(Commitment), Array(NMOD_POLY_TYPE), Field(NMOD_POLY_TYPE))
+RECOVERED_VOTE = (Field(NMOD_POLY_TYPE), Field(OPENING_TYPE))
+
+
+def _elements(obj, shape: tuple):
+    if not shape:
+        yield obj
+        return
+    for i in range(shape[0]):
+        yield from _elements(obj[i], shape[1:])
+
+
+def polys(obj, ctype, context: str = 'q'):
+    """
+    Yields every polynomial of a ctypes object in packing order, with its context (None for nmod polynomials)
+    """
+    shape, element = ctype_shape(ctype)
+    for item in _elements(obj, shape):
+        if element is NMOD_POLY_TYPE:
+            yield item, None
+        elif element is FMPZ_MOD_POLY_T:
+            yield item, context
+        else:
+            for name, field_type in element._fields_:
+                yield from polys(getattr(item, name), field_type, FIELD_CONTEXTS.get((element, name), context))
+
+
+def clear(value, layout):
+    """
+    Frees every polynomial of a value following its layout
+    """
+    if layout is FLAG:
+        return
+    if isinstance(layout, (Field, Array)):
+        ctype = layout.ctype if isinstance(layout, Field) else layout.element * len(value)
+        for poly, poly_context in polys(value, ctype, layout.context):
+            if poly_context is None:
+                shared_library.nmod_poly_clear(poly)
+            else:
+                shared_library.fmpz_mod_poly_clear(poly, CONTEXTS[poly_context]())
+    elif isinstance(layout, Sequence):
+        for item in value:
+            clear(item, layout.layout)
+    else:
+        for item, item_layout in zip(value, layout):
+            clear(item, item_layout)
@@ -0,0 +1,141 @@
+"""
+NumPy views over the coefficient buffers of FLINT polynomials.
+
+as_ndarray and fmpz_as_ndarray alias the polynomial's coefficients without copying. A view is only
+valid until the polynomial is cleared or reallocated (any library call that may grow it), and
+writing to it writes to the polynomial.
+"""
+import numpy as np
+
+from .compile import shared_library, ctypes, MODP
+from .classes import NMOD_POLY_TYPE, FMPZ_MOD_POLY_T, FMPZ_MOD_CTX_T
+
+# FLINT stores fmpz values up to COEFF_MAX inline, larger ones are tagged pointers to mpz structs
+FLINT_BITS = 64
+COEFF_MAX = (1 << (FLINT_BITS - 2)) - 1
+# every residue of a modulus of at most INLINE_BITS bits is stored inline, so fmpz_as_ndarray can view it
+INLINE_BITS = FLINT_BITS - 2
+
+
+def _normalised_length(coeffs: np.ndarray) -> int:
+    non_zero = np.flatnonzero(coeffs)
+    return int(non_zero[-1]) + 1 if non_zero.size else 0
+
+
+def as_ndarray(poly: NMOD_POLY_TYPE) -> np.ndarray:
+    """
+    Zero-copy uint64 view of the coefficients of an nmod polynomial, lowest degree first
+    """
+    length = poly[0].length
+    if length == 0:
+        return np.zeros(0, dtype=np.uint64)
+    return np.ctypeslib.as_array(poly[0].coeffs, shape=(length,))
+
+
+def fill_from_ndarray(poly: NMOD_POLY_TYPE, arr) -> NMOD_POLY_TYPE:
+    """
+    Overwrites an initialized nmod polynomial with the given coefficients (reduced mod MODP)
+    """
+    coeffs = np.ascontiguousarray(np.mod(np.asarray(arr), MODP), dtype=np.uint64)
+    length = _normalised_length(coeffs)
+    shared_library.nmod_poly_fit_length(poly, length)
+    if length:
+        ctypes.memmove(poly[0].coeffs, coeffs.ctypes.data, length * coeffs.itemsize)
+    poly[0].length = length
+    return poly
+
+
+def from_ndarray(arr, polys=None):
+    """
+    Builds nmod polynomials from coefficient arrays, lowest degree first
+    :param arr: a 1-D array for a single polynomial or a 2-D array with one polynomial per row
+    :param polys: if not None, initialized polynomials to overwrite instead of new ones
+    :return: an NMOD_POLY_TYPE, or an array of them for a 2-D input
+    """
+    arr = np.asarray(arr)
+    if arr.ndim == 1:
+        if polys is None:
+            polys = NMOD_POLY_TYPE()
+            shared_library.nmod_poly_init(polys, MODP)
+        return fill_from_ndarray(polys, arr)
+    if arr.ndim != 2:
+        raise ValueError(f"Expected a 1-D or 2-D array, got {arr.ndim} dimensions")
+
+    init = polys is None
+    if init:
+        polys = (NMOD_POLY_TYPE * arr.shape[0])()
+    for i in range(arr.shape[0]):
+        if init:
+            shared_library.nmod_poly_init(polys[i], MODP)
+        fill_from_ndarray(polys[i], arr[i])
+    return polys
+
+
+def to_ndarray(polys, width: int = None) -> np.ndarray:
+    """
+    Copies a sequence of nmod polynomials into a zero padded 2-D uint64 array, one row per polynomial
+    :param polys: the polynomials
+    :param width: the number of coefficients per row, by default the longest polynomial
+    """
+    if width is None:
+        width = max((poly[0].length for poly in polys), default=0)
+    out = np.zeros((len(polys), width), dtype=np.uint64)
+    for i, poly in enumerate(polys):
+        view = as_ndarray(poly)[:width]
+        out[i, :view.size] = view
+    return out
+
+
+def fmpz_as_ndarray(poly: FMPZ_MOD_POLY_T) -> np.ndarray:
+    """
+    Zero-copy int64 view of the coefficients of an fmpz_mod polynomial, lowest degree first.
+    Only possible when every coefficient is stored inline, i.e. fits in COEFF_MAX
+    """
+    length = poly[0].length
+    if length == 0:
+        return np.zeros(0, dtype=np.int64)
+    view = np.ctypeslib.as_array(poly[0].coeffs, shape=(length,))
+    if np.any((view >> (FLINT_BITS - 2)) == 1):
+        raise ValueError("Coefficients do not fit in a machine word")
+    return view
+
+
+def fmpz_fill_from_ndarray(poly: FMPZ_MOD_POLY_T, arr, ctx: FMPZ_MOD_CTX_T) -> FMPZ_MOD_POLY_T:
+    """
+    Overwrites an initialized fmpz_mod polynomial with the given coefficients, which must already be
+    reduced modulo the modulus of ctx
+    """
+    coeffs = np.ascontiguousarray(np.asarray(arr), dtype=np.int64)
+    if coeffs.size and (coeffs.min() < 0 or coeffs.max() > COEFF_MAX):
+        raise ValueError("Coefficients do not fit in a machine word")
+    length = _normalised_length(coeffs)
+    # zeroing demotes any mpz coefficient, so the buffer can be written as inline values
+    shared_library.fmpz_mod_poly_zero(poly, ctx)
+    shared_library.fmpz_mod_poly_fit_length(poly, length, ctx)
+    if length:
+        ctypes.memmove(poly[0].coeffs, coeffs.ctypes.data, length * coeffs.itemsize)
+    poly[0].length = length
+    return poly
+
+
+def fmpz_from_ndarray(arr, ctx: FMPZ_MOD_CTX_T, polys=None):
+    """
+    Builds fmpz_mod polynomials from coefficient arrays, see from_ndarray
+    """
+    arr = np.asarray(arr)
+    if arr.ndim == 1:
+        if polys is None:
+            polys = FMPZ_MOD_POLY_T()
+            shared_library.fmpz_mod_poly_init(polys, ctx)
+        return fmpz_fill_from_ndarray(polys, arr, ctx)
+    if arr.ndim != 2:
+        raise ValueError(f"Expected a 1-D or 2-D array, got {arr.ndim} dimensions")
+
+    init = polys is None
+    if init:
+        polys = (FMPZ_MOD_POLY_T * arr.shape[0])()
+    for i in range(arr.shape[0]):
+        if init:
+            shared_library.fmpz_mod_poly_init(polys[i], ctx)
+        fmpz_fill_from_ndarray(polys[i], arr[i], ctx)
+    return polys
@@ -0,0 +1,47 @@
+"""
+Owning handles for values built by the library.
+
+An Owned handle frees its value, following its layout, exactly once: when close is called, when the with block
+using it exits, or at the latest when the handle is garbage collected. The parts of the value (commitments,
+ciphertexts, polynomials) do not keep the handle alive, so they must not be used once it is gone.
+"""
+import weakref
+
+from .layouts import clear
+
+
+class Owned:
+    def __init__(self, value, layout):
+        self.value = value
+        self.layout = layout
+        self.__finalizer = weakref.finalize(self, clear, value, layout)
+
+    @property
+    def alive(self) -> bool:
+        return self.__finalizer.alive
+
+    def close(self):
+        self.__finalizer()
+        self.value = None
+
+    def detach(self):
+        """
+        Gives the value back to the caller, who clears it by hand from now on
+        """
+        self.__finalizer.detach()
+        value, self.value = self.value, None
+        return value
+
+    def __enter__(self):
+        return self.value
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+
+def own(value, layout, owned: bool = True):
+    """
+    Wraps value in an Owned handle, or returns it unchanged if owned is False
+    """
+    return Owned(value, layout) if owned else value
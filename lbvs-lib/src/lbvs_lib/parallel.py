@@ -0,0 +1,257 @@
+"""
+Process pools over the scheme algorithms.
+
+ctypes structures cannot be pickled, so keys, ballots and results cross process boundaries packed as bytes
+following a layout: every polynomial in turn, as a uint32 byte count followed by its fixed-width coefficients
+(see serializers2.nmod_poly_to_bytes). Each worker loads the library when it imports lbvs_lib, installs the
+election keys once in its initializer, as an ElectionContext, and reseeds its FLINT random state so forked
+workers never share randomness.
+
+The number of workers defaults to the LBVS_WORKERS environment variable, or to the number of CPUs.
+"""
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
+from .compile import shared_library, MODP, VECTOR
+from .classes import NMOD_POLY_TYPE, Commitment, Ciphertext
+from . import primitives, scheme_algorithms
+from .election_context import ElectionContext, unpack as unpack_keys
+from .layouts import (Field, Array, Sequence, FLAG, KEYS, VCK, ENCRYPTED_BALLOT, BALLOT_PROOF, SHUFFLE_PROOF,
+                      RECOVERED_VOTE, polys, clear)
+from .serializers import CONTEXTS
+from .serializers2 import nmod_poly_to_bytes, nmod_poly_from_bytes, fmpz_mod_poly_to_bytes, fmpz_mod_poly_from_bytes
+
+WORKERS_ENV = "LBVS_WORKERS"
+
+LENGTH = struct.Struct('<I')
+
+
+def default_workers() -> int:
+    value = os.environ.get(WORKERS_ENV)
+    return int(value) if value else os.cpu_count() or 1
+
+
+def _pack_ctypes(obj, ctype, context, out: bytearray):
+    for poly, poly_context in polys(obj, ctype, context):
+        if poly_context is None:
+            data = nmod_poly_to_bytes(poly)
+        else:
+            data = fmpz_mod_poly_to_bytes(poly, CONTEXTS[poly_context]())
+        out += LENGTH.pack(len(data))
+        out += data
+
+
+def _pack(value, layout, out: bytearray):
+    if layout is FLAG:
+        out.append(1 if value else 0)
+    elif isinstance(layout, Field):
+        _pack_ctypes(value, layout.ctype, layout.context, out)
+    elif isinstance(layout, Array):
+        out += LENGTH.pack(len(value))
+        _pack_ctypes(value, layout.element * len(value), layout.context, out)
+    elif isinstance(layout, Sequence):
+        out += LENGTH.pack(len(value))
+        for item in value:
+            _pack(item, layout.layout, out)
+    else:
+        for item, item_layout in zip(value, layout):
+            _pack(item, item_layout, out)
+
+
+def pack(value, layout) -> bytes:
+    """
+    Packs a value (a ctypes object, or nested tuples and lists of them) following its layout
+    """
+    out = bytearray()
+    _pack(value, layout, out)
+    return bytes(out)
+
+
+class _Reader:
+    def __init__(self, data):
+        self.data = memoryview(data)
+        self.offset = 0
+
+    def read(self, size: int):
+        chunk = self.data[self.offset:self.offset + size]
+        self.offset += size
+        return chunk
+
+    def read_length(self) -> int:
+        return LENGTH.unpack(self.read(LENGTH.size))[0]
+
+
+def _unpack_ctypes(reader: _Reader, ctype, context):
+    obj = ctype()
+    for poly, poly_context in polys(obj, ctype, context):
+        data = reader.read(reader.read_length())
+        if poly_context is None:
+            shared_library.nmod_poly_init(poly, MODP)
+            nmod_poly_from_bytes(poly, data)
+        else:
+            ctx = CONTEXTS[poly_context]()
+            shared_library.fmpz_mod_poly_init(poly, ctx)
+            fmpz_mod_poly_from_bytes(poly, data, ctx)
+    return obj
+
+
+def _unpack(reader: _Reader, layout):
+    if layout is FLAG:
+        return reader.read(1)[0] == 1
+    if isinstance(layout, Field):
+        return _unpack_ctypes(reader, layout.ctype, layout.context)
+    if isinstance(layout, Array):
+        return _unpack_ctypes(reader, layout.element * reader.read_length(), layout.context)
+    if isinstance(layout, Sequence):
+        return [_unpack(reader, layout.layout) for _ in range(reader.read_length())]
+    return tuple(_unpack(reader, item_layout) for item_layout in layout)
+
+
+def unpack(data, layout):
+    """
+    Rebuilds a packed value, every polynomial initialized and owned by the caller
+    """
+    return _unpack(_Reader(data), layout)
+
+
+def pack_keys(pk=None, ck=None, dk=None) -> dict[str, bytes]:
+    keys = {'pk': pk, 'ck': ck, 'dk': dk}
+    return {name: pack(key, KEYS[name]) for name, key in keys.items() if key is not None}
+
+
+# the keys of a worker process, installed once by _init_worker
+_worker_context: ElectionContext = None
+
+
+def _init_worker(packed_keys: dict[str, bytes]):
+    global _worker_context
+    primitives.reseed()
+    _worker_context = ElectionContext(**{name: unpack(data, KEYS[name]) for name, data in packed_keys.items()})
+
+
+def _run(function, items: list[bytes], packed_keys: dict[str, bytes], workers: int = None) -> list[bytes]:
+    workers = default_workers() if workers is None else workers
+    chunksize = max(1, len(items) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(packed_keys,)) as executor:
+        return list(executor.map(function, items, chunksize=chunksize))
+
+
+def _cast_worker(data: bytes) -> bytes:
+    vck, v = unpack(data, (VCK, Field(NMOD_POLY_TYPE)))
+    ballot = scheme_algorithms.cast(_worker_context, vck, v)
+    result = pack(ballot, (ENCRYPTED_BALLOT, BALLOT_PROOF))
+    clear((vck, v), (VCK, Field(NMOD_POLY_TYPE)))
+    clear(ballot, (ENCRYPTED_BALLOT, BALLOT_PROOF))
+    return result
+
+
+def map_cast(pk, items, workers: int = None) -> list[tuple]:
+    """
+    Runs Cast on a pool of processes
+    :param pk: public key (pk_C, pk_V, pk_R) or an election context holding it
+    :param items: (vck, v) pairs, as taken by cast
+    :return: the (encrypted ballot, ballot proof) of every item, in order
+    """
+    pk, _ = unpack_keys(pk, 'pk')
+    results = _run(_cast_worker, [pack(item, (VCK, Field(NMOD_POLY_TYPE))) for item in items],
+                   pack_keys(pk=pk), workers)
+    return [unpack(result, (ENCRYPTED_BALLOT, BALLOT_PROOF)) for result in results]
+
+
+def _code_worker(data: bytes) -> bytes:
+    layout = (Field(Commitment), ENCRYPTED_BALLOT, BALLOT_PROOF)
+    vvk, ev, ballot_proof = unpack(data, layout)
+    r, verdict = scheme_algorithms.code(_worker_context, _worker_context, vvk, ev, ballot_proof)
+    result = pack((r, verdict), (Field(NMOD_POLY_TYPE), FLAG))
+    shared_library.nmod_poly_clear(r)
+    clear((vvk, ev, ballot_proof), layout)
+    return result
+
+
+def map_code(pk, ck, items, workers: int = None) -> list[tuple]:
+    """
+    Runs Code on a pool of processes
+    :param pk: public key (pk_C, pk_V, pk_R) or an election context holding it
+    :param ck: code key (pk_C, pk_V, dk_R) or an election context holding it
+    :param items: (vvk, ev, ballot_proof) tuples, as taken by code
+    :return: the (precode, verdict) of every item, in order
+    """
+    pk, _ = unpack_keys(pk, 'pk')
+    ck, _ = unpack_keys(ck, 'ck')
+    layout = (Field(Commitment), ENCRYPTED_BALLOT, BALLOT_PROOF)
+    results = _run(_code_worker, [pack(item, layout) for item in items], pack_keys(pk=pk, ck=ck), workers)
+    return [unpack(result, (Field(NMOD_POLY_TYPE), FLAG)) for result in results]
+
+
+def _decrypt_worker(data: bytes) -> bytes:
+    layout = (Field(Commitment), Field(Ciphertext * VECTOR))
+    c, cipher = unpack(data, layout)
+    recovered = scheme_algorithms.recover_vote(_worker_context.dk, c, cipher)
+    result = pack(recovered, RECOVERED_VOTE)
+    clear(recovered, RECOVERED_VOTE)
+    clear((c, cipher), layout)
+    return result
+
+
+def map_decrypt(dk, items, workers: int = None) -> list[tuple]:
+    """
+    Decrypts the openings of ballots and recovers their votes on a pool of processes
+    :param dk: the decryption key (pk_C, dk_V) or an election context holding it
+    :param items: (c, cipher) pairs of the encrypted ballots
+    :return: the (v, d) of every item, in order, as returned by scheme_algorithms.recover_vote
+    """
+    dk, _ = unpack_keys(dk, 'dk')
+    layout = (Field(Commitment), Field(Ciphertext * VECTOR))
+    results = _run(_decrypt_worker, [pack(item, layout) for item in items], pack_keys(dk=dk), workers)
+    return [unpack(result, RECOVERED_VOTE) for result in results]
+
+
+def _count_worker(data: bytes) -> bytes:
+    layout = Sequence(ENCRYPTED_BALLOT)
+    encrypted_ballots = unpack(data, layout)
+    votes, proof = scheme_algorithms.count(_worker_context, encrypted_ballots)
+    result = pack((votes, proof), (Array(NMOD_POLY_TYPE), SHUFFLE_PROOF))
+    clear((votes, proof), (Array(NMOD_POLY_TYPE), SHUFFLE_PROOF))
+    clear(encrypted_ballots, layout)
+    return result
+
+
+def map_count(dk, groups, workers: int = None) -> list[tuple]:
+    """
+    Runs Count on independent groups of ballots (e.g. the shards of a sharded count) on a pool of processes.
+    Every group is shuffled and proved on its own, on commitments owned by its worker
+    :param dk: the decryption key (pk_C, dk_V) or an election context holding it
+    :param groups: lists of encrypted ballots (c, cipher, e_c)
+    :return: the (shuffled votes, proof of shuffle) of every group, in order
+    """
+    dk, _ = unpack_keys(dk, 'dk')
+    results = _run(_count_worker, [pack(group, Sequence(ENCRYPTED_BALLOT)) for group in groups],
+                   pack_keys(dk=dk), workers)
+    return [unpack(result, (Array(NMOD_POLY_TYPE), SHUFFLE_PROOF)) for result in results]
+
+
+def _verify_worker(data: bytes) -> bytes:
+    layout = (Sequence(Field(Commitment)), Array(NMOD_POLY_TYPE), SHUFFLE_PROOF)
+    commitments, votes, proof = unpack(data, layout)
+    encrypted_ballots = [(c, None, None) for c in commitments]
+    # a single shard covering every ballot, so verify shifts its own copies of the commitments by rho
+    result = scheme_algorithms.verify(_worker_context, encrypted_ballots, [votes], [proof],
+                                      shard_size=len(encrypted_ballots))
+    clear((commitments, votes, proof), layout)
+    return pack(result, FLAG)
+
+
+def map_verify(pk, items, workers: int = None) -> list[bool]:
+    """
+    Verifies independent counts (e.g. the shards of a sharded count) on a pool of processes
+    :param pk: public key (pk_C, pk_V, pk_R) or an election context holding it
+    :param items: (encrypted_ballots, shuffled votes, proof of shuffle) tuples, the commitments of the encrypted
+    ballots as cast, i.e. not shifted by rho
+    :return: the verdict of every item, in order
+    """
+    pk, _ = unpack_keys(pk, 'pk')
+    layout = (Sequence(Field(Commitment)), Array(NMOD_POLY_TYPE), SHUFFLE_PROOF)
+    packed = [pack(([c for c, _, _ in encrypted_ballots], votes, proof), layout)
+              for encrypted_ballots, votes, proof in items]
+    return [unpack(result, FLAG) for result in _run(_verify_worker, packed, pack_keys(pk=pk), workers)]
@@ -7,9 +7,13 @@ from .cleanup import clear_ev_and_proof, clear_voter, clear_keys
 from .classes import NMOD_POLY_TYPE, PublicKey, CommitmentKey, Commitment, PCRT_POLY_TYPE
 from .compile import MODP, WIDTH, shared_library
 from .return_code_table import ReturnCodeTable
-from .utils import new_random_question, get_all_voting_combinations, nmod_poly_to_string, ev_equals, pv_equals
-from .primitives import vericrypt
-from .scheme_algorithms import register, setup, code, verify, cast, count
+from .prf import new_engine
+from .ballot_layout import BallotLayout
+from .tally import tally
+from .utils import new_random_question, CombinationSpace, ev_equals, pv_equals
+from . import primitives
+from .scheme_algorithms import (register, setup, code_batch, verify, cast, count, cast_online, precompute_cast,
+                                CastPrecomputation, shard_ranges)
 from .utils import random
 
 from .logger import LOGGER, VERBOSE
@@ -62,12 +66,17 @@ class Voter(Player):
         # self.return_code_tables = []
         self.vck = None
         self.pk = None
+        self.precomputations = []
         self.id = str(uuid.uuid4())
         self.computer = VoterComputer(players)
 
     def cast(self, votes: List[NMOD_POLY_TYPE]):
         # The voter’s computer D runs the casting algorithm Cast
-        self.computer.cast(self.id, self.pk, self.vck, votes)
+        self.computer.cast(self.id, self.pk, self.vck, votes, self.precomputations)
+        # frees the precomputations left over (clear skips the used ones)
+        for precomputation in self.precomputations:
+            precomputation.clear()
+        self.precomputations = []
         tmp = NMOD_POLY_TYPE()
         shared_library.nmod_poly_init(tmp, MODP)
         for i, v in enumerate(votes):
@@ -77,7 +86,8 @@ class Voter(Player):
             """
             Compute on the fly the return codes
             """
-            self.expected_return_code.append(ReturnCodeTable.nmod_prf(self._players["R"].prf_key, tmp))
+            self.expected_return_code.append(ReturnCodeTable.nmod_prf(self._players["R"].prf_key, tmp,
+                                                                      engine=self._players["R"].prf_engine))
             shared_library.nmod_poly_zero(tmp)
         shared_library.nmod_poly_clear(tmp)
 
@@ -95,6 +105,9 @@ class Voter(Player):
 
     def clear(self):
         clear_voter((None, self.vck, None))
+        for precomputation in self.precomputations:
+            precomputation.clear()
+        self.precomputations = []
         self.return_code_tables = None
         self.expected_return_code = None
         self.f = None
@@ -104,8 +117,13 @@ class VoterComputer(Player):
     def cast(self, id: str,
              pk: Tuple[CommitmentKey, PublicKey, PublicKey],
              vck: Tuple[NMOD_POLY_TYPE, Commitment, PCRT_POLY_TYPE * WIDTH],
-             votes: List[NMOD_POLY_TYPE]):
-        ballots = [cast(pk, vck, v) for v in votes]
+             votes: List[NMOD_POLY_TYPE],
+             precomputations: List[CastPrecomputation] = None):
+        # the vote-independent work was done when the voter registered, votes without a precomputation left are
+        # cast in full
+        ballots = [cast_online(pk, vck, v, precomputation)
+                   for v, precomputation in zip(votes, precomputations or [])]
+        ballots += [cast(pk, vck, v) for v in votes[len(ballots):]]
         # sends the encrypted ballot and the ballot proof to the ballot box B
         self.send_params_to_player("B", encrypted_votes=(id, ballots))
 
@@ -114,7 +132,7 @@ class BallotBox(Player):
     def __init__(self, players):
         super().__init__(players)
         self.pk = None
-        self.t = vericrypt.new_t()
+        self.t = primitives.vericrypt.new_t()
 
         self.voters_vvk = {}
         self.encrypted_votes = {}
@@ -149,16 +167,21 @@ class ReturnCodeServer(Player):
         self.ck = None
         self.pk = None
         self.prf_key = None
+        # the PRF engine of the election, prf.DEFAULT_ENGINE if None
+        self.prf_engine: str | None = None
+        self.workers: int | None = None
 
     def code(self, voter_id, ballots):
         # R runs the code algorithm Code to get the precode r
         vvk = self._players["B"].voters_vvk[voter_id]
-        r = []
-        for encrypted_ballot, ballot_proof in ballots:
-            r_, result = code(self.pk, self.ck, vvk, encrypted_ballot, ballot_proof)
+        precodes = []
+        items = [(vvk, encrypted_ballot, ballot_proof) for encrypted_ballot, ballot_proof in ballots]
+        for r_, result in code_batch(self.pk, self.ck, items, workers=self.workers):
             assert result, "Ballot proof is invalid"
-            # It computes the return code r ← PRF_k(r_)
-            r.append(ReturnCodeTable.nmod_prf(self.prf_key, r_))
+            precodes.append(r_)
+        # It computes the return code r ← PRF_k(r_)
+        r = ReturnCodeTable.nmod_prfs(new_engine(self.prf_key, self.prf_engine), precodes)
+        for r_ in precodes:
             shared_library.nmod_poly_clear(r_)
         # and sends r to the voter
         result = self.send_value_for_verification(voter_id, r, "return_code")
@@ -178,6 +201,7 @@ class Auditor(Player):
         self.proof = None
         self.pk = None
         self.ballots = None
+        self.shard_size: int | None = None
 
     def verify_consistence(self):
         # The auditor A verifies consistence of ballots and proofs that it received from B and R
@@ -190,8 +214,9 @@ class Auditor(Player):
             for j in range(len(from_R[i])):
                 ev_R, pv_R = from_R[i][j]
                 ev_B, pv_B = from_B[i][j]
-                assert ev_equals(shared_library, ev_R, ev_B, vericrypt.context), "Encrypted votes are not equal"
-                assert pv_equals(shared_library, pv_R, pv_B, vericrypt.context), "Proofs are not equal"
+                assert ev_equals(shared_library, ev_R, ev_B, primitives.vericrypt.context), \
+                    "Encrypted votes are not equal"
+                assert pv_equals(shared_library, pv_R, pv_B, primitives.vericrypt.context), "Proofs are not equal"
 
     def verify(self):
         encrypted_ballots = [[q[0] for q in v] for v in self.encrypted_votes_from_ballot_box]
@@ -200,7 +225,7 @@ class Auditor(Player):
                               for j in range(len(encrypted_ballots))]
                              for i in range(n_questions)]
         for i in range(len(encrypted_ballots)):
-            if not verify(self.pk, encrypted_ballots[i], self.ballots[i], self.proof[i]):
+            if not verify(self.pk, encrypted_ballots[i], self.ballots[i], self.proof[i], shard_size=self.shard_size):
                 return False
         return True
 
@@ -210,7 +235,11 @@ class Auditor(Player):
             return
         n_questions = len(from_R[0])
         for i in range(n_questions):
-            Shuffle.proof_clear(shared_library, *self.proof[i], len(from_R))
+            if self.shard_size is None:
+                Shuffle.proof_clear(shared_library, *self.proof[i], len(from_R))
+                continue
+            for shard, proof in zip(shard_ranges(len(from_R), self.shard_size), self.proof[i]):
+                Shuffle.proof_clear(shared_library, *proof, len(shard))
         for i in range(len(from_R)):
             for j in range(len(from_R[i])):
                 ev_R, pv_R = from_R[i][j]
@@ -222,6 +251,9 @@ class ShuffleServer(Player):
         super().__init__(players)
         self.dk = None
         self.encrypted_ballots = None
+        self.layout: BallotLayout | None = None
+        self.workers: int | None = None
+        self.shard_size: int | None = None
 
     def count(self):
         n_questions = len(self.encrypted_ballots[0])
@@ -232,41 +264,41 @@ class ShuffleServer(Player):
         ballots_l = []
         proofs_l = []
         for i in range(len(encrypted_ballots)):
-            ballots, proof = count(self.dk, encrypted_ballots[i])
+            ballots, proof = count(self.dk, encrypted_ballots[i], workers=self.workers, shard_size=self.shard_size)
             ballots_l.append(ballots)
             proofs_l.append(proof)
         # which is sent to the auditor A
         self.send_to_player("A", ballots=ballots_l, proof=proofs_l)
 
         election_result = []
-        for i, ballots in enumerate(ballots_l):
-            t0 = NMOD_POLY_TYPE()
-            shared_library.nmod_poly_init(t0, MODP)
-            shared_library.nmod_poly_zero(t0)
-            for ballot in ballots:
-                t1 = NMOD_POLY_TYPE()
-                shared_library.nmod_poly_init(t1, MODP)
-                shared_library.nmod_poly_add(t1, ballot, proofs_l[i][7])
-                shared_library.nmod_poly_add(t0, t0, t1)
-                shared_library.nmod_poly_clear(t1)
-
-            s = nmod_poly_to_string(shared_library, t0)
-            result_as_list = list(map(lambda x: int(x), s.split(" ")[3:]))
-            election_result.append(result_as_list)
-            shared_library.nmod_poly_clear(t0)
+        for ballots, proof in zip(ballots_l, proofs_l):
+            # every shard has its own rho
+            rho = [shard_proof[7] for shard_proof in proof] if self.shard_size is not None else proof[7]
+            # a packed ballot holds every question, read back by range
+            election_result.extend(tally(ballots, rho, self.layout))
         self.send_to_player("B", election_result=election_result)
 
 
 class VotingProtocol:
-    def __init__(self, clear=False):
+    def __init__(self, clear=False, packed=False, count_workers=None, count_shard_size=None, prf_engine=None,
+                 rct_workers=1):
         self.clear = clear
+        # packed ballots hold every question, at most ballot_layout.MAX_COMBINATIONS combinations of answers
+        self.packed = packed
         self.questions = None
-        self.combinations: list[list] | None = None
+        self.layout: BallotLayout | None = None
+        self.combinations: list[CombinationSpace] | None = None
         self.__players = {}
         self.ballot_box: BallotBox = BallotBox(self.__players)
         self.shuffle_server: ShuffleServer = ShuffleServer(self.__players)
+        self.shuffle_server.workers = count_workers
+        self.shuffle_server.shard_size = count_shard_size
         self.return_code_server: ReturnCodeServer = ReturnCodeServer(self.__players)
+        self.return_code_server.prf_engine = prf_engine
+        # processes computing the return code tables, 1 computes them in this process (None: one per CPU)
+        self.rct_workers = rct_workers
         self.auditor: Auditor = Auditor(self.__players)
+        self.auditor.shard_size = count_shard_size
         self.__players["B"] = self.ballot_box
         self.__players["S"] = self.shuffle_server
         self.__players["R"] = self.return_code_server
@@ -275,8 +307,12 @@ class VotingProtocol:
 
     def setup_phase(self, questions: List[dict]):
         self.questions = questions
-        self.combinations = [list(get_all_voting_combinations(question['answers'], question['min'], question["max"]))
-                             for question in questions]
+        self.combinations = [CombinationSpace.from_question(question) for question in questions]
+        # In packed mode every question shares a single ballot
+        self.layout = BallotLayout.from_questions(questions) if self.packed else None
+        if self.layout is not None:
+            # the return code tables hold every packed ballot, refuse a ballot too large for them before the setup
+            self.layout.check_combinations(self.combinations)
 
         # A trusted set of players run the setup algorithm Setup
         pk, dk, ck = setup()
@@ -284,11 +320,16 @@ class VotingProtocol:
         for player in self.__players:
             self.__players[player].receive(pk=pk)
         # The decryption key dk is given to the shuffler S
-        self.__players["S"].receive(dk=dk)
+        self.__players["S"].receive(dk=dk, layout=self.layout)
         # The code key ck is given to the return code generator R
         self.__players["R"].receive(ck=ck)
 
-    def registration_phase(self, voter_size, generate_return_code_tables=False, benchmark=False):
+    @property
+    def ballots_per_voter(self):
+        return 1 if self.layout is not None else len(self.questions)
+
+    def registration_phase(self, voter_size, generate_return_code_tables=False, benchmark=False,
+                           precompute_casts=False):
         voter_reg_t, rtc_gen_t = 0, 0
         # The return code generator chooses key k for PRF
         self.return_code_server.receive(prf_key=ReturnCodeTable.new_key())
@@ -309,22 +350,30 @@ class VotingProtocol:
             self.ballot_box.add_to_params(voters_vvk=(voter.id, vvk))
             # and giving vck to the voter’s computer
             voter.receive(vvk=vvk, vck=vck, f=f, pk=pk)
+            if precompute_casts:
+                # the vote-independent part of every ballot is computed ahead of the casting phase
+                voter.receive(precomputations=[precompute_cast(pk) for _ in range(self.ballots_per_voter)])
             self.__voters.append(voter)
             self.__players[voter.id] = voter
 
-            """
-            It is way too memory consuming to compute the return code tables for a large number of options, so when 
-            testing the whole protocol we skip this step and measure the time separately
-            """
-            rtc_gen_t1 = timeit.default_timer() if benchmark else 0
-            if generate_return_code_tables:
-                # and a set of trusted players compute the return code table. The voter gets the return code table
-                tables = [ReturnCodeTable.compute_table(self.return_code_server.prf_key,
-                                                    vck[0], combinations=combinations)
-                      for combinations in self.combinations]
-                voter.receive(return_code_tables=tables)
-            rtc_gen_t2 = timeit.default_timer() if benchmark else 0
-            rtc_gen_t += rtc_gen_t2 - rtc_gen_t1
+        """
+        It is way too memory consuming to compute the return code tables for a large number of options, so when
+        testing the whole protocol we skip this step and measure the time separately
+        """
+        rtc_gen_t1 = timeit.default_timer() if benchmark else 0
+        if generate_return_code_tables:
+            # and a set of trusted players compute the return code table. The voter gets the return code table.
+            # The tables do not depend on the voter: they are computed once, so rtc_gen_t is the time of one set of
+            # tables rather than one per voter as before, and every voter holds the same (read-only) dicts
+            voters = self.__voters[-voter_size:] if voter_size else []
+            combinations = ([list(self.layout.combinations(self.combinations))] if self.layout is not None
+                            else self.combinations)
+            ReturnCodeTable.compute_shared_tables(self.return_code_server.prf_key, len(voters),
+                                                  combinations=combinations, engine=self.return_code_server.prf_engine,
+                                                  workers=self.rct_workers,
+                                                  sink=lambda i, tables: voters[i].receive(return_code_tables=tables))
+        rtc_gen_t2 = timeit.default_timer() if benchmark else 0
+        rtc_gen_t += rtc_gen_t2 - rtc_gen_t1
         return voter_reg_t, rtc_gen_t
 
 
@@ -335,13 +384,17 @@ class VotingProtocol:
             votes_per_voter = []
             for _ in range(len(self.__voters)):
                 votes = []
-                for comb in self.combinations:
-                    v = NMOD_POLY_TYPE()
-                    shared_library.nmod_poly_init(v, MODP)
-                    # The voter V chooses a random possible vote v
-                    for item in random.choice(comb):
-                        shared_library.nmod_poly_set_coeff_ui(v, item, 1)
-                    votes.append(v)
+                if self.layout is not None:
+                    # The voter V chooses a random possible vote for every question, packed in one ballot
+                    votes.append(self.layout.pack([comb.sample() for comb in self.combinations]))
+                else:
+                    for comb in self.combinations:
+                        v = NMOD_POLY_TYPE()
+                        shared_library.nmod_poly_init(v, MODP)
+                        # The voter V chooses a random possible vote v
+                        for item in comb.sample():
+                            shared_library.nmod_poly_set_coeff_ui(v, item, 1)
+                        votes.append(v)
                 votes_per_voter.append(votes)
         self.combinations = None
 
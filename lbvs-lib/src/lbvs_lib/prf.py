@@ -0,0 +1,152 @@
+"""
+PRF engines of the return codes.
+
+An engine holds the PRF keyed once: the inner and outer states of HMAC, or the keyed state of BLAKE2b, are
+computed when the engine is created and copied for every message, and digest_many runs a batch of messages with
+no lookup in between. It also fixes how a polynomial is encoded into the message:
+- "string": the nmod_poly_to_string of the library, "<length> <modulus>  c_0 c_1 ...", as the return codes have
+  always been computed
+- "compact": the length then every coefficient, as little-endian 32-bit integers (every coefficient is below
+  MODP < 2 ** 32), read straight from the coefficients of the polynomial
+
+The engine of an election is chosen by name (ENGINES). The default, hmac-sha512, gives the codes of
+ReturnCodeTable.prf; engines with the compact encoding give other codes, so the return code server and the tables
+of an election must use the same engine.
+"""
+import hashlib
+import hmac
+import struct
+
+from .compile import MODP, shared_library
+from .classes import NMOD_POLY_TYPE
+from .utils import nmod_poly_to_string
+from .npview import as_ndarray
+
+LENGTH = struct.Struct("<I")
+
+
+class StringEncoder:
+    """
+    The string encoding of the polynomials of combinations, whose coefficients are 0 or 1: "<length> <modulus> "
+    followed by " <coefficient>" for every coefficient below the length.
+
+    The coefficients are kept in a buffer updated by flipping the ones that differ from the previous combination,
+    so a walk in revolving door order rewrites two bytes per combination instead of rendering the polynomial
+    """
+    def __init__(self, width: int):
+        self.width = width
+        self.headers = [f"{length} {MODP} ".encode('ascii') for length in range(width + 1)]
+        self.body = bytearray(b" 0" * width)
+        self.current = set()
+
+    def encode(self, combination) -> bytes:
+        combination = set(combination)
+        for index in self.current ^ combination:
+            # b"0" <-> b"1"
+            self.body[2 * index + 1] ^= 1
+        self.current = combination
+        length = max(combination) + 1 if combination else 0
+        return self.headers[length] + self.body[:2 * length]
+
+
+class CompactEncoder:
+    """
+    The compact encoding of the polynomials of combinations, updated as StringEncoder
+    """
+    def __init__(self, width: int):
+        self.width = width
+        self.headers = [LENGTH.pack(length) for length in range(width + 1)]
+        self.body = bytearray(4 * width)
+        self.current = set()
+
+    def encode(self, combination) -> bytes:
+        combination = set(combination)
+        for index in self.current ^ combination:
+            self.body[4 * index] ^= 1
+        self.current = combination
+        length = max(combination) + 1 if combination else 0
+        return self.headers[length] + self.body[:4 * length]
+
+
+def encode_string(poly: NMOD_POLY_TYPE) -> bytes:
+    return nmod_poly_to_string(shared_library, poly).encode('utf-8')
+
+
+def encode_compact(poly: NMOD_POLY_TYPE) -> bytes:
+    coefficients = as_ndarray(poly)
+    return LENGTH.pack(coefficients.size) + coefficients.astype("<u4").tobytes()
+
+
+ENCODINGS = {
+    "string": (encode_string, StringEncoder),
+    "compact": (encode_compact, CompactEncoder),
+}
+
+
+class PrfEngine:
+    """
+    A keyed PRF and the encoding of its messages
+    """
+    def __init__(self, name: str, state, encoding: str):
+        self.name = name
+        self.encoding = encoding
+        self.__state = state
+        self.__encode = ENCODINGS[encoding][0]
+
+    def digest(self, message: bytes) -> bytes:
+        h = self.__state.copy()
+        h.update(message)
+        return h.digest()
+
+    def digest_many(self, messages) -> list[bytes]:
+        copy = self.__state.copy
+        digests = []
+        for message in messages:
+            h = copy()
+            h.update(message)
+            digests.append(h.digest())
+        return digests
+
+    def encode(self, poly: NMOD_POLY_TYPE) -> bytes:
+        return self.__encode(poly)
+
+    def combination_encoder(self, width: int):
+        """
+        An encoder of the polynomials of combinations of at most width answers, as encode encodes them
+        """
+        return ENCODINGS[self.encoding][1](width)
+
+    def poly(self, poly: NMOD_POLY_TYPE) -> bytes:
+        return self.digest(self.__encode(poly))
+
+    def polys(self, polys) -> list[bytes]:
+        return self.digest_many(self.__encode(poly) for poly in polys)
+
+
+def _hmac_sha512(key: bytes):
+    return hmac.new(key, digestmod=hashlib.sha512)
+
+
+def _blake2b(key: bytes):
+    # the keyed mode takes at most 64 bytes of key, the size of ReturnCodeTable.new_key
+    if len(key) > hashlib.blake2b.MAX_KEY_SIZE:
+        key = hashlib.blake2b(key).digest()
+    return hashlib.blake2b(key=key, digest_size=64)
+
+
+# name: (keyed state, encoding)
+ENGINES = {
+    "hmac-sha512": (_hmac_sha512, "string"),
+    "hmac-sha512-compact": (_hmac_sha512, "compact"),
+    "blake2b": (_blake2b, "compact"),
+}
+
+DEFAULT_ENGINE = "hmac-sha512"
+
+
+def new_engine(key: bytes, name: str = None) -> PrfEngine:
+    name = name or DEFAULT_ENGINE
+    if name not in ENGINES:
+        raise ValueError(f"Unknown PRF engine {name}, expected one of {', '.join(ENGINES)}")
+    state, encoding = ENGINES[name]
+    return PrfEngine(name, state(key), encoding)
@@ -1,15 +1,99 @@
+"""
+The commitment, encryption and vericrypt schemes shared by the whole library, set up on first use.
+
+Thread-safe mode: call set_thread_safe() before the first use of the primitives to use cast, code and count
+(and the other scheme algorithms) from several threads of one process, e.g. with a ThreadPoolExecutor, sharing
+keys and election contexts without pickling them. The scheme parameters are read-only and shared; every thread
+samples from its own FLINT random state, seeded from the CSPRNG on its first call; and the library functions that
+sample without taking a random state (SERIALIZED_FUNCTIONS, they use state inside the library) are called under a
+lock. ctypes releases the GIL during foreign calls, so everything else runs concurrently.
+
+The provers sum_prover, lin_prover and shuffle_prover are among the serialized functions, under one lock shared
+by the whole process: the proofs of cast and the proof of shuffle of count, their most expensive parts, run one
+at a time whatever the number of threads. Only the rest of cast, code and count (encryption, commitments,
+verification, decryption) runs in parallel; proofs only scale with processes (lbvs_lib.parallel).
+"""
+import threading
+
 from .commitment_scheme import CommitmentScheme
 from .encryption_scheme import EncryptionScheme
 from .vericrypt import Vericrypt
 
-from .utils import new_flint_random
+from .classes import FLINT_RAND_T, register_protocols
+from .utils import new_flint_random, random
 from .compile import shared_library as lib
+from . import hooks
+from .hooks import FunctionHook
 
 
-class Primitives:
+# library functions that sample from state inside the library instead of a FLINT_RAND_T argument
+SERIALIZED_FUNCTIONS = ("commit_sample_short_crt", "commit_sample_chall_crt", "commit_sample_chall",
+                        "encrypt_sample_short", "encrypt_sample_short_crt", "sum_prover", "lin_prover",
+                        "shuffle_prover", "shuffle_run")
+
+
+class ThreadLocalRand:
+    """
+    A FLINT random state per thread, accepted wherever a FLINT_RAND_T is expected.
+    The state of a thread is created on its first call and kept until clear, so pools should reuse their threads
+    """
     def __init__(self, shared_library):
         self.__shared_library = shared_library
-        self.__flint_rand = new_flint_random(shared_library)
+        self.__local = threading.local()
+        self.__lock = threading.Lock()
+        self.__states = []
+
+    @property
+    def _as_parameter_(self) -> FLINT_RAND_T:
+        rand = getattr(self.__local, "rand", None)
+        if rand is None:
+            rand = new_flint_random(self.__shared_library)
+            self.__local.rand = rand
+            with self.__lock:
+                self.__states.append(rand)
+        return rand
+
+    def clear(self):
+        with self.__lock:
+            for rand in self.__states:
+                self.__shared_library.flint_randclear(rand)
+            self.__states.clear()
+        self.__local = threading.local()
+
+
+class SerializedCall(FunctionHook):
+    """
+    Calls a library function under a lock
+    """
+    def __init__(self, function, lock: threading.Lock):
+        super().__init__(function)
+        self.lock = lock
+
+    def __call__(self, *args):
+        with self.lock:
+            return self.function(*args)
+
+
+def serialize_calls(shared_library, names, lock: threading.Lock = None):
+    """
+    Replaces library functions by SerializedCall wrappers sharing one lock
+    """
+    lock = threading.Lock() if lock is None else lock
+    for name in names:
+        hooks.install(shared_library, name, SerializedCall, lock)
+
+
+class Primitives:
+    def __init__(self, shared_library, thread_safe: bool = False):
+        self.__shared_library = shared_library
+        self.thread_safe = thread_safe
+        if thread_safe:
+            # the argtypes of the provers wrapped below
+            register_protocols()
+            serialize_calls(shared_library, SERIALIZED_FUNCTIONS)
+            self.__flint_rand = ThreadLocalRand(shared_library)
+        else:
+            self.__flint_rand = new_flint_random(shared_library)
         self.__commitment_scheme = CommitmentScheme(shared_library)
         self.__commitment_scheme.load(self.__flint_rand)
         self.__encryption_scheme = EncryptionScheme(shared_library)
@@ -35,14 +119,64 @@ class Primitives:
     def __del__(self):
         self.__commitment_scheme.terminate()
         self.__encryption_scheme.terminate()
-        self.__shared_library.flint_randclear(self.__flint_rand)
+        if self.thread_safe:
+            self.__flint_rand.clear()
+        else:
+            self.__shared_library.flint_randclear(self.__flint_rand)
+
+
+_primitives = None
+_thread_safe = False
+_lock = threading.Lock()
+
+LAZY_ATTRIBUTES = ("flint_rand", "commitment_scheme", "encryption_scheme", "vericrypt")
+
+
+def get_primitives() -> Primitives:
+    """
+    Returns the shared primitives, setting up the schemes on first use.
+    Importing this module is cheap: tools that only (de)serialize or build return code tables never pay for
+    the commitment and encryption setup
+    """
+    global _primitives
+    if _primitives is None:
+        with _lock:
+            if _primitives is None:
+                primitives = Primitives(lib, thread_safe=_thread_safe)
+                # later lookups of the module attributes no longer go through __getattr__
+                globals().update({name: getattr(primitives, name) for name in LAZY_ATTRIBUTES},
+                                 primitives=primitives)
+                _primitives = primitives
+    return _primitives
+
+
+def set_thread_safe(enabled: bool = True):
+    """
+    Selects the thread-safe mode described in the module docstring, before the primitives are set up
+    """
+    global _thread_safe
+    with _lock:
+        if _primitives is not None and _primitives.thread_safe != enabled:
+            raise RuntimeError("The primitives are already set up, set the thread-safe mode before using them")
+        _thread_safe = enabled
+
 
+def reseed():
+    """
+    Reseeds the FLINT random state of the primitives (of the calling thread, in thread-safe mode) from the CSPRNG.
+    A forked process inherits the state of its parent, so process pool workers reseed before sampling
+    """
+    rand = get_primitives().flint_rand
+    lib.flint_randseed(rand, random.getrandbits(64), random.getrandbits(64))
 
-primitives = Primitives(lib)
 
-flint_rand = primitives.flint_rand
-commitment_scheme = primitives.commitment_scheme
-encryption_scheme = primitives.encryption_scheme
-vericrypt = primitives.vericrypt
+def is_initialized() -> bool:
+    return _primitives is not None
 
 
+def __getattr__(name):
+    if name == "primitives":
+        return get_primitives()
+    if name in LAZY_ATTRIBUTES:
+        return getattr(get_primitives(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
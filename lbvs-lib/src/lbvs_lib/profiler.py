@@ -0,0 +1,216 @@
+"""
+Profiling of the calls into the shared library.
+
+When enabled, every library function is wrapped in a ProfiledCall that records its number of calls, its wall time
+(cumulative and percentiles, over up to SAMPLES calls per function) and the Python callers calling it. Functions
+bound before enable are wrapped in place, the others when they are first looked up. Nothing is wrapped while
+profiling is disabled, so it costs nothing then.
+
+    with profiler.profiling():
+        scheme_algorithms.cast(pk, vck, v)
+    print(profiler.report())
+
+Setting the LBVS_PROFILE environment variable to a path before lbvs_lib is imported profiles the whole process
+and writes the JSON report there on exit. The time of a call includes the argument conversion of ctypes, so
+functions called very often with little work each (nmod_poly_init, nmod_poly_set_coeff_ui) show the cost of the
+binding layer.
+"""
+import atexit
+import contextlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from . import hooks
+from .hooks import FunctionHook
+
+PROFILE_ENV = "LBVS_PROFILE"
+
+# durations kept per function for the percentiles, reservoir sampled past that
+SAMPLES = 10000
+PERCENTILES = (50, 90, 99)
+
+_lock = threading.Lock()
+_enabled = False
+_library = None
+_library_type = None
+_stats = {}
+
+
+class _Stats:
+    __slots__ = ("calls", "total", "max", "samples", "callers")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0
+        self.max = 0
+        self.samples = []
+        self.callers = Counter()
+
+    def add(self, duration: int, caller: str):
+        self.calls += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        if len(self.samples) < SAMPLES:
+            self.samples.append(duration)
+        else:
+            i = random.randrange(self.calls)
+            if i < SAMPLES:
+                self.samples[i] = duration
+        self.callers[caller] += 1
+
+    def percentile(self, p: int) -> int:
+        samples = sorted(self.samples)
+        if not samples:
+            return 0
+        return samples[min(len(samples) - 1, len(samples) * p // 100)]
+
+
+class ProfiledCall(FunctionHook):
+    def __init__(self, function, name: str):
+        super().__init__(function)
+        self.name = name
+
+    def __call__(self, *args):
+        start = time.perf_counter_ns()
+        try:
+            return self.function(*args)
+        finally:
+            duration = time.perf_counter_ns() - start
+            frame = sys._getframe(1)
+            caller = f"{frame.f_code.co_filename}:{frame.f_lineno} ({frame.f_code.co_name})"
+            with _lock:
+                stats = _stats.get(self.name)
+                if stats is None:
+                    stats = _stats[self.name] = _Stats()
+                stats.add(duration, caller)
+
+
+def _profiled_class(library_type):
+    """
+    The class of the library while profiling: functions looked up for the first time are wrapped
+    """
+    def __getattr__(self, name):
+        function = super(profiled, self).__getattr__(name)
+        if name.startswith('__') and name.endswith('__'):
+            return function
+        hooks.install(self, name, ProfiledCall, name)
+        return getattr(self, name)
+
+    profiled = type(f"Profiled{library_type.__name__}", (library_type,), {"__getattr__": __getattr__})
+    return profiled
+
+
+def _functions(shared_library) -> list[str]:
+    # the functions cached on the library, ctypes or cffi_backend ones
+    return [name for name, value in vars(shared_library).items() if not name.startswith('_') and callable(value)]
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def enable(shared_library=None):
+    global _enabled, _library, _library_type
+    if shared_library is None:
+        from .compile import shared_library
+    with _lock:
+        if _enabled:
+            return
+        for name in _functions(shared_library):
+            hooks.install(shared_library, name, ProfiledCall, name)
+        _library_type = type(shared_library)
+        shared_library.__class__ = _profiled_class(_library_type)
+        _library = shared_library
+        _enabled = True
+
+
+def disable():
+    """
+    Unwraps every function. The statistics are kept until reset
+    """
+    global _enabled
+    with _lock:
+        if not _enabled:
+            return
+        _library.__class__ = _library_type
+        for name in _functions(_library):
+            hooks.uninstall(_library, name, ProfiledCall)
+        _enabled = False
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+@contextlib.contextmanager
+def profiling(shared_library=None, reset_stats: bool = True):
+    """
+    Profiles the calls made inside the block, after clearing the previous statistics unless reset_stats is False
+    """
+    if reset_stats:
+        reset()
+    already_enabled = _enabled
+    enable(shared_library)
+    try:
+        yield
+    finally:
+        if not already_enabled:
+            disable()
+
+
+def results(callers: int = 3) -> list[dict]:
+    """
+    The statistics of every function called, in nanoseconds, by decreasing total time
+    :param callers: the number of most frequent callers to list per function
+    """
+    with _lock:
+        items = list(_stats.items())
+    rows = []
+    for name, stats in items:
+        row = {
+            "function": name,
+            "calls": stats.calls,
+            "total_ns": stats.total,
+            "mean_ns": stats.total // stats.calls,
+            "max_ns": stats.max,
+            **{f"p{p}_ns": stats.percentile(p) for p in PERCENTILES},
+            "callers": [{"caller": caller, "calls": count} for caller, count in stats.callers.most_common(callers)],
+        }
+        rows.append(row)
+    return sorted(rows, key=lambda row: row["total_ns"], reverse=True)
+
+
+def report(limit: int = 30) -> str:
+    rows = results(callers=1)
+    total = sum(row["total_ns"] for row in rows) or 1
+    lines = [f"{'function':<32} {'calls':>9} {'total ms':>10} {'%':>6} {'mean us':>9} {'p50 us':>9} "
+             f"{'p90 us':>9} {'p99 us':>9}  top caller"]
+    for row in rows[:limit]:
+        caller = row["callers"][0]["caller"] if row["callers"] else ""
+        lines.append(f"{row['function']:<32} {row['calls']:>9} {row['total_ns'] / 1e6:>10.2f} "
+                     f"{100 * row['total_ns'] / total:>6.1f} {row['mean_ns'] / 1e3:>9.2f} "
+                     f"{row['p50_ns'] / 1e3:>9.2f} {row['p90_ns'] / 1e3:>9.2f} {row['p99_ns'] / 1e3:>9.2f}  {caller}")
+    if len(rows) > limit:
+        lines.append(f"... {len(rows) - limit} more")
+    return "\n".join(lines)
+
+
+def dump(path: str):
+    with open(path, "w") as f:
+        json.dump(results(), f, indent=2)
+
+
+def enable_from_env(shared_library):
+    """
+    Profiles the whole process if LBVS_PROFILE is set, writing the JSON report to its path on exit
+    """
+    path = os.environ.get(PROFILE_ENV)
+    if path:
+        enable(shared_library)
+        atexit.register(dump, path)
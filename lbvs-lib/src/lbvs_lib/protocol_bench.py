@@ -2,11 +2,16 @@ from .classes import NMOD_POLY_TYPE
 from .compile import shared_library, MODP
 from .logger import LOGGER, VERBOSE
 from .players import VotingProtocol
+from .ballot_layout import BallotLayout
+from . import accounting, profiler
 
 
-def votes_to_poly(votes_per_voter):
+def votes_to_poly(votes_per_voter, layout: BallotLayout = None):
     votes_poly = []
     for votes in votes_per_voter:
+        if layout is not None:
+            votes_poly.append([layout.pack(votes)])
+            continue
         vote_poly = []
         for vote in votes:
             v = NMOD_POLY_TYPE()
@@ -19,14 +24,19 @@ def votes_to_poly(votes_per_voter):
     return votes_poly
 
 
-def benchmark_registration_with_rct(n_voters, questions):
+def benchmark_registration_with_rct(n_voters, questions, prf_engine=None):
+    """
+    The return code tables are computed once for every voter (they do not depend on the voter), so the time of
+    their generation does not grow with n_voters, unlike in benchmarks of earlier versions
+    """
     import timeit
-    protocol = VotingProtocol()
+    protocol = VotingProtocol(prf_engine=prf_engine)
 
     LOGGER.info("RUNNING SETUP PHASE")
 
     setup_t_1 = timeit.default_timer()
-    protocol.setup_phase(questions)
+    with accounting.phase("setup"):
+        protocol.setup_phase(questions)
     setup_t_2 = timeit.default_timer()
 
     LOGGER.log(VERBOSE, f"Setup time: {setup_t_2 - setup_t_1}")
@@ -34,27 +44,30 @@ def benchmark_registration_with_rct(n_voters, questions):
     LOGGER.info(f"RUNNING REGISTER PHASE FOR {n_voters} VOTERS")
 
     registration_t_1 = timeit.default_timer()
-    voter_reg_t, rtc_gen_t = protocol.registration_phase(n_voters,
-                                                         generate_return_code_tables=True,
-                                                         benchmark=True)
+    with accounting.phase("registration"):
+        voter_reg_t, rtc_gen_t = protocol.registration_phase(n_voters,
+                                                             generate_return_code_tables=True,
+                                                             benchmark=True)
     registration_t_2 = timeit.default_timer()
 
     LOGGER.log(VERBOSE, f"Register time: {registration_t_2 - registration_t_1}")
 
     # cleanup
-    protocol.clear_voters()
-    protocol.clear_players()
+    with accounting.phase("cleanup"):
+        protocol.clear_voters()
+        protocol.clear_players()
 
     return (setup_t_2 - setup_t_1,registration_t_2 - registration_t_1), (voter_reg_t, rtc_gen_t)
 
-def protocol_benchmark(n_voters, questions, votes):
+def protocol_benchmark(n_voters, questions, votes, packed=False, prf_engine=None):
     import timeit
-    protocol = VotingProtocol(clear=True)
+    protocol = VotingProtocol(clear=True, packed=packed, prf_engine=prf_engine)
 
     LOGGER.info("RUNNING SETUP PHASE")
 
     setup_t_1 = timeit.default_timer()
-    protocol.setup_phase(questions)
+    with accounting.phase("setup"):
+        protocol.setup_phase(questions)
     setup_t_2 = timeit.default_timer()
 
     LOGGER.log(VERBOSE, f"Setup time: {setup_t_2 - setup_t_1}")
@@ -62,23 +75,26 @@ def protocol_benchmark(n_voters, questions, votes):
     LOGGER.info(f"RUNNING REGISTER PHASE FOR {n_voters} VOTERS")
 
     registration_t_1 = timeit.default_timer()
-    register_t, rct_t = protocol.registration_phase(n_voters, benchmark=True)
+    with accounting.phase("registration"):
+        register_t, rct_t = protocol.registration_phase(n_voters, benchmark=True)
     registration_t_2 = timeit.default_timer()
 
     LOGGER.log(VERBOSE, f"Register time: {registration_t_2 - registration_t_1}")
 
-    votes_as_poly = votes_to_poly(votes)
+    votes_as_poly = votes_to_poly(votes, protocol.layout)
 
     LOGGER.info(f"RUNNING CASTING PHASE FOR {n_voters} VOTERS")
 
     voting_t_1 = timeit.default_timer()
-    cast_t, code_t = protocol.casting_phase(votes_as_poly, benchmark=True)
+    with accounting.phase("casting"):
+        cast_t, code_t = protocol.casting_phase(votes_as_poly, benchmark=True)
     voting_t_2 = timeit.default_timer()
 
     LOGGER.info("RUNNING COUNT PHASE FOR {n_voters} VOTERS")
 
     count_t_1 = timeit.default_timer()
-    result, tally, (alg_count_t, ver_t) = protocol.counting_phase(benchmark=True)
+    with accounting.phase("counting"):
+        result, tally, (alg_count_t, ver_t) = protocol.counting_phase(benchmark=True)
     count_t_2 = timeit.default_timer()
     if not result:
         LOGGER.error("Counting failed")
@@ -86,7 +102,12 @@ def protocol_benchmark(n_voters, questions, votes):
     LOGGER.log(VERBOSE, f"Count time: {count_t_2 - count_t_1}")
 
     # cleanup
-    protocol.clear_players()
+    with accounting.phase("cleanup"):
+        protocol.clear_players()
+    if accounting.is_enabled():
+        LOGGER.log(VERBOSE, "Library objects still live after the benchmark:\n" + accounting.report())
+    if profiler.is_enabled():
+        LOGGER.log(VERBOSE, "Library calls during the benchmark:\n" + profiler.report())
 
     setup_t = setup_t_2 - setup_t_1
     voting_t = voting_t_2 - voting_t_1
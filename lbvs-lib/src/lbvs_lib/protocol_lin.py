@@ -1,5 +1,10 @@
 from .compile import WIDTH, DEGREE, MODP, ctypes
-from .classes import NMOD_POLY_TYPE, COMMITMENT_SCHEME_TYPE, Commitment, CommitmentKey
+from .classes import NMOD_POLY_TYPE, COMMITMENT_SCHEME_TYPE, Commitment, CommitmentKey, \
+    register_commitment, register_protocols
+from .arena import new_polys
+
+register_commitment()
+register_protocols()
 
 
 class ProtocolLin:
@@ -50,21 +55,11 @@ class ProtocolLin:
         self.scheme = scheme
 
     def load(self):
-        self.y = (NMOD_POLY_TYPE * 2 * WIDTH)()
-        self._y = (NMOD_POLY_TYPE * 2 * WIDTH)()
-        self.t = (NMOD_POLY_TYPE * 2)()
-        self._t = (NMOD_POLY_TYPE * 2)()
-        self.u = (NMOD_POLY_TYPE * 2)()
-
-        for i in range(2):
-            shared_library.nmod_poly_init(self.t[i], MODP)
-            shared_library.nmod_poly_init(self._t[i], MODP)
-            shared_library.nmod_poly_init(self.u[i], MODP)
-
-        for i in range(WIDTH):
-            for j in range(2):
-                shared_library.nmod_poly_init(self.y[i][j], MODP)
-                shared_library.nmod_poly_init(self._y[i][j], MODP)
+        self.y = new_polys(NMOD_POLY_TYPE * 2 * WIDTH)
+        self._y = new_polys(NMOD_POLY_TYPE * 2 * WIDTH)
+        self.t = new_polys(NMOD_POLY_TYPE * 2)
+        self._t = new_polys(NMOD_POLY_TYPE * 2)
+        self.u = new_polys(NMOD_POLY_TYPE * 2)
 
         self.__state = 1
 
@@ -124,21 +119,11 @@ class ProtocolLin:
 
     @staticmethod
     def prover(shared_library, scheme, x, _x, key, alpha, beta, r, _r, l=0):
-        y = (NMOD_POLY_TYPE * 2 * WIDTH)()
-        _y = (NMOD_POLY_TYPE * 2 * WIDTH)()
-        t = (NMOD_POLY_TYPE * 2)()
-        _t = (NMOD_POLY_TYPE * 2)()
-        u = (NMOD_POLY_TYPE * 2)()
-
-        for i in range(2):
-            shared_library.nmod_poly_init(t[i], MODP)
-            shared_library.nmod_poly_init(_t[i], MODP)
-            shared_library.nmod_poly_init(u[i], MODP)
-
-        for i in range(WIDTH):
-            for j in range(2):
-                shared_library.nmod_poly_init(y[i][j], MODP)
-                shared_library.nmod_poly_init(_y[i][j], MODP)
+        y = new_polys(NMOD_POLY_TYPE * 2 * WIDTH)
+        _y = new_polys(NMOD_POLY_TYPE * 2 * WIDTH)
+        t = new_polys(NMOD_POLY_TYPE * 2)
+        _t = new_polys(NMOD_POLY_TYPE * 2)
+        u = new_polys(NMOD_POLY_TYPE * 2)
 
         shared_library.lin_prover(y, _y, t, _t, u, scheme, x, _x, ctypes.byref(key), alpha, beta, r, _r, l)
         return y, _y, t, _t, u
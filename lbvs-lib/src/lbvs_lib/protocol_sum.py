@@ -1,9 +1,14 @@
 import ctypes
 
 from .utils import print_nmod_poly
+from .arena import new_polys
 
 from .compile import WIDTH, MODP, DEGREE
-from .classes import Commitment, COMMITMENT_SCHEME_TYPE, NMOD_POLY_TYPE, CommitmentKey
+from .classes import Commitment, COMMITMENT_SCHEME_TYPE, NMOD_POLY_TYPE, CommitmentKey, \
+    register_commitment, register_protocols
+
+register_commitment()
+register_protocols()
 
 
 class ProtocolSum:
@@ -32,25 +37,14 @@ class ProtocolSum:
     def prover(shared_library, scheme: COMMITMENT_SCHEME_TYPE, x1: Commitment, x2: Commitment, x3: Commitment,
                key: CommitmentKey, alpha: NMOD_POLY_TYPE, beta: NMOD_POLY_TYPE,
                r1: NMOD_POLY_TYPE * 2 * WIDTH, r2: NMOD_POLY_TYPE * 2 * WIDTH, r3: NMOD_POLY_TYPE * 2 * WIDTH):
-        y1 = (NMOD_POLY_TYPE * 2 * WIDTH)()
-        y2 = (NMOD_POLY_TYPE * 2 * WIDTH)()
-        y3 = (NMOD_POLY_TYPE * 2 * WIDTH)()
-        t1 = (NMOD_POLY_TYPE * 2)()
-        t2 = (NMOD_POLY_TYPE * 2)()
-        t3 = (NMOD_POLY_TYPE * 2)()
-        u = (NMOD_POLY_TYPE * 2)()
-
-        for i in range(2):
-            shared_library.nmod_poly_init(t1[i], MODP)
-            shared_library.nmod_poly_init(t2[i], MODP)
-            shared_library.nmod_poly_init(t3[i], MODP)
-            shared_library.nmod_poly_init(u[i], MODP)
-
-        for i in range(WIDTH):
-            for j in range(2):
-                shared_library.nmod_poly_init(y1[i][j], MODP)
-                shared_library.nmod_poly_init(y2[i][j], MODP)
-                shared_library.nmod_poly_init(y3[i][j], MODP)
+        # the outputs are built initialized, without a library call per polynomial
+        y1 = new_polys(NMOD_POLY_TYPE * 2 * WIDTH)
+        y2 = new_polys(NMOD_POLY_TYPE * 2 * WIDTH)
+        y3 = new_polys(NMOD_POLY_TYPE * 2 * WIDTH)
+        t1 = new_polys(NMOD_POLY_TYPE * 2)
+        t2 = new_polys(NMOD_POLY_TYPE * 2)
+        t3 = new_polys(NMOD_POLY_TYPE * 2)
+        u = new_polys(NMOD_POLY_TYPE * 2)
 
         shared_library.sum_prover(y1, y2, y3, t1, t2, t3, u,
                                   scheme, x1, x2, x3, ctypes.byref(key),
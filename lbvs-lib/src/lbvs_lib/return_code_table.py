@@ -1,9 +1,125 @@
 import base64
+import json
+from concurrent.futures import ProcessPoolExecutor
 
 from .compile import MODP, shared_library, DEGREE
 from .classes import NMOD_POLY_TYPE
-from .utils import nmod_poly_to_string, get_all_voting_combinations
-from Crypto.Hash import HMAC, SHA512
+from .utils import nmod_poly_to_string, CombinationSpace, get_all_voting_combinations_gray
+from .prf import StringEncoder, PrfEngine, new_engine
+
+
+class CombinationEncoder(StringEncoder):
+    """
+    The StringEncoder of the polynomials of combinations, which is the nmod_poly_to_string encoding of the library
+    """
+    def matches_library(self) -> bool:
+        """
+        Whether the encoding is the one of the library, checked on a few polynomials
+        """
+        poly = NMOD_POLY_TYPE()
+        shared_library.nmod_poly_init(poly, MODP)
+        try:
+            for combination in ((), (0,), (self.width - 1,), (0, self.width - 1), tuple(range(self.width))):
+                shared_library.nmod_poly_zero(poly)
+                for item in combination:
+                    shared_library.nmod_poly_set_coeff_ui(poly, item, 1)
+                if nmod_poly_to_string(shared_library, poly).encode('utf-8') != self.encode(combination):
+                    return False
+            return True
+        finally:
+            shared_library.nmod_poly_clear(poly)
+
+
+def _walk(question: dict, combinations) -> tuple[list, list]:
+    """
+    The combinations of a table in the order of the table, and in the order they are computed
+    """
+    if question and not combinations:
+        combinations = CombinationSpace.from_question(question)
+    if isinstance(combinations, CombinationSpace) and combinations.whole:
+        # a whole space is walked as its question
+        return (list(combinations), list(get_all_voting_combinations_gray(
+            range(combinations.n_answers), combinations.minimum, combinations.maximum)))
+    if not combinations:
+        raise ValueError("Either question or combinations must be provided")
+    combinations = list(combinations)
+    return combinations, combinations
+
+
+def _width(combinations) -> int:
+    return max((max(combination) + 1 for combination in combinations if combination), default=1)
+
+
+def _codes(key: bytes, combinations, width: int, engine: str = None) -> dict:
+    """
+    The encoding and PRF of every combination, computed in turn
+    """
+    prf = new_engine(key, engine)
+    encoder = CombinationEncoder(width)
+    strings = [encoder.encode(combination) for combination in combinations]
+    # the string is the message of the PRF, unless the engine encodes the polynomials otherwise
+    if prf.encoding == "string":
+        messages = strings
+    else:
+        encoder = prf.combination_encoder(width)
+        messages = [encoder.encode(combination) for combination in combinations]
+    return dict(zip(combinations, zip(strings, prf.digest_many(messages))))
+
+
+def _table(order, codes: dict, b64: bool) -> dict:
+    table = {}
+    for combination in order:
+        s, code = codes[combination]
+        if b64:
+            table[base64.b64encode(s).decode('utf-8')] = base64.b64encode(code).decode('utf-8')
+        else:
+            table[s.decode('utf-8')] = code
+    return table
+
+
+# combinations per process pool task of compute_shared_tables
+CHUNK = 4096
+
+
+def _codes_worker(task) -> dict:
+    return _codes(*task)
+
+
+def _parallel_tables(key: bytes, walks, workers: int, b64: bool, engine: str = None) -> list[dict]:
+    from .parallel import default_workers
+    workers = default_workers() if workers is None else workers
+    tasks, owners = [], []
+    for i, (order, walk) in enumerate(walks):
+        width = _width(order)
+        for start in range(0, len(walk), CHUNK):
+            tasks.append((key, walk[start:start + CHUNK], width, engine))
+            owners.append(i)
+    codes = [{} for _ in walks]
+    if workers <= 1 or len(tasks) <= 1:
+        results = map(_codes_worker, tasks)
+        for i, result in zip(owners, results):
+            codes[i].update(result)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for i, result in zip(owners, executor.map(_codes_worker, tasks)):
+                codes[i].update(result)
+    return [_table(order, table_codes, b64) for (order, _), table_codes in zip(walks, codes)]
+
+
+class JsonLinesSink:
+    """
+    Writes the tables of every voter as a line {"voter": index, "tables": [...]} of a text file. The tables of
+    compute_shared_tables are the same for every voter, so they are encoded once
+    """
+    def __init__(self, file):
+        self.file = file
+        self.__tables = None
+        self.__encoded = None
+
+    def __call__(self, voter: int, tables: list[dict]):
+        if tables is not self.__tables:
+            self.__tables, self.__encoded = tables, json.dumps(tables)
+        self.file.write(f'{{"voter": {voter}, "tables": {self.__encoded}}}\n')
 
 
 class ReturnCodeTable:
@@ -21,21 +137,80 @@ class ReturnCodeTable:
         return base64.b64decode(key)
 
     @staticmethod
-    def prf(key: bytes, message: bytes):
-        h = HMAC.new(key, digestmod=SHA512)
-        h.update(message)
-        return h.digest()
+    def prf(key: bytes, message: bytes, engine: str = None):
+        return new_engine(key, engine).digest(message)
 
     @staticmethod
-    def compute_table(key: bytes, blinding_key: NMOD_POLY_TYPE, question: dict=None, combinations: iter=None, b64=False):
+    def compute_table(key: bytes, blinding_key: NMOD_POLY_TYPE, question: dict=None, combinations: iter=None, b64=False,
+                      engine: str = None):
+        """
+        The return codes of every combination: the encoding of its polynomial mapped to its PRF.
+        The combinations of a question are walked in revolving door order and the table is built in the order of
+        get_all_voting_combinations, other combinations are walked in their order
+        :param engine: the PRF engine of the election (see prf.ENGINES)
+        """
+        order, walk = _walk(question, combinations)
+        width = _width(order)
+        if not CombinationEncoder(width).matches_library():
+            return ReturnCodeTable.compute_table_slow(key, blinding_key, combinations=order, b64=b64, engine=engine)
+        return _table(order, _codes(key, walk, width, engine), b64)
+
+    @staticmethod
+    def compute_shared_tables(key: bytes, n_voters: int, questions: list[dict]=None, combinations: list=None,
+                              workers: int = None, sink=None, b64=False, engine: str = None) -> int:
+        """
+        The return code tables of a whole voter roll, handed to a sink voter by voter, so they are never all held.
+
+        The codes only depend on the key and the combinations, so unlike compute_table, which takes the blinding key
+        of its voter, the tables are computed once, their combinations split across processes, and every voter gets
+        the same tables. Only use it where the tables of the election are not per voter.
+        :param n_voters: the number of voters
+        :param questions: the questions of the ballot, one table each
+        :param combinations: instead of questions, the combinations of every table (e.g. the packed combinations of
+        a layout)
+        :param workers: the number of processes, parallel.default_workers() by default
+        :param engine: the PRF engine of the election (see prf.ENGINES)
+        :param sink: called with the index of every voter and its tables (the same objects for every voter, which
+        must not modify them), or a text file, written as JSON lines, which needs b64
+        :return: the number of voters
+        """
+        if sink is None:
+            raise ValueError("A sink must be provided")
+        if hasattr(sink, "write"):
+            if not b64:
+                raise ValueError("Tables written to a file are JSON, they need b64=True")
+            sink = JsonLinesSink(sink)
+        if n_voters <= 0:
+            return 0
+        walks = ([_walk(question, None) for question in questions] if combinations is None
+                 else [_walk(None, table_combinations) for table_combinations in combinations])
+        width = max(_width(order) for order, _ in walks)
+        if not CombinationEncoder(width).matches_library():
+            # compute_table_slow takes a blinding key, which does not change the codes
+            zero = NMOD_POLY_TYPE()
+            shared_library.nmod_poly_init(zero, MODP)
+            tables = [ReturnCodeTable.compute_table_slow(key, zero, combinations=order, b64=b64, engine=engine)
+                      for order, _ in walks]
+            shared_library.nmod_poly_clear(zero)
+        else:
+            tables = _parallel_tables(key, walks, workers, b64, engine)
+
+        for voter in range(n_voters):
+            sink(voter, tables)
+        return n_voters
+
+    @staticmethod
+    def compute_table_slow(key: bytes, blinding_key: NMOD_POLY_TYPE, question: dict=None, combinations: iter=None,
+                           b64=False, engine: str = None):
+        """
+        compute_table rendering every polynomial through the library
+        """
         if question and not combinations:
-            answers = range(len(question['answers']))
-            minimum = question['min']
-            maximum = question['max']
-            combinations = get_all_voting_combinations(answers, minimum, maximum)
+            combinations = CombinationSpace.from_question(question)
         elif not combinations:
             raise ValueError("Either question or combinations must be provided")
 
+        prf = new_engine(key, engine)
         poly = NMOD_POLY_TYPE()
         shared_library.nmod_poly_init(poly, MODP)
 
@@ -47,10 +222,9 @@ class ReturnCodeTable:
                 shared_library.nmod_poly_set_coeff_ui(poly, item, 1)
 
             s = nmod_poly_to_string(shared_library, poly)
+            code = prf.poly(poly)
 
             shared_library.nmod_poly_add(poly, blinding_key, poly)
-            r_bytes = str.encode(s, encoding='utf-8')
-            code = ReturnCodeTable.prf(key, r_bytes)
 
             if b64:
                 b64_s = base64.b64encode(s.encode('utf-8')).decode('utf-8')
@@ -67,13 +241,18 @@ class ReturnCodeTable:
         return base64.b64encode(s.encode('utf-8')).decode('utf-8') if b64 else s
 
     @staticmethod
-    def nmod_prf(key: bytes, message: NMOD_POLY_TYPE, b64=False):
-        s = nmod_poly_to_string(shared_library, message)
-        byte_array = str.encode(s, encoding='utf-8')
-        prf = ReturnCodeTable.prf(key, byte_array)
+    def nmod_prf(key: bytes, message: NMOD_POLY_TYPE, b64=False, engine: str = None):
+        return ReturnCodeTable.nmod_prfs(new_engine(key, engine), [message], b64)[0]
+
+    @staticmethod
+    def nmod_prfs(prf: PrfEngine, messages: list[NMOD_POLY_TYPE], b64=False) -> list:
+        """
+        The PRF of a batch of polynomials, with an engine keyed once (prf.new_engine)
+        """
+        codes = prf.polys(messages)
         if b64:
-            prf = base64.b64encode(prf).decode('utf-8')
-        return prf
+            codes = [base64.b64encode(code).decode('utf-8') for code in codes]
+        return codes
 
 
 if __name__ == "__main__":
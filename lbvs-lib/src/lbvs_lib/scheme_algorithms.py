@@ -1,15 +1,20 @@
+import collections
+import contextlib
+import threading
 from typing import Tuple
 import timeit
 
 from .classes import Commitment, CommitmentKey, Ciphertext, PublicKey, NMOD_POLY_TYPE, PCRT_POLY_TYPE, FMPZ_MOD_POLY_T, \
     Veritext
 from .compile import DEGREE, MODP, VECTOR, WIDTH, shared_library, ctypes
-from .primitives import commitment_scheme, encryption_scheme, vericrypt, flint_rand
+from . import primitives
 from .protocol_sum import ProtocolSum
 from .shuffle import Shuffle
 from .utils import (fmpz_to_opening, opening_to_fmpz, c1_to_fmpz, b1_to_fmpz, print_nmod_poly,
                     print_fmpz_mod_poly)
 from .cleanup import clear_opening
+from .arena import PolyArena, thread_arena
+from .election_context import ElectionContext, unpack
 
 
 def ballot_to_precode(v, a):
@@ -27,13 +32,13 @@ def setup():
     """
 
     # pk_C <- KeyGen_C
-    pk_C = commitment_scheme.keygen()
+    pk_C = primitives.commitment_scheme.keygen()
 
     # (pk_V, dk_V) <- KeyGen_VE
-    pk_V, dk_V = encryption_scheme.keygen()
+    pk_V, dk_V = primitives.encryption_scheme.keygen()
 
     # (pk_R, dk_R) <- KeyGen_VE
-    pk_R, dk_R = encryption_scheme.keygen()
+    pk_R, dk_R = primitives.encryption_scheme.keygen()
 
     # public key
     pk = (pk_C, pk_V, pk_R)
@@ -54,10 +59,10 @@ def register(pk):
     # samples a <- R_p
     a = NMOD_POLY_TYPE()
     shared_library.nmod_poly_init(a, MODP)
-    shared_library.nmod_poly_randtest(a, flint_rand, DEGREE)
+    shared_library.nmod_poly_randtest(a, primitives.flint_rand, DEGREE)
 
     # computes (c_a, d_a) ← Com(pk_C , a)
-    c_a, d_a = commitment_scheme.commit(pk_C, a, only_r=True)
+    c_a, d_a = primitives.commitment_scheme.commit(pk_C, a, only_r=True)
 
     # the voter verification key is vvk = c_a
     vvk = c_a
@@ -77,63 +82,164 @@ def register(pk):
 def __decrypt_opening(dk, e: Ciphertext * VECTOR) -> NMOD_POLY_TYPE:
     r = (FMPZ_MOD_POLY_T * VECTOR)()
     for i in range(VECTOR):
-        r[i], result = encryption_scheme.decrypt(e[i], dk)
+        r[i], result = primitives.encryption_scheme.decrypt(e[i], dk)
         assert result, "Decryption failed for r [%d]" % i
     return r
 
 
-def __encrypt_opening(pk, d, c: Commitment, pk_C: CommitmentKey) -> Veritext:
-    # convert c.c1 to FMPZ
-    u = c1_to_fmpz(shared_library, c.c1, commitment_scheme.scheme, vericrypt.context_p)
-    # conver pk_C.B1 to fmpz
-    t = b1_to_fmpz(shared_library, pk_C.B1, commitment_scheme.scheme, vericrypt.context_p)
-    # convert d to FMPZ_MOD_POLY_T * VECTOR
-    fmpz_d = opening_to_fmpz(shared_library, d, commitment_scheme.scheme, vericrypt.context_p)
-    e, result = vericrypt.encrypt(t, u, fmpz_d, pk)
+def __encrypt_opening(pk, d, c: Commitment, pk_C: CommitmentKey, t=None) -> Veritext:
+    # the converted inputs are only read by the encryption, so they live in the thread's arena
+    arena = thread_arena()
+    with arena.scope():
+        # convert c.c1 to FMPZ
+        u = c1_to_fmpz(shared_library, c.c1, primitives.commitment_scheme.scheme, primitives.vericrypt.context_p,
+                       arena)
+        # conver pk_C.B1 to fmpz
+        if t is None:
+            t = b1_to_fmpz(shared_library, pk_C.B1, primitives.commitment_scheme.scheme,
+                           primitives.vericrypt.context_p, arena)
+        # convert d to FMPZ_MOD_POLY_T * VECTOR
+        fmpz_d = opening_to_fmpz(shared_library, d, primitives.commitment_scheme.scheme,
+                                 primitives.vericrypt.context_p, arena)
+        e, result = primitives.vericrypt.encrypt(t, u, fmpz_d, pk)
     # print_message_space(self.shared_library, fmpz_d, self.vericrypt.context)
     assert result, "Encryption failed for pk"
     return e
 
 
-def cast(pk: Tuple[CommitmentKey, PublicKey, PublicKey],
-         vck: Tuple[NMOD_POLY_TYPE, Commitment, PCRT_POLY_TYPE * WIDTH],
-         v: NMOD_POLY_TYPE):
+class CastPrecomputation:
     """
-    :param pk: public key (pk_C, pk_V, pk_R)
-    :param vck: voter casting key (a, c_a, d_a)
-    :param v: vote
+    The vote-independent part of Cast for a single ballot.
+
+    c = Com(pk_C, 0; d) and c_r = Com(pk_C, 0; d_r) only depend on the vote through c2, and the
+    verifiable encryptions e and e_r of d and d_r only depend on c.c1 and c_r.c1, so all of them can
+    be computed before the vote is known. cast_online then adds v and r = v + a to the commitments.
+
+    A precomputation holds fresh commitment randomness and must be used for a single ballot only.
     """
+    def __init__(self, c: Commitment, d: PCRT_POLY_TYPE * WIDTH, e: Veritext,
+                 c_r: Commitment, d_r: PCRT_POLY_TYPE * WIDTH, e_r: Veritext):
+        self.c = c
+        self.d = d
+        self.e = e
+        self.c_r = c_r
+        self.d_r = d_r
+        self.e_r = e_r
+        self.used = False
+
+    def use(self):
+        if self.used:
+            raise ValueError("Cast precomputation has already been used")
+        self.used = True
+
+    def clear(self):
+        """
+        Frees a precomputation that will not be used for casting
+        """
+        if self.used:
+            return
+        self.used = True
+        self.free()
+
+    def free(self):
+        """
+        Frees every part of the precomputation, used or not
+        """
+        shared_library.commit_free(ctypes.byref(self.c))
+        shared_library.commit_free(ctypes.byref(self.c_r))
+        primitives.vericrypt.cipher_clear(self.e)
+        primitives.vericrypt.cipher_clear(self.e_r)
+        clear_opening(self.d)
+        clear_opening(self.d_r)
+
+
+def precompute_cast(pk: Tuple[CommitmentKey, PublicKey, PublicKey] | ElectionContext) -> CastPrecomputation:
+    """
+    :param pk: public key (pk_C, pk_V, pk_R) or an election context holding it
+    """
+    pk, context = unpack(pk, 'pk')
     pk_C, pk_V, pk_R = pk
-    a, c_a, d_a = vck
-
-    # computes (c, d) ← Com(pk_C , v)
-    (c, d) = commitment_scheme.commit(pk_C, v, only_r=True)
+    # pk_C.B1 in the plaintext context, shared by both verifiable encryptions
+    t = context.t if context is not None else b1_to_fmpz(shared_library, pk_C.B1, primitives.commitment_scheme.scheme,
+                                                         primitives.vericrypt.context_p)
 
-    # r ← a + v
-    r: NMOD_POLY_TYPE = ballot_to_precode(v, a)
+    zero = NMOD_POLY_TYPE()
+    shared_library.nmod_poly_init(zero, MODP)
 
-    # (c_r, d_r) ← Com(pk_C , r)
-    (c_r, d_r) = commitment_scheme.commit(pk_C, r, only_r=True)
-    # print_opening(self.shared_library, d_r)
+    # computes (c, d) ← Com(pk_C , 0)
+    (c, d) = primitives.commitment_scheme.commit(pk_C, zero, only_r=True)
 
-    # Π^sum is a proof that c, c_a and c_r satisfy the relation v + a = r
-    alpha = NMOD_POLY_TYPE()
-    shared_library.nmod_poly_init(alpha, MODP)
-    shared_library.utils_nmod_poly_one(alpha)
-    beta = NMOD_POLY_TYPE()
-    shared_library.nmod_poly_init(beta, MODP)
-    shared_library.utils_nmod_poly_one(beta)
+    # (c_r, d_r) ← Com(pk_C , 0)
+    (c_r, d_r) = primitives.commitment_scheme.commit(pk_C, zero, only_r=True)
 
-    proof = ProtocolSum.prover(shared_library, commitment_scheme.scheme,
-                               c, c_a, c_r, pk_C,
-                               alpha, beta,
-                               d, d_a, d_r)
+    shared_library.nmod_poly_clear(zero)
 
     # e = (v, w, c, z) ← Enc_{VE} (pkV , d)
-    e = __encrypt_opening(pk_V, d, c, pk_C)
+    e = __encrypt_opening(pk_V, d, c, pk_C, t)
 
     # e_r = (v_r , w_r , c_r , z_r ) ← Enc_{VE} (pk_R, d_r )
-    e_r = __encrypt_opening(pk_R, d_r, c_r, pk_C)
+    e_r = __encrypt_opening(pk_R, d_r, c_r, pk_C, t)
+
+    if context is None:
+        for i in range(WIDTH):
+            shared_library.fmpz_mod_poly_clear(t[i], primitives.vericrypt.context_p)
+
+    return CastPrecomputation(c, d, e, c_r, d_r, e_r)
+
+
+def cast_online(pk: Tuple[CommitmentKey, PublicKey, PublicKey] | ElectionContext,
+                vck: Tuple[NMOD_POLY_TYPE, Commitment, PCRT_POLY_TYPE * WIDTH],
+                v: NMOD_POLY_TYPE,
+                precomp: CastPrecomputation):
+    """
+    :param pk: public key (pk_C, pk_V, pk_R) or an election context holding it
+    :param vck: voter casting key (a, c_a, d_a)
+    :param v: vote
+    :param precomp: an unused precomputation for pk
+    """
+    pk, context = unpack(pk, 'pk')
+    pk_C, pk_V, pk_R = pk
+    a, c_a, d_a = vck
+    precomp.use()
+    c, d, e = precomp.c, precomp.d, precomp.e
+    c_r, d_r, e_r = precomp.c_r, precomp.d_r, precomp.e_r
+
+    # Π^sum is a proof that c, c_a and c_r satisfy the relation v + a = r
+    if context is not None:
+        alpha, beta = context.alpha, context.beta
+    else:
+        alpha = NMOD_POLY_TYPE()
+        shared_library.nmod_poly_init(alpha, MODP)
+        shared_library.utils_nmod_poly_one(alpha)
+        beta = NMOD_POLY_TYPE()
+        shared_library.nmod_poly_init(beta, MODP)
+        shared_library.utils_nmod_poly_one(beta)
+
+    r = None
+    try:
+        # (c, d) ← Com(pk_C , v)
+        primitives.commitment_scheme.add_message(c, v)
+
+        # r ← a + v
+        r: NMOD_POLY_TYPE = ballot_to_precode(v, a)
+
+        # (c_r, d_r) ← Com(pk_C , r)
+        primitives.commitment_scheme.add_message(c_r, r)
+
+        proof = ProtocolSum.prover(shared_library, primitives.commitment_scheme.scheme,
+                                   c, c_a, c_r, pk_C,
+                                   alpha, beta,
+                                   d, d_a, d_r)
+    except BaseException:
+        # no ballot holds the commitments and encryptions, and clear skips the used precomputation
+        precomp.free()
+        raise
+    finally:
+        if context is None:
+            shared_library.nmod_poly_clear(alpha)
+            shared_library.nmod_poly_clear(beta)
+        if r is not None:
+            shared_library.nmod_poly_clear(r)
 
     # The encrypted ballot is ev = (c, _v, _w, _c)
     # v, w = cipher
@@ -143,40 +249,144 @@ def cast(pk: Tuple[CommitmentKey, PublicKey, PublicKey],
     # with the encrypted_ballot and ballot_proof e can be reconstructed
 
     # Cleanup
-    shared_library.nmod_poly_clear(alpha)
-    shared_library.nmod_poly_clear(beta)
-    shared_library.nmod_poly_clear(r)
     clear_opening(d)
     clear_opening(d_r)
 
     return encrypted_ballot, ballot_proof
 
 
-def code(pk: tuple, ck: tuple, vvk: Commitment, ev: tuple, ballot_proof: tuple):
+def cast(pk: Tuple[CommitmentKey, PublicKey, PublicKey] | ElectionContext,
+         vck: Tuple[NMOD_POLY_TYPE, Commitment, PCRT_POLY_TYPE * WIDTH],
+         v: NMOD_POLY_TYPE):
     """
-    :param pk: public key (pk_C, pk_V, pk_R)
-    :param ck: code key (pk_C, pk_V, dk_R)
-    :param vvk: voter verification key (c_a)
-    :param ev: encrypted ballot (c, d, cipher, _c, u)
-    :param ballot_proof: ballot proof (z, c_r, e_r, lin_proof)
+    :param pk: public key (pk_C, pk_V, pk_R) or an election context holding it
+    :param vck: voter casting key (a, c_a, d_a)
+    :param v: vote
+    Safe to call from several threads in the thread-safe mode of the primitives (see primitives.set_thread_safe),
+    like code, code_batch and count. The proofs (sum_prover, lin_prover) then run under the lock of the primitives,
+    one thread at a time, so only the rest of cast runs in parallel
     """
-    final_result = True
+    return cast_online(pk, vck, v, precompute_cast(pk))
 
-    pk_C, pk_V, pk_R = pk
-    _, _, dk_R = ck
-    c, cipher, _c = ev
-    z, c_r, e_r, sum_proof = ballot_proof
-    c_a = vvk
 
+class CastPrecomputationPool:
+    """
+    A bounded pool of cast precomputations for one public key.
+
+    The pool can be filled up front (e.g. when a voter registers) with fill, or kept full by a
+    background thread with start. The shared library is not thread safe, so the refill thread and
+    CastPrecomputationPool.cast share the pool lock; do not call into the library by other means
+    while the background refill is running. In the thread-safe mode of the primitives (see
+    primitives.set_thread_safe) the lock only guards the pool itself.
+    """
+    def __init__(self, pk: Tuple[CommitmentKey, PublicKey, PublicKey], size: int):
+        self.pk = pk
+        self.size = size
+        self.lock = threading.RLock()
+        self.__precomputations = collections.deque()
+        self.__stop = threading.Event()
+        self.__thread = None
+
+    def __len__(self):
+        return len(self.__precomputations)
+
+    def fill(self, n: int = None):
+        """
+        Precomputes until the pool holds n precomputations (at most size, the default)
+        """
+        target = self.size if n is None else min(n, self.size)
+        while len(self.__precomputations) < target:
+            with self.__library_lock():
+                precomputation = precompute_cast(self.pk)
+            with self.lock:
+                self.__precomputations.append(precomputation)
+
+    def get(self) -> CastPrecomputation:
+        """
+        Takes a precomputation from the pool, computing one on the spot if the pool is empty
+        """
+        with self.lock:
+            if self.__precomputations:
+                return self.__precomputations.popleft()
+        with self.__library_lock():
+            return precompute_cast(self.pk)
+
+    def cast(self, vck: Tuple[NMOD_POLY_TYPE, Commitment, PCRT_POLY_TYPE * WIDTH], v: NMOD_POLY_TYPE):
+        with self.__library_lock():
+            return cast_online(self.pk, vck, v, self.get())
+
+    def __library_lock(self):
+        return contextlib.nullcontext() if primitives.get_primitives().thread_safe else self.lock
+
+    def start(self, poll_interval: float = 0.05):
+        """
+        Starts a daemon thread that keeps the pool full
+        """
+        if self.__thread is not None:
+            return
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.__refill, args=(poll_interval,), daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        if self.__thread is None:
+            return
+        self.__stop.set()
+        self.__thread.join()
+        self.__thread = None
+
+    def __refill(self, poll_interval: float):
+        while not self.__stop.is_set():
+            if len(self.__precomputations) < self.size:
+                self.fill(len(self.__precomputations) + 1)
+            else:
+                self.__stop.wait(poll_interval)
+
+    def clear(self):
+        self.stop()
+        with self.lock:
+            while self.__precomputations:
+                self.__precomputations.popleft().clear()
+
+
+def _code_constants(pk_C: CommitmentKey):
+    """
+    The key-dependent values shared by every call to _code: pk_C.B1 in the plaintext context and
+    alpha = beta = 1 for the sum proof
+    """
+    t = b1_to_fmpz(shared_library, pk_C.B1, primitives.commitment_scheme.scheme, primitives.vericrypt.context_p)
     alpha = NMOD_POLY_TYPE()
     shared_library.nmod_poly_init(alpha, MODP)
     shared_library.utils_nmod_poly_one(alpha)
     beta = NMOD_POLY_TYPE()
     shared_library.nmod_poly_init(beta, MODP)
     shared_library.utils_nmod_poly_one(beta)
+    return t, alpha, beta
+
+
+def _clear_code_constants(t, alpha, beta):
+    for i in range(WIDTH):
+        shared_library.fmpz_mod_poly_clear(t[i], primitives.vericrypt.context_p)
+    shared_library.nmod_poly_clear(alpha)
+    shared_library.nmod_poly_clear(beta)
+
+
+def _code(pk: tuple, ck: tuple, vvk: Commitment, ev: tuple, ballot_proof: tuple, constants: tuple,
+          arena: PolyArena):
+    """
+    The conversions of a ballot are taken from arena, inside a scope of the caller
+    """
+    final_result = True
+
+    pk_C, pk_V, pk_R = pk
+    _, _, dk_R = ck
+    c, cipher, _c = ev
+    z, c_r, e_r, sum_proof = ballot_proof
+    c_a = vvk
+    t, alpha, beta = constants
 
     # It verifies Π^sum_r
-    result = ProtocolSum.verifier(shared_library, *sum_proof, commitment_scheme.scheme,
+    result = ProtocolSum.verifier(shared_library, *sum_proof, primitives.commitment_scheme.scheme,
                                   c, c_a, c_r, pk_C,
                                   alpha, beta)
 
@@ -194,14 +404,14 @@ def code(pk: tuple, ck: tuple, vvk: Commitment, ev: tuple, ballot_proof: tuple):
     )
 
     # and then verifies (v, w, c, z)
-    t = b1_to_fmpz(shared_library, pk_C.B1, commitment_scheme.scheme, vericrypt.context_p)
-    u = c1_to_fmpz(shared_library, c.c1, commitment_scheme.scheme, vericrypt.context_p)
-    result = vericrypt.verify(e, t, u, pk_V)
+    u = c1_to_fmpz(shared_library, c.c1, primitives.commitment_scheme.scheme, primitives.vericrypt.context_p, arena)
+    result = primitives.vericrypt.verify(e, t, u, pk_V)
     final_result &= result
 
     # and e_r
-    u_r = c1_to_fmpz(shared_library, c_r.c1, commitment_scheme.scheme, vericrypt.context_p)
-    result = vericrypt.verify(e_r, t, u_r, pk_R)
+    u_r = c1_to_fmpz(shared_library, c_r.c1, primitives.commitment_scheme.scheme, primitives.vericrypt.context_p,
+                     arena)
+    result = primitives.vericrypt.verify(e_r, t, u_r, pk_R)
     final_result &= result
 
     # It then decrypts d_r ← e_r
@@ -209,66 +419,225 @@ def code(pk: tuple, ck: tuple, vvk: Commitment, ev: tuple, ballot_proof: tuple):
 
     # print_message_space(self.shared_library, d_r, self.vericrypt.context)
 
-    d_r = fmpz_to_opening(shared_library, fmpz_d_r, commitment_scheme.scheme)
+    d_r = fmpz_to_opening(shared_library, fmpz_d_r, primitives.commitment_scheme.scheme, arena)
+    for i in range(VECTOR):
+        shared_library.fmpz_mod_poly_clear(fmpz_d_r[i], primitives.vericrypt.context_p)
     # print_opening(self.shared_library, d_r_)
 
     # and recovers r from c_r and d_r
-    r = commitment_scheme.message_rec(c_r, pk_C, d_r)
+    r = primitives.commitment_scheme.message_rec(c_r, pk_C, d_r)
 
     return r, final_result
 
 
-def count(dk, encrypted_ballots):
+def code(pk: tuple | ElectionContext, ck: tuple | ElectionContext, vvk: Commitment, ev: tuple, ballot_proof: tuple):
+    """
+    :param pk: public key (pk_C, pk_V, pk_R) or an election context holding it
+    :param ck: code key (pk_C, pk_V, dk_R) or an election context holding it
+    :param vvk: voter verification key (c_a)
+    :param ev: encrypted ballot (c, d, cipher, _c, u)
+    :param ballot_proof: ballot proof (z, c_r, e_r, lin_proof)
+    """
+    return code_batch(pk, ck, [(vvk, ev, ballot_proof)])[0]
+
+
+def code_batch(pk: tuple | ElectionContext, ck: tuple | ElectionContext, items, workers: int = None) -> list[tuple]:
+    """
+    Runs Code on many ballots, converting the keys once for the whole batch
+    :param pk: public key (pk_C, pk_V, pk_R) or an election context holding it
+    :param ck: code key (pk_C, pk_V, dk_R) or an election context holding it
+    :param items: (vvk, ev, ballot_proof) tuples, as taken by code
+    :param workers: if greater than 1, the ballots are verified on that many processes with parallel.map_code,
+    each loading the keys once
+    :return: the (precode, verdict) of every item, in order
+    """
+    pk, context = unpack(pk, 'pk')
+    ck, _ = unpack(ck, 'ck')
+    if workers is not None and workers > 1:
+        from .parallel import map_code
+        return map_code(pk, ck, items, workers)
+
+    constants = context.code_constants if context is not None else _code_constants(pk[0])
+    # every ballot reuses the conversion workspaces of the previous one
+    arena = thread_arena()
+    results = []
+    for vvk, ev, ballot_proof in items:
+        with arena.scope():
+            results.append(_code(pk, ck, vvk, ev, ballot_proof, constants, arena))
+    if context is None:
+        _clear_code_constants(*constants)
+    return results
+
+
+def recover_vote(dk, c: Commitment, cipher: Ciphertext * VECTOR) -> (NMOD_POLY_TYPE, PCRT_POLY_TYPE * WIDTH):
+    """
+    Decrypts the opening d of a ballot and recovers the vote v from c and d
+    """
+    pk_C, dk_V = dk
+    fmpz_d = __decrypt_opening(dk_V, cipher)
+    d = fmpz_to_opening(shared_library, fmpz_d, primitives.commitment_scheme.scheme)
+    for i in range(VECTOR):
+        shared_library.fmpz_mod_poly_clear(fmpz_d[i], primitives.vericrypt.context_p)
+    # recover v from d and c
+    v = primitives.commitment_scheme.message_rec(c, pk_C, d)
+    return v, d
+
+
+def shard_ranges(length: int, shard_size: int) -> list[range]:
+    """
+    Splits the ballots of a question into consecutive shards of shard_size ballots (the last one may be smaller)
+    """
+    if shard_size <= 0:
+        raise ValueError("The shard size must be positive")
+    return [range(start, min(start + shard_size, length)) for start in range(0, length, shard_size)]
+
+
+def _copy_commitment(c: Commitment, copy: Commitment = None) -> Commitment:
+    if copy is None:
+        copy = Commitment()
+    for k in range(2):
+        shared_library.nmod_poly_init(copy.c1[k], MODP)
+        shared_library.nmod_poly_set(copy.c1[k], c.c1[k])
+        shared_library.nmod_poly_init(copy.c2[k], MODP)
+        shared_library.nmod_poly_set(copy.c2[k], c.c2[k])
+    return copy
+
+
+def _count_sharded(dk, encrypted_ballots, shard_size: int, workers: int = None):
+    """
+    Shuffles and proves every shard independently, on copies of the commitments so the shards do not
+    interfere with each other or with the caller's ballots
+    """
+    shards = [[encrypted_ballots[i] for i in shard] for shard in shard_ranges(len(encrypted_ballots), shard_size)]
+    shard_votes, shard_proofs = [], []
+
+    if workers is None or workers <= 1:
+        for shard in shards:
+            copies = [(_copy_commitment(c), cipher, e_c) for c, cipher, e_c in shard]
+            votes, proof = count(dk, copies)
+            for c, _, _ in copies:
+                shared_library.commit_free(ctypes.byref(c))
+            shard_votes.append(votes)
+            shard_proofs.append(proof)
+        return shard_votes, shard_proofs
+
+    from .parallel import map_count
+    for votes, proof in map_count(dk, shards, workers):
+        shard_votes.append(votes)
+        shard_proofs.append(proof)
+    return shard_votes, shard_proofs
+
+
+def count(dk, encrypted_ballots, workers: int = None, shard_size: int = None):
+    """
+    The shuffler decrypts every ballot, shuffles the votes and proves the shuffle of known values
+    :param dk: the decryption key (pk_C, dk_V) or an election context holding it
+    :param encrypted_ballots: the encrypted ballots (c, cipher, e_c)
+    :param workers: if greater than 1, decryption and message recovery run on that many processes with
+    parallel.map_decrypt (whole shards with parallel.map_count, when sharded)
+    :param shard_size: if not None, the ballots are split with shard_ranges and every shard is shuffled and proved
+    on its own, bounding the size of a proof. A vote is then only hidden among the ballots of its shard, so the
+    shard size is also the anonymity set of every voter
+    :return: the shuffled votes and the proof of shuffle, or the lists of both per shard when sharded
+    In the thread-safe mode of the primitives, the proof of shuffle (shuffle_prover) runs under their lock, one
+    thread at a time: counts of several threads only overlap outside of it. Use workers for parallel shards
+    """
+    dk, _ = unpack(dk, 'dk')
+    if shard_size is not None:
+        return _count_sharded(dk, encrypted_ballots, shard_size, workers)
+
     from .utils import random
     pk_C, dk_V = dk
+    length = len(encrypted_ballots)
 
     # chooses a random permutation π on {1, 2, . . . , lt}, sets vπ(i) = v′i,
-    permutation = [*range(len(encrypted_ballots))]
+    permutation = [*range(length)]
     random.shuffle(permutation)
 
-    votes = (NMOD_POLY_TYPE * len(encrypted_ballots))()
-    shuffled_votes = (NMOD_POLY_TYPE * len(encrypted_ballots))()
-    commits = (ctypes.POINTER(Commitment) * len(encrypted_ballots))()
-    randomness = (NMOD_POLY_TYPE * 2 * WIDTH * len(encrypted_ballots))()
+    votes = (NMOD_POLY_TYPE * length)()
+    shuffled_votes = (NMOD_POLY_TYPE * length)()
+    commits = (ctypes.POINTER(Commitment) * length)()
+    randomness = (NMOD_POLY_TYPE * 2 * WIDTH * length)()
 
     for i, encrypted_ballot in enumerate(encrypted_ballots):
-        (c, cipher, _c) = encrypted_ballot
-        fmpz_d = __decrypt_opening(dk_V, cipher)
-        d = fmpz_to_opening(shared_library, fmpz_d, commitment_scheme.scheme)
-        # recover v from d and c
-        v = commitment_scheme.message_rec(c, pk_C, d)
+        (c, _, _) = encrypted_ballot
+        commits[i] = ctypes.pointer(c)
 
+    if workers is not None and workers > 1:
+        from .parallel import map_decrypt
+        recovered = map_decrypt(dk, [(c, cipher) for c, cipher, _ in encrypted_ballots], workers)
+    else:
+        recovered = (recover_vote(dk, c, cipher) for c, cipher, _ in encrypted_ballots)
+
+    for i, (v, d) in enumerate(recovered):
         # sets v'(i) = vi
         shared_library.nmod_poly_init(votes[i], MODP)
         shared_library.nmod_poly_set(votes[i], v)
 
-        # sets vπ(i) = vi
-        shared_library.nmod_poly_init(shuffled_votes[permutation[i]], MODP)
-        shared_library.nmod_poly_set(shuffled_votes[permutation[i]], v)
-
         # sets randomness
         for j in range(WIDTH):
             for k in range(2):
                 shared_library.nmod_poly_init(randomness[i][j][k], MODP)
                 shared_library.nmod_poly_set(randomness[i][j][k], d[j][k])
 
-        commits[i] = ctypes.pointer(c)
+        shared_library.nmod_poly_clear(v)
+        clear_opening(d)
+
+    # sets vπ(i) = vi
+    for i in range(length):
+        shared_library.nmod_poly_init(shuffled_votes[permutation[i]], MODP)
+        shared_library.nmod_poly_set(shuffled_votes[permutation[i]], votes[i])
 
     # and creates a proof of shuffle of known values Πc.
-    proof_of_shuffle = Shuffle.prover(shared_library, commitment_scheme.scheme, commits,
-                                      votes, shuffled_votes, randomness, pk_C, flint_rand,
-                                      len(encrypted_ballots))
+    proof_of_shuffle = Shuffle.prover(shared_library, primitives.commitment_scheme.scheme, commits,
+                                      votes, shuffled_votes, randomness, pk_C, primitives.flint_rand,
+                                      length)
 
     # It outputs v1, v2,..., vlt and Πc
     return shuffled_votes, proof_of_shuffle
 
 
-def verify(pk, encrypted_ballots, ballots, count_proof):
+def _verify_shard(pk, encrypted_ballots, ballots, count_proof):
+    """
+    Verifies one shard of a sharded count. The prover shifted copies of the commitments by the rho of the
+    shard, so the verifier does the same on its own copies
+    """
+    length = len(encrypted_ballots)
+    commits = (Commitment * length)()
+    for i, (c, _, _) in enumerate(encrypted_ballots):
+        _copy_commitment(c, commits[i])
+    Shuffle.shift_by_rho(shared_library, primitives.commitment_scheme.scheme, commits, count_proof[7], length,
+                         is_ptr=False)
+
+    result = verify(pk, [(commits[i], None, None) for i in range(length)], ballots, count_proof)
+
+    for i in range(length):
+        shared_library.commit_free(ctypes.byref(commits[i]))
+    return result
+
+
+def verify(pk, encrypted_ballots, ballots, count_proof, shard_size: int = None, workers: int = None):
     """
     It verifies that Πc is a correct proof of shuffle of known values for
     c1, c2, ..., clt and v1, v2, ..., vlt . It outputs 1 if verification holds, otherwise
     it outputs 0
+    :param shard_size: the shard size given to count, in which case ballots and count_proof are the lists of
+    shuffled votes and proofs per shard
+    :param workers: if greater than 1, the shards of a sharded count are verified on that many processes with
+    parallel.map_verify
     """
+    pk, _ = unpack(pk, 'pk')
+    if shard_size is not None:
+        shards = shard_ranges(len(encrypted_ballots), shard_size)
+        if len(shards) != len(ballots) or len(shards) != len(count_proof):
+            return False
+        if workers is not None and workers > 1:
+            from .parallel import map_verify
+            return all(map_verify(pk, [([encrypted_ballots[i] for i in shard], ballots[k], count_proof[k])
+                                       for k, shard in enumerate(shards)], workers))
+        return all(_verify_shard(pk, [encrypted_ballots[i] for i in shard], ballots[k], count_proof[k])
+                   for k, shard in enumerate(shards))
+
     pk_C, pk_V, pk_R = pk
     y, _y, t, _t, u, d, s, rho = count_proof
     commits = (ctypes.POINTER(Commitment) * len(encrypted_ballots))()
@@ -277,7 +646,7 @@ def verify(pk, encrypted_ballots, ballots, count_proof):
         commits[i] = ctypes.pointer(c)
 
     return Shuffle.verifier(shared_library, y, _y, t, _t, u,
-                            commitment_scheme.scheme, d, s,
+                            primitives.commitment_scheme.scheme, d, s,
                             commits, ballots, rho, pk_C, len(encrypted_ballots))
 
 
@@ -296,7 +665,7 @@ if __name__ == "__main__":
         vvk, vck, f = register(pk)
         vote = NMOD_POLY_TYPE()
         shared_library.nmod_poly_init(vote, MODP)
-        shared_library.nmod_poly_randtest(vote, flint_rand, DEGREE)
+        shared_library.nmod_poly_randtest(vote, primitives.flint_rand, DEGREE)
         encrypted_ballot, ballot_proof = cast(pk, vck, vote)
 
         serialized_encrypted_ballot = serialize_encrypted_ballot(encrypted_ballot)
@@ -306,8 +675,8 @@ if __name__ == "__main__":
         proof = deserialize_ballot_proof(serialized_proof)
         evs.append(serialized_encrypted_ballot)
         proofs.append(serialized_proof)
-        assert ev_equals(shared_library, encrypted_ballot, ev, vericrypt.context)
-        assert pv_equals(shared_library, ballot_proof, proof, vericrypt.context)
+        assert ev_equals(shared_library, encrypted_ballot, ev, primitives.vericrypt.context)
+        assert pv_equals(shared_library, ballot_proof, proof, primitives.vericrypt.context)
 
     der_dk = serialize_dk(dk)
     dk = deserialize_dk(der_dk)
@@ -320,8 +689,8 @@ if __name__ == "__main__":
     shared_library.nmod_poly_init(t0, MODP)
     shared_library.nmod_poly_init(t1, MODP)
 
-    shared_library.nmod_poly_rem(t0, s_proof[7], commitment_scheme.scheme[0].irred[0])
-    shared_library.nmod_poly_rem(t1, s_proof[7], commitment_scheme.scheme[0].irred[1])
+    shared_library.nmod_poly_rem(t0, s_proof[7], primitives.commitment_scheme.scheme[0].irred[0])
+    shared_library.nmod_poly_rem(t1, s_proof[7], primitives.commitment_scheme.scheme[0].irred[1])
     for ev in evs_des:
         shared_library.nmod_poly_sub(ev[0].c2[0], ev[0].c2[0], t0)
         shared_library.nmod_poly_sub(ev[0].c2[1], ev[0].c2[1], t1)
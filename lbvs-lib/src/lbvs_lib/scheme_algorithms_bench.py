@@ -2,12 +2,17 @@ from .classes import NMOD_POLY_TYPE
 from .compile import shared_library, MODP, DEGREE
 from .cleanup import clear_ev_and_proof, clear_voter, clear_keys
 from .shuffle import Shuffle
-from .scheme_algorithms import (flint_rand, setup, register,
+from . import primitives
+from .scheme_algorithms import (setup, register,
                                cast, code, count, verify)
+from .parallel import map_cast, map_code
 from .logger import LOGGER, VERBOSE
 
 
-def benchmark(n_voters):
+def benchmark(n_voters, workers: int = None):
+    """
+    :param workers: if greater than 1, cast, code and count run on that many processes (see parallel)
+    """
     import timeit
     LOGGER.info("RUNNING SETUP ALGORITHM")
     setup_time_1 = timeit.default_timer()
@@ -31,36 +36,62 @@ def benchmark(n_voters):
     total_cast_time = 0
     total_code_time = 0
     LOGGER.info(f"RUNNING CAST AND CODE ALGORITHMS FOR {n_voters} VOTERS")
-    for voter_verification_key, voter_casting_key, func in voters:
-        vote = NMOD_POLY_TYPE()
-        shared_library.nmod_poly_init(vote, MODP)
-        shared_library.nmod_poly_randtest(vote, flint_rand, DEGREE)
+    if workers is not None and workers > 1:
+        votes = []
+        for _ in voters:
+            vote = NMOD_POLY_TYPE()
+            shared_library.nmod_poly_init(vote, MODP)
+            shared_library.nmod_poly_randtest(vote, primitives.flint_rand, DEGREE)
+            votes.append(vote)
 
         cast_time_1 = timeit.default_timer()
-        ecn_vote, vote_proof = cast(public_key, voter_casting_key, vote)
-        cast_time_2 = timeit.default_timer()
-        total_cast_time += cast_time_2 - cast_time_1
-
-        enc_ballots.append(ecn_vote)
-        proofs.append(vote_proof)
+        ballots = map_cast(public_key, [(vck, vote) for (_, vck, _), vote in zip(voters, votes)], workers)
+        total_cast_time = timeit.default_timer() - cast_time_1
 
         code_time_1 = timeit.default_timer()
-        pre_code, result = code(public_key, code_key, voter_verification_key, ecn_vote, vote_proof)
-        code_time_2 = timeit.default_timer()
-        total_code_time += code_time_2 - code_time_1
-
-        if not (result and shared_library.nmod_poly_equal(func(vote), pre_code)):
-            LOGGER.error("Code failed")
-        shared_library.nmod_poly_clear(vote)
-        shared_library.nmod_poly_clear(pre_code)
-        clear_voter((voter_verification_key, voter_casting_key, func))
+        codes = map_code(public_key, code_key, [(vvk, ev, proof) for (vvk, _, _), (ev, proof) in zip(voters, ballots)],
+                         workers)
+        total_code_time = timeit.default_timer() - code_time_1
+
+        for voter, vote, (ev, proof), (pre_code, result) in zip(voters, votes, ballots, codes):
+            if not (result and shared_library.nmod_poly_equal(voter[2](vote), pre_code)):
+                LOGGER.error("Code failed")
+            enc_ballots.append(ev)
+            proofs.append(proof)
+            shared_library.nmod_poly_clear(vote)
+            shared_library.nmod_poly_clear(pre_code)
+            clear_voter(voter)
+    else:
+        for voter_verification_key, voter_casting_key, func in voters:
+            vote = NMOD_POLY_TYPE()
+            shared_library.nmod_poly_init(vote, MODP)
+            shared_library.nmod_poly_randtest(vote, primitives.flint_rand, DEGREE)
+
+            cast_time_1 = timeit.default_timer()
+            ecn_vote, vote_proof = cast(public_key, voter_casting_key, vote)
+            cast_time_2 = timeit.default_timer()
+            total_cast_time += cast_time_2 - cast_time_1
+
+            enc_ballots.append(ecn_vote)
+            proofs.append(vote_proof)
+
+            code_time_1 = timeit.default_timer()
+            pre_code, result = code(public_key, code_key, voter_verification_key, ecn_vote, vote_proof)
+            code_time_2 = timeit.default_timer()
+            total_code_time += code_time_2 - code_time_1
+
+            if not (result and shared_library.nmod_poly_equal(func(vote), pre_code)):
+                LOGGER.error("Code failed")
+            shared_library.nmod_poly_clear(vote)
+            shared_library.nmod_poly_clear(pre_code)
+            clear_voter((voter_verification_key, voter_casting_key, func))
 
     LOGGER.info(f"Cast time: {total_cast_time}")
     LOGGER.info(f"Code time: {total_code_time}")
 
     LOGGER.info(f"RUNNING SHUFFLE ALGORITHM FOR {n_voters} VOTERS")
     count_time_1 = timeit.default_timer()
-    dec_ballots, shuffle_proof = count(decryption_key, enc_ballots)
+    dec_ballots, shuffle_proof = count(decryption_key, enc_ballots, workers=workers)
     count_time_2 = timeit.default_timer()
 
     LOGGER.info(f"Count time: {count_time_2 - count_time_1}")
@@ -1,183 +1,134 @@
-from .compile import WIDTH, DIM, VECTOR, shared_library
-from .primitives import primitives, vericrypt
+from .compile import WIDTH, DIM, VECTOR, MODP, shared_library
+from . import primitives
 from .classes import ctypes, PCRT_POLY_TYPE, NMOD_POLY_TYPE, FMPZ_MOD_POLY_T, PrivateKey, PublicKey, Ciphertext, \
-    Veritext, Commitment, CommitmentKey, OPENING_TYPE
-from .utils import nmod_poly_to_string, fmpz_mod_poly_to_string, nmod_poly_from_string, fmpz_mod_poly_from_string
-
-CLASSES = {}
-STRUCTS = [PublicKey, PrivateKey, Ciphertext, Veritext, CommitmentKey, Commitment]
-FIELDS_STRUCTS = {}
-for struct in STRUCTS:
-    fields = frozenset(f[0] for f in struct._fields_)
-    FIELDS_STRUCTS[fields] = struct
-
-
-def recursive_deserialize(obj, obj_structure, depth=0):
-    if isinstance(obj_structure[depth], int):
-        ret_l = []
-        for i in range(obj_structure[depth]):
-            ret_l.append(recursive_deserialize(obj[i], obj_structure, depth + 1))
-        return ret_l
-
-    if isinstance(obj_structure[depth], str):
-        deserializer = CLASSES[ctypes.Structure.__name__][1]
-    else:
-        deserializer = CLASSES[obj_structure[depth].__name__][1]
-    return deserializer.deserialize(obj)
-
+    Veritext, Commitment, CommitmentKey, OPENING_TYPE, ctype_shape
+from .utils import nmod_poly_to_string, fmpz_mod_poly_to_string
 
-def recursive_assign(c_obj, items_list):
-    for i, item in enumerate(items_list):
-        if isinstance(item, list):
-            recursive_assign(c_obj[i], item)
-        else:
-            c_obj[i] = item
+"""
+Serialization plans, compiled once per ctypes type.
 
+A plan knows the shape of its type and, for fmpz_mod polynomials, which context to use, so (de)serializing only
+walks the data: values are parsed straight into the preallocated ctypes object. The wire format is the one of
+the previous reflective serializer: structures are dicts of their fields, arrays are nested lists and
+polynomials are FLINT strings.
+"""
 
-def get_serializer(obj):
-    for clazz in CLASSES.values():
-        if isinstance(obj, clazz[0]):
-            return clazz[1]
-    return None
+CONTEXTS = {
+    'q': lambda: primitives.vericrypt.context,
+    'p': lambda: primitives.vericrypt.context_p,
+}
 
+# fields read in the plaintext context; everything else, and every field on write, uses the ciphertext context
+FIELD_CONTEXTS = {
+    (Veritext, "c"): 'p',
+    (Veritext, "u"): 'p',
+}
 
-def serialize(obj):
-    return get_serializer(obj).serialize(obj)
 
+class NmodPolyPlan:
+    def serialize(self, poly):
+        return nmod_poly_to_string(shared_library, poly)
 
-def get_deserializer_struct(obj):
-    keys = frozenset(obj.keys())
-    if keys in FIELDS_STRUCTS:
-        return FIELDS_STRUCTS[keys]
-    return None
+    def fill(self, poly, s):
+        shared_library.nmod_poly_init(poly, MODP)
+        shared_library.utils_nmod_poly_from_string(poly, s.encode('ascii'))
 
 
-class Serializer:
-    def __init__(self, clazz):
-        self.__clazz = clazz
-        CLASSES[clazz.__name__] = (clazz, self)
+class FmpzModPolyPlan:
+    def __init__(self, context='q', serialize_context='q'):
+        self.context = CONTEXTS[context]
+        self.serialize_context = CONTEXTS[serialize_context]
 
-    def serialize(self, obj):
-        raise NotImplementedError
+    def serialize(self, poly):
+        return fmpz_mod_poly_to_string(shared_library, poly, self.serialize_context())
 
-    def deserialize(self, obj):
-        raise NotImplementedError
+    def fill(self, poly, s):
+        shared_library.fmpz_mod_poly_init(poly, self.context())
+        shared_library.utils_fmpz_mod_poly_from_string(poly, s.encode('ascii'))
 
 
-class ArraySerializer(Serializer):
-    def __init__(self):
-        super().__init__(ctypes.Array)
-
-    def serialize(self, obj):
-        list = []
-        for item in obj:
-            serializer = get_serializer(item)
-            if not serializer:
-                raise Exception(f"No implementation for {item.__class__.__name__}")
-            list.append(serializer.serialize(item))
+class ArrayPlan:
+    def __init__(self, shape: tuple[int, ...], element):
+        self.shape = shape
+        self.element = element
 
-        return list
+    def __serialize(self, obj, depth):
+        if depth == len(self.shape):
+            return self.element.serialize(obj)
+        return [self.__serialize(obj[i], depth + 1) for i in range(self.shape[depth])]
 
-
-class NmodPolySerializer(Serializer):
-    def __init__(self):
-        super().__init__(NMOD_POLY_TYPE)
+    def __fill(self, obj, data, depth):
+        if depth == len(self.shape):
+            self.element.fill(obj, data)
+            return
+        for i in range(self.shape[depth]):
+            self.__fill(obj[i], data[i], depth + 1)
 
     def serialize(self, obj):
-        return nmod_poly_to_string(shared_library, obj)
-
-    def deserialize(self, obj):
-        return nmod_poly_from_string(shared_library, obj)
+        return self.__serialize(obj, 0)
 
+    def fill(self, obj, data):
+        self.__fill(obj, data, 0)
 
-class FmpzModPolySerializer(Serializer):
-    context = vericrypt.context
 
-    def __init__(self):
-        super().__init__(FMPZ_MOD_POLY_T)
+class StructPlan:
+    def __init__(self, struct):
+        self.struct = struct
+        self.fields = [(name, compile_plan(ctype, FIELD_CONTEXTS.get((struct, name), 'q')))
+                       for name, ctype in struct._fields_]
 
     def serialize(self, obj):
-        return fmpz_mod_poly_to_string(shared_library, obj, FmpzModPolySerializer.context)
-
-    def deserialize(self, obj):
-        return fmpz_mod_poly_from_string(shared_library, obj, FmpzModPolySerializer.context)
-
-
-def deserialize_c_obj(field, obj):
-    if isinstance(field, tuple):
-        field_class = field[1]
-    else:
-        field_class = field
-    aux = field_class.__name__.split("_")
-    i = 0
-    objects = []
-    while i < len(aux) - 1:
-        if aux[i] == "Array":
-            objects.append(int(aux[i + 1]))
-            i += 1
-        else:
-            objects.append(aux[i])
-        i += 1
-    if objects[0] == 'FmpzModPoly':
-        objects.pop(0)
-        objects.pop(0)
-        objects.insert(0, FMPZ_MOD_POLY_T)
-    elif objects[0] == 'NmodPoly':
-        objects.pop(0)
-        objects.pop(0)
-        objects.insert(0, NMOD_POLY_TYPE)
-    objects.reverse()
-    ret = recursive_deserialize(obj, objects)
-    if isinstance(ret, list):
-        c_obj = field_class()
-        recursive_assign(c_obj, ret)
+        return {name: plan.serialize(getattr(obj, name)) for name, plan in self.fields}
+
+    def fill(self, obj, data):
+        for name, plan in self.fields:
+            plan.fill(getattr(obj, name), data[name])
+
+
+PLANS = {}
+
+
+def compile_plan(ctype, context='q', serialize_context='q'):
+    """
+    Returns the (cached) serialization plan of a ctypes type
+    :param ctype: a polynomial type, one of the supported structures, or a nested array of them
+    :param context: the context fmpz_mod polynomials are read in
+    :param serialize_context: the context fmpz_mod polynomials are written in
+    """
+    key = (ctype, context, serialize_context)
+    if key in PLANS:
+        return PLANS[key]
+
+    shape, element = ctype_shape(ctype)
+    if element is NMOD_POLY_TYPE:
+        plan = NmodPolyPlan()
+    elif element is FMPZ_MOD_POLY_T:
+        plan = FmpzModPolyPlan(context, serialize_context)
+    elif issubclass(element, ctypes.Structure):
+        plan = StructPlan(element)
     else:
-        c_obj = ret
-    return c_obj
-
+        raise TypeError(f"No serialization plan for {element.__name__}")
+    if shape:
+        plan = ArrayPlan(shape, plan)
 
-class StructSerializer(Serializer):
-    def __init__(self):
-        super().__init__(ctypes.Structure)
-
-    def serialize(self, obj):
-        json_obj = {}
-        for field in obj._fields_:
-            serializer = get_serializer(getattr(obj, field[0]))
-            if not serializer:
-                raise Exception(f"No implementation for {field[0].__class__.__name__}")
-            json_obj[field[0]] = serializer.serialize(getattr(obj, field[0]))
-        return json_obj
+    PLANS[key] = plan
+    return plan
 
-    def deserialize(self, json_obj):
-        struct = get_deserializer_struct(json_obj)
-        if not struct:
-            raise Exception(f"No implementation for {json_obj.keys()}")
 
-        params = {}
-        for field in struct._fields_:
-            field_name = field[0]
-            if (field_name == "u" or field_name == "c") and struct == Veritext:
-                FmpzModPolySerializer.context = vericrypt.context_p
-            c_obj = deserialize_c_obj(field, json_obj[field_name])
-            FmpzModPolySerializer.context = vericrypt.context
+def serialize(obj, **contexts):
+    return compile_plan(type(obj), **contexts).serialize(obj)
 
-            params[field_name] = c_obj
 
-        return struct(**params)
-
-
-struct_serializer = StructSerializer()
-NmodPolySerializer()
-FmpzModPolySerializer()
-# needs to come last place in the assigment (nmod and fmpz are also arrays types, but we treat them differently)
-ArraySerializer()
+def deserialize(ctype, data, **contexts):
+    obj = ctype()
+    compile_plan(ctype, **contexts).fill(obj, data)
+    return obj
 
 
 def deserialize_pk(data):
-    pk_C = struct_serializer.deserialize(data['pk_C'])
-    pk_V = struct_serializer.deserialize(data['pk_V'])
-    pk_R = struct_serializer.deserialize(data['pk_R'])
+    pk_C = deserialize(CommitmentKey, data['pk_C'])
+    pk_V = deserialize(PublicKey, data['pk_V'])
+    pk_R = deserialize(PublicKey, data['pk_R'])
 
     return pk_C, pk_V, pk_R
 
@@ -192,8 +143,8 @@ def serialize_pk(obj):
 
 
 def deserialize_dk(data):
-    pk_C = struct_serializer.deserialize(data['pk_C'])
-    dk_V = struct_serializer.deserialize(data['dk_V'])
+    pk_C = deserialize(CommitmentKey, data['pk_C'])
+    dk_V = deserialize(PrivateKey, data['dk_V'])
 
     return pk_C, dk_V
 
@@ -208,9 +159,9 @@ def serialize_dk(obj):
 
 
 def deserialize_ck(data):
-    pk_C = struct_serializer.deserialize(data['pk_C'])
-    pk_V = struct_serializer.deserialize(data['pk_V'])
-    dk_R = struct_serializer.deserialize(data['dk_R'])
+    pk_C = deserialize(CommitmentKey, data['pk_C'])
+    pk_V = deserialize(PublicKey, data['pk_V'])
+    dk_R = deserialize(PrivateKey, data['dk_R'])
 
     return pk_C, pk_V, dk_R
 
@@ -226,19 +177,19 @@ def serialize_ck(obj):
 
 
 def deserialize_vvk(data):
-    c_a = struct_serializer.deserialize(data)
+    c_a = deserialize(Commitment, data)
     return c_a
 
 
 def serialize_vvk(data):
-    c_a = struct_serializer.serialize(data)
+    c_a = serialize(data)
     return c_a
 
 
 def deserialize_vck(data):
-    a = deserialize_c_obj(NMOD_POLY_TYPE, data['a'])
+    a = deserialize(NMOD_POLY_TYPE, data['a'])
     c_a = deserialize_vvk(data['c_a'])
-    d_a = deserialize_c_obj(PCRT_POLY_TYPE * WIDTH, data['d_a'])
+    d_a = deserialize(PCRT_POLY_TYPE * WIDTH, data['d_a'])
 
     return a, c_a, d_a
 
@@ -254,9 +205,9 @@ def serialize_vck(data):
 
 
 def deserialize_encrypted_ballot(data):
-    c = struct_serializer.deserialize(data['c'])
-    cipher = deserialize_c_obj(Ciphertext * WIDTH, data['cipher'])
-    e_c = deserialize_c_obj(FMPZ_MOD_POLY_T, data['e_c'])
+    c = deserialize(Commitment, data['c'])
+    cipher = deserialize(Ciphertext * VECTOR, data['cipher'])
+    e_c = deserialize(FMPZ_MOD_POLY_T, data['e_c'])
 
     return c, cipher, e_c
 
@@ -272,13 +223,13 @@ def serialize_encrypted_ballot(data):
 
 
 def deserialize_sum_proof(data):
-    y1 = deserialize_c_obj(NMOD_POLY_TYPE * 2 * WIDTH, data['y1'])
-    y2 = deserialize_c_obj(NMOD_POLY_TYPE * 2 * WIDTH, data['y2'])
-    y3 = deserialize_c_obj(NMOD_POLY_TYPE * 2 * WIDTH, data['y3'])
-    t1 = deserialize_c_obj(NMOD_POLY_TYPE * 2, data['t1'])
-    t2 = deserialize_c_obj(NMOD_POLY_TYPE * 2, data['t2'])
-    t3 = deserialize_c_obj(NMOD_POLY_TYPE * 2, data['t3'])
-    u = deserialize_c_obj(NMOD_POLY_TYPE * 2, data['u'])
+    y1 = deserialize(NMOD_POLY_TYPE * 2 * WIDTH, data['y1'])
+    y2 = deserialize(NMOD_POLY_TYPE * 2 * WIDTH, data['y2'])
+    y3 = deserialize(NMOD_POLY_TYPE * 2 * WIDTH, data['y3'])
+    t1 = deserialize(NMOD_POLY_TYPE * 2, data['t1'])
+    t2 = deserialize(NMOD_POLY_TYPE * 2, data['t2'])
+    t3 = deserialize(NMOD_POLY_TYPE * 2, data['t3'])
+    u = deserialize(NMOD_POLY_TYPE * 2, data['u'])
 
     return y1, y2, y3, t1, t2, t3, u
 
@@ -297,16 +248,16 @@ def serialize_sum_proof(data):
     }
 
 def deserialize_ballot_proof(data):
-    r = deserialize_c_obj(FMPZ_MOD_POLY_T * 2 * DIM * VECTOR, data['z']['r'])
-    e = deserialize_c_obj(FMPZ_MOD_POLY_T * 2 * DIM * VECTOR, data['z']['e'])
-    e_ = deserialize_c_obj(FMPZ_MOD_POLY_T * 2 * VECTOR, data['z']['e_'])
-    u = deserialize_c_obj(FMPZ_MOD_POLY_T * VECTOR, data['z']['u'])
+    r = deserialize(FMPZ_MOD_POLY_T * 2 * DIM * VECTOR, data['z']['r'])
+    e = deserialize(FMPZ_MOD_POLY_T * 2 * DIM * VECTOR, data['z']['e'])
+    e_ = deserialize(FMPZ_MOD_POLY_T * 2 * VECTOR, data['z']['e_'])
+    u = deserialize(FMPZ_MOD_POLY_T * VECTOR, data['z']['u'])
 
     z = (r, e, e_, u)
 
-    c_r = struct_serializer.deserialize(data['c_r'])
+    c_r = deserialize(Commitment, data['c_r'])
 
-    e_r = struct_serializer.deserialize(data['e_r'])
+    e_r = deserialize(Veritext, data['e_r'])
 
     proof = deserialize_sum_proof(data['proof'])
 
@@ -316,16 +267,12 @@ def deserialize_ballot_proof(data):
 def serialize_z(z):
     r, e, e_, u = z
 
-    z = {
+    return {
         "r": serialize(r),
         "e": serialize(e),
         "e_": serialize(e_),
+        "u": serialize(u, serialize_context='p')
     }
-    FmpzModPolySerializer.context = vericrypt.context_p
-    z['u'] = serialize(u)
-    FmpzModPolySerializer.context = vericrypt.context
-
-    return z
 
 
 def serialize_ballot_proof(data):
@@ -341,14 +288,14 @@ def serialize_ballot_proof(data):
 
 def deserialize_shuffle_proof(data):
     length = len(data['y'])
-    d = deserialize_c_obj(Commitment * length, data['d'])
-    y = deserialize_c_obj(OPENING_TYPE * length, data['y'])
-    _y = deserialize_c_obj(OPENING_TYPE * length, data['_y'])
-    t = deserialize_c_obj(PCRT_POLY_TYPE * length, data['t'])
-    _t = deserialize_c_obj(PCRT_POLY_TYPE * length, data['_t'])
-    u = deserialize_c_obj(PCRT_POLY_TYPE * length, data['u'])
-    s = deserialize_c_obj(NMOD_POLY_TYPE * length, data['s'])
-    rho = deserialize_c_obj(NMOD_POLY_TYPE, data['rho'])
+    d = deserialize(Commitment * length, data['d'])
+    y = deserialize(OPENING_TYPE * length, data['y'])
+    _y = deserialize(OPENING_TYPE * length, data['_y'])
+    t = deserialize(PCRT_POLY_TYPE * length, data['t'])
+    _t = deserialize(PCRT_POLY_TYPE * length, data['_t'])
+    u = deserialize(PCRT_POLY_TYPE * length, data['u'])
+    s = deserialize(NMOD_POLY_TYPE * length, data['s'])
+    rho = deserialize(NMOD_POLY_TYPE, data['rho'])
 
     return y, _y, t, _t, u, d, s, rho
 
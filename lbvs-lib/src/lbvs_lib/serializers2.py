@@ -1,10 +1,79 @@
+import base64
 from typing import Any
 
-from .primitives import primitives
+import numpy as np
 
 from .classes import *
-from .primitives import vericrypt
-from .utils import nmod_poly_to_string, fmpz_mod_poly_to_string, fmpz_mod_poly_from_string, nmod_poly_from_string
+from . import primitives
+from .utils import nmod_poly_to_string, fmpz_mod_poly_to_string, fmpz_mod_poly_from_string, nmod_poly_from_string, \
+    fmpz_to_string
+from .npview import INLINE_BITS, as_ndarray, fill_from_ndarray, fmpz_as_ndarray, fmpz_fill_from_ndarray
+from .layouts import PK, CK, DK, VVK, VCK, ENCRYPTED_BALLOT, SUM_PROOF, BALLOT_PROOF, SHUFFLE_PROOF
+from .owned import own
+
+# MODP fits in 32 bits, so the 'bin' repr packs every nmod coefficient as a little-endian uint32
+NMOD_BIN_DTYPE = np.dtype('<u4')
+
+
+def nmod_poly_to_bytes(poly: NMOD_POLY_TYPE) -> bytes:
+    """
+    The coefficients of an nmod polynomial as little-endian uint32, lowest degree first
+    """
+    return as_ndarray(poly).astype(NMOD_BIN_DTYPE).tobytes()
+
+
+def nmod_poly_from_bytes(poly: NMOD_POLY_TYPE, data):
+    fill_from_ndarray(poly, np.frombuffer(data, dtype=NMOD_BIN_DTYPE))
+
+
+def fmpz_coeff_width(ctx) -> int:
+    """
+    Number of bytes needed for a coefficient reduced modulo the modulus of ctx
+    """
+    return (shared_library.fmpz_bits(ctx[0].n) + 7) // 8
+
+
+def fmpz_mod_poly_to_bytes(poly: FMPZ_MOD_POLY_T, ctx) -> bytes:
+    """
+    The coefficients of an fmpz_mod polynomial as little-endian integers of fmpz_coeff_width(ctx) bytes
+    """
+    width = fmpz_coeff_width(ctx)
+    if shared_library.fmpz_bits(ctx[0].n) > INLINE_BITS:
+        # residues of 2 ** 62 and above are mpz pointers, read through the library
+        length = shared_library.fmpz_mod_poly_length(poly)
+        fmpz = FMPZ_T()
+        shared_library.fmpz_init(fmpz)
+        data = bytearray()
+        for i in range(length):
+            shared_library.fmpz_mod_poly_get_coeff_fmpz(fmpz, poly, i, ctx)
+            data += int(fmpz_to_string(shared_library, fmpz, 16), 16).to_bytes(width, 'little')
+        shared_library.fmpz_clear(fmpz)
+        return bytes(data)
+
+    view = fmpz_as_ndarray(poly)
+    if view.size and int(view.max()) >> (8 * width):
+        raise ValueError("Coefficients are not reduced modulo the context modulus")
+    coeffs = view.astype('<u8').view(np.uint8).reshape(-1, 8)
+    return coeffs[:, :width].tobytes()
+
+
+def fmpz_mod_poly_from_bytes(poly: FMPZ_MOD_POLY_T, data, ctx):
+    width = fmpz_coeff_width(ctx)
+    if shared_library.fmpz_bits(ctx[0].n) > INLINE_BITS:
+        shared_library.fmpz_mod_poly_zero(poly, ctx)
+        fmpz = FMPZ_T()
+        shared_library.fmpz_init(fmpz)
+        for i in range(len(data) // width):
+            coeff = int.from_bytes(data[i * width:(i + 1) * width], 'little')
+            shared_library.fmpz_set_str(fmpz, format(coeff, 'x').encode('ascii'), 16)
+            shared_library.fmpz_mod_poly_set_coeff_fmpz(poly, i, fmpz, ctx)
+        shared_library.fmpz_clear(fmpz)
+        return
+
+    coeffs = np.zeros((len(data) // width, 8), dtype=np.uint8)
+    coeffs[:, :width] = np.frombuffer(data, dtype=np.uint8).reshape(-1, width)
+    fmpz_fill_from_ndarray(poly, coeffs.view('<i8').ravel(), ctx)
+
 
 class NmodRepr:
 
@@ -29,6 +98,12 @@ class NmodRepr:
         for coeff in s:
             shared_library.nmod_poly_set_coeff_ui(poly, coeff[0], coeff[1])
 
+    def bin_poly_serialize(self, poly):
+        return base64.b64encode(nmod_poly_to_bytes(poly)).decode('ascii')
+
+    def bin_poly_deserialize(self, poly, s):
+        nmod_poly_from_bytes(poly, base64.b64decode(s))
+
     def __init__(self, type='str'):
         self.type = type
         if type == 'list':
@@ -37,6 +112,11 @@ class NmodRepr:
         elif type == 'str':
             self.serialize = self.str_poly_serialize
             self.deserialize = self.str_poly_deserialize
+        elif type == 'bin':
+            self.serialize = self.bin_poly_serialize
+            self.deserialize = self.bin_poly_deserialize
+        else:
+            raise ValueError(f"Unknown representation {type}")
 
 
 class FmpzRepr:
@@ -54,9 +134,9 @@ class FmpzRepr:
         shared_library.fmpz_init(fmpz)
         for i in range(length):
             shared_library.fmpz_mod_poly_get_coeff_fmpz(fmpz, poly, i, ctx)
-            coeff = shared_library.fmpz_get_str(None, 10, fmpz)
-            if coeff != b'0':
-                list_of_coeffs.append([i, coeff.decode('ascii')])
+            coeff = fmpz_to_string(shared_library, fmpz)
+            if coeff != '0':
+                list_of_coeffs.append([i, coeff])
         shared_library.fmpz_clear(fmpz)
         return list_of_coeffs
 
@@ -69,6 +149,16 @@ class FmpzRepr:
             shared_library.fmpz_mod_poly_set_coeff_fmpz(poly, coeff[0], fmpz, ctx)
         shared_library.fmpz_clear(fmpz)
 
+    @staticmethod
+    def coeff_width(ctx) -> int:
+        return fmpz_coeff_width(ctx)
+
+    def bin_poly_serialize(self, poly, ctx):
+        return base64.b64encode(fmpz_mod_poly_to_bytes(poly, ctx)).decode('ascii')
+
+    def bin_poly_deserialize(self, poly, s, ctx):
+        fmpz_mod_poly_from_bytes(poly, base64.b64decode(s), ctx)
+
     def __init__(self, type='str'):
         self.type = type
         if type == 'list':
@@ -77,25 +167,164 @@ class FmpzRepr:
         elif type == 'str':
             self.serialize = self.str_poly_serialize
             self.deserialize = self.str_poly_deserialize
+        elif type == 'bin':
+            self.serialize = self.bin_poly_serialize
+            self.deserialize = self.bin_poly_deserialize
+        else:
+            raise ValueError(f"Unknown representation {type}")
+
+
+CENTERED_PREFIX = "zz:"
+
+
+def centered_encode(coeffs: np.ndarray, modulus: int) -> str:
+    """
+    Encodes residues as zigzag varints of their centered representative in (-modulus/2, modulus/2].
+    Short and Gaussian polynomials take one or a few bytes per coefficient instead of a full residue
+    :param coeffs: the coefficients, reduced modulo modulus
+    :param modulus: the modulus
+    :return: the encoded coefficients, prefixed by CENTERED_PREFIX
+    """
+    values = np.asarray(coeffs).astype(np.int64)
+    centered = np.where(values > modulus // 2, values - modulus, values)
+    zigzag = ((centered << 1) ^ (centered >> 63)).astype(np.uint64)
+
+    n_bytes = np.ones(zigzag.shape, dtype=np.int64)
+    rest = zigzag >> np.uint64(7)
+    while np.any(rest):
+        n_bytes += rest != 0
+        rest >>= np.uint64(7)
+
+    max_bytes = int(n_bytes.max()) if n_bytes.size else 0
+    position = np.arange(max_bytes)
+    groups = (zigzag[:, None] >> (np.uint64(7) * position.astype(np.uint64))) & np.uint64(0x7f)
+    groups[position[None, :] < n_bytes[:, None] - 1] |= np.uint64(0x80)
+    data = groups[position[None, :] < n_bytes[:, None]].astype(np.uint8)
+    return CENTERED_PREFIX + base64.b64encode(data.tobytes()).decode('ascii')
+
+
+def centered_decode(s: str, modulus: int) -> np.ndarray:
+    """
+    Decodes the output of centered_encode back into residues modulo modulus
+    """
+    data = np.frombuffer(base64.b64decode(s[len(CENTERED_PREFIX):]), dtype=np.uint8)
+    if data.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    if data[-1] & 0x80:
+        raise ValueError("Truncated centered encoding")
+
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    position = np.arange(data.size) - np.repeat(starts, ends - starts + 1)
+    parts = (data & 0x7f).astype(np.uint64) << (np.uint64(7) * position.astype(np.uint64))
+    zigzag = np.bitwise_or.reduceat(parts, starts)
+    centered = (zigzag >> np.uint64(1)).astype(np.int64) ^ -(zigzag & np.uint64(1)).astype(np.int64)
+    return np.mod(centered, modulus)
+
+
+# centered_encode and centered_decode work on int64: the coefficients of wider moduli go through Python integers
+CENTERED_MAX_BITS = 62
+
+
+def centered_encode_ints(coeffs, modulus: int) -> str:
+    """
+    centered_encode of coefficients of any size, as Python integers
+    """
+    data = bytearray()
+    half = modulus // 2
+    for value in coeffs:
+        centered = value - modulus if value > half else value
+        zigzag = 2 * centered if centered >= 0 else -2 * centered - 1
+        while zigzag >= 0x80:
+            data.append(zigzag & 0x7f | 0x80)
+            zigzag >>= 7
+        data.append(zigzag)
+    return CENTERED_PREFIX + base64.b64encode(bytes(data)).decode('ascii')
+
+
+def centered_decode_ints(s: str, modulus: int) -> list[int]:
+    """
+    centered_decode of coefficients of any size, as Python integers
+    """
+    values = []
+    zigzag = shift = 0
+    for byte in base64.b64decode(s[len(CENTERED_PREFIX):]):
+        zigzag |= (byte & 0x7f) << shift
+        shift += 7
+        if byte < 0x80:
+            centered = zigzag >> 1 if not zigzag & 1 else -(zigzag >> 1) - 1
+            values.append(centered % modulus)
+            zigzag = shift = 0
+    if shift:
+        raise ValueError("Truncated centered encoding")
+    return values
+
+
+def _fmpz_mod_poly_coefficients(poly: FMPZ_MOD_POLY_T, ctx) -> list[int]:
+    fmpz = FMPZ_T()
+    shared_library.fmpz_init(fmpz)
+    coefficients = []
+    for i in range(shared_library.fmpz_mod_poly_length(poly)):
+        shared_library.fmpz_mod_poly_get_coeff_fmpz(fmpz, poly, i, ctx)
+        coefficients.append(int(fmpz_to_string(shared_library, fmpz, 16), 16))
+    shared_library.fmpz_clear(fmpz)
+    return coefficients
+
+
+def _fmpz_mod_poly_set_coefficients(poly: FMPZ_MOD_POLY_T, coefficients: list[int], ctx):
+    shared_library.fmpz_mod_poly_zero(poly, ctx)
+    fmpz = FMPZ_T()
+    shared_library.fmpz_init(fmpz)
+    for i, coeff in enumerate(coefficients):
+        if coeff:
+            shared_library.fmpz_set_str(fmpz, format(coeff, 'x').encode('ascii'), 16)
+            shared_library.fmpz_mod_poly_set_coeff_fmpz(poly, i, fmpz, ctx)
+    shared_library.fmpz_clear(fmpz)
+
+
+def is_centered(s) -> bool:
+    return isinstance(s, str) and s.startswith(CENTERED_PREFIX)
+
+
+def context_modulus(ctx) -> int:
+    return int(fmpz_to_string(shared_library, ctx[0].n))
 
 
 fmpz_repr = FmpzRepr()
 nmod_repr = NmodRepr()
 
 def set_repr(repr):
+    """
+    Selects how polynomials are serialized
+    :param repr: 'str' for FLINT's text format, 'list' for [index, coefficient] pairs or 'bin' for
+    fixed-width little-endian coefficients in base64
+    """
     global fmpz_repr, nmod_repr
     fmpz_repr = FmpzRepr(repr)
     nmod_repr = NmodRepr(repr)
 
-def serialize_nmod_poly(poly: NMOD_POLY_TYPE) -> list[list[int]] | str:
+def serialize_nmod_poly(poly: NMOD_POLY_TYPE, centered=False) -> list[list[int]] | str:
     """
     Serialize an NMOD_POLY_TYPE
     :param poly: the NMOD_POLY_TYPE to serialize
+    :param centered: if True, use the centered varint codec instead of the current representation
     :return: the serialized NMOD_POLY_TYPE
     """
+    if centered:
+        return centered_encode(as_ndarray(poly), MODP)
     return nmod_repr.serialize(poly)
 
 
+def deserialize_nmod_poly_into(poly: NMOD_POLY_TYPE, s):
+    """
+    Deserialize into an initialized NMOD_POLY_TYPE, detecting the centered codec
+    """
+    if is_centered(s):
+        fill_from_ndarray(poly, centered_decode(s, MODP))
+    else:
+        nmod_repr.deserialize(poly, s)
+
+
 def deserialize_nmod_poly(s: list[list[int]]) -> NMOD_POLY_TYPE:
     """
     Deserialize an NMOD_POLY_TYPE
@@ -104,18 +333,38 @@ def deserialize_nmod_poly(s: list[list[int]]) -> NMOD_POLY_TYPE:
     """
     poly = NMOD_POLY_TYPE()
     shared_library.nmod_poly_init(poly, MODP)
-    nmod_repr.deserialize(poly, s)
+    deserialize_nmod_poly_into(poly, s)
     return poly
 
-def serialize_fmpz_mod_poly(poly: FMPZ_MOD_POLY_T, ctx) -> list[list[str]] | str:
+def serialize_fmpz_mod_poly(poly: FMPZ_MOD_POLY_T, ctx, centered=False) -> list[list[str]] | str:
     """
     Serialize an FMPZ_MOD_POLY_TYPE
     :param poly: the FMPZ_MOD_POLY_TYPE to serialize
     :param ctx: the context
+    :param centered: if True, use the centered varint codec instead of the current representation
     :return: the serialized FMPZ_MOD_POLY_TYPE
     """
+    if centered:
+        modulus = context_modulus(ctx)
+        if modulus.bit_length() > CENTERED_MAX_BITS:
+            return centered_encode_ints(_fmpz_mod_poly_coefficients(poly, ctx), modulus)
+        return centered_encode(fmpz_as_ndarray(poly), modulus)
     return fmpz_repr.serialize(poly, ctx)
 
+
+def deserialize_fmpz_mod_poly_into(poly: FMPZ_MOD_POLY_T, s, ctx):
+    """
+    Deserialize into an initialized FMPZ_MOD_POLY_TYPE, detecting the centered codec
+    """
+    if is_centered(s):
+        modulus = context_modulus(ctx)
+        if modulus.bit_length() > CENTERED_MAX_BITS:
+            _fmpz_mod_poly_set_coefficients(poly, centered_decode_ints(s, modulus), ctx)
+        else:
+            fmpz_fill_from_ndarray(poly, centered_decode(s, modulus), ctx)
+    else:
+        fmpz_repr.deserialize(poly, s, ctx)
+
 def deserialize_fmpz_mod_poly(s: list[list[str]], ctx) -> FMPZ_MOD_POLY_T:
     """
     Deserialize an FMPZ_MOD_POLY_TYPE
@@ -125,18 +374,18 @@ def deserialize_fmpz_mod_poly(s: list[list[str]], ctx) -> FMPZ_MOD_POLY_T:
     """
     poly = FMPZ_MOD_POLY_T()
     shared_library.fmpz_mod_poly_init(poly, ctx)
-    fmpz_repr.deserialize(poly, s, ctx)
+    deserialize_fmpz_mod_poly_into(poly, s, ctx)
     return poly
 
-def recursive_serialize_nmod_poly(poly_matrix, dimensions: list[int]):
+def recursive_serialize_nmod_poly(poly_matrix, dimensions: list[int], centered=False):
     dimension_len = dimensions.pop(0)
     serialized_polys = []
     if len(dimensions) == 0:
         for i in range(dimension_len):
-            serialized_polys.append(serialize_nmod_poly(poly_matrix[i]))
+            serialized_polys.append(serialize_nmod_poly(poly_matrix[i], centered))
     else:
         for i in range(dimension_len):
-            serialized_polys.append(recursive_serialize_nmod_poly(poly_matrix[i], dimensions.copy()))
+            serialized_polys.append(recursive_serialize_nmod_poly(poly_matrix[i], dimensions.copy(), centered))
     return serialized_polys
 
 
@@ -145,32 +394,30 @@ def recursive_deserialize_nmod_poly(poly_matrix, serialized_polys, dimensions: l
     if len(dimensions) == 0:
         for i in range(dimension):
             shared_library.nmod_poly_init(poly_matrix[i], MODP)
-            nmod_repr.deserialize(poly_matrix[i], serialized_polys[i])
+            deserialize_nmod_poly_into(poly_matrix[i], serialized_polys[i])
     else:
         for i in range(dimension):
             recursive_deserialize_nmod_poly(poly_matrix[i], serialized_polys[i], dimensions.copy())
 
 
-def recursive_serialize_fmpz_mod_poly(poly_matrix, dimensions: list[int], ctx):
+def recursive_serialize_fmpz_mod_poly(poly_matrix, dimensions: list[int], ctx, centered=False):
     dimension_len = dimensions.pop(0)
     serialized_polys = []
     if len(dimensions) == 0:
         for i in range(dimension_len):
-            serialized_polys.append(serialize_fmpz_mod_poly(poly_matrix[i], ctx))
+            serialized_polys.append(serialize_fmpz_mod_poly(poly_matrix[i], ctx, centered))
     else:
         for i in range(dimension_len):
-            serialized_polys.append(recursive_serialize_fmpz_mod_poly(poly_matrix[i], dimensions.copy(), ctx))
+            serialized_polys.append(recursive_serialize_fmpz_mod_poly(poly_matrix[i], dimensions.copy(), ctx,
+                                                                      centered))
     return serialized_polys
 
 def recursive_deserialize_fmpz_mod_poly(poly_matrix, serialized_polys, dimensions: list[int], ctx):
     dimension = dimensions.pop(0)
     if len(dimensions) == 0:
-        fmpz = FMPZ_T()
-        shared_library.fmpz_init(fmpz)
         for i in range(dimension):
             shared_library.fmpz_mod_poly_init(poly_matrix[i], ctx)
-            fmpz_repr.deserialize(poly_matrix[i], serialized_polys[i], ctx)
-        shared_library.fmpz_clear(fmpz)
+            deserialize_fmpz_mod_poly_into(poly_matrix[i], serialized_polys[i], ctx)
     else:
         for i in range(dimension):
             recursive_deserialize_fmpz_mod_poly(poly_matrix[i], serialized_polys[i], dimensions.copy(), ctx)
@@ -183,8 +430,8 @@ def serialize_public_key(key: PublicKey) -> dict[str, Any]:
     :return: the serialized PublicKey
     """
     return {
-        "A": recursive_serialize_fmpz_mod_poly(key.A, [DIM, DIM, 2], vericrypt.context),
-        "t": recursive_serialize_fmpz_mod_poly(key.t, [DIM, 2], vericrypt.context)
+        "A": recursive_serialize_fmpz_mod_poly(key.A, [DIM, DIM, 2], primitives.vericrypt.context),
+        "t": recursive_serialize_fmpz_mod_poly(key.t, [DIM, 2], primitives.vericrypt.context)
     }
 
 def deserialize_public_key(d: dict[str, Any]) -> PublicKey:
@@ -194,8 +441,8 @@ def deserialize_public_key(d: dict[str, Any]) -> PublicKey:
     :return
     """
     key = PublicKey()
-    recursive_deserialize_fmpz_mod_poly(key.A, d["A"], [DIM, DIM, 2], vericrypt.context)
-    recursive_deserialize_fmpz_mod_poly(key.t, d["t"], [DIM, 2], vericrypt.context)
+    recursive_deserialize_fmpz_mod_poly(key.A, d["A"], [DIM, DIM, 2], primitives.vericrypt.context)
+    recursive_deserialize_fmpz_mod_poly(key.t, d["t"], [DIM, 2], primitives.vericrypt.context)
     return key
 
 def serialize_private_key(key: PrivateKey) -> dict[str, Any]:
@@ -205,8 +452,8 @@ def serialize_private_key(key: PrivateKey) -> dict[str, Any]:
     :return: the serialized PrivateKey
     """
     return {
-        "s1": recursive_serialize_fmpz_mod_poly(key.s1, [DIM, 2], vericrypt.context),
-        "s2": recursive_serialize_fmpz_mod_poly(key.s2, [DIM, 2], vericrypt.context)
+        "s1": recursive_serialize_fmpz_mod_poly(key.s1, [DIM, 2], primitives.vericrypt.context),
+        "s2": recursive_serialize_fmpz_mod_poly(key.s2, [DIM, 2], primitives.vericrypt.context)
     }
 
 def deserialize_private_key(d: dict[str, Any]) -> PrivateKey:
@@ -216,8 +463,8 @@ def deserialize_private_key(d: dict[str, Any]) -> PrivateKey:
     :return
     """
     key = PrivateKey()
-    recursive_deserialize_fmpz_mod_poly(key.s1, d["s1"], [DIM, 2], vericrypt.context)
-    recursive_deserialize_fmpz_mod_poly(key.s2, d["s2"], [DIM, 2], vericrypt.context)
+    recursive_deserialize_fmpz_mod_poly(key.s1, d["s1"], [DIM, 2], primitives.vericrypt.context)
+    recursive_deserialize_fmpz_mod_poly(key.s2, d["s2"], [DIM, 2], primitives.vericrypt.context)
     return key
 
 def serialize_ciphertext(ciphertext: Ciphertext) -> dict[str, Any]:
@@ -227,8 +474,8 @@ def serialize_ciphertext(ciphertext: Ciphertext) -> dict[str, Any]:
     :return: the serialized Ciphertext
     """
     return {
-        "v": recursive_serialize_fmpz_mod_poly(ciphertext.v, [DIM, 2], vericrypt.context),
-        "w": recursive_serialize_fmpz_mod_poly(ciphertext.w, [2], vericrypt.context)
+        "v": recursive_serialize_fmpz_mod_poly(ciphertext.v, [DIM, 2], primitives.vericrypt.context),
+        "w": recursive_serialize_fmpz_mod_poly(ciphertext.w, [2], primitives.vericrypt.context)
     }
 
 def deserialize_ciphertext(d: dict[str, Any], ciphertext=None) -> Ciphertext:
@@ -240,8 +487,8 @@ def deserialize_ciphertext(d: dict[str, Any], ciphertext=None) -> Ciphertext:
     """
     if ciphertext is None:
         ciphertext = Ciphertext()
-    recursive_deserialize_fmpz_mod_poly(ciphertext.v, d["v"], [DIM, 2], vericrypt.context)
-    recursive_deserialize_fmpz_mod_poly(ciphertext.w, d["w"], [2], vericrypt.context)
+    recursive_deserialize_fmpz_mod_poly(ciphertext.v, d["v"], [DIM, 2], primitives.vericrypt.context)
+    recursive_deserialize_fmpz_mod_poly(ciphertext.w, d["w"], [2], primitives.vericrypt.context)
     return ciphertext
 
 # vericrypt
@@ -254,11 +501,11 @@ def serialize_veritext(veritext: Veritext) -> dict[str, Any]:
     """
     return {
         "cipher": [serialize_ciphertext(veritext.cipher[i]) for i in range(VECTOR)],
-        "c": serialize_fmpz_mod_poly(veritext.c, vericrypt.context_p),
-        "r": recursive_serialize_fmpz_mod_poly(veritext.r, [VECTOR, DIM, 2], vericrypt.context),
-        "e": recursive_serialize_fmpz_mod_poly(veritext.e, [VECTOR, DIM, 2], vericrypt.context),
-        "e_": recursive_serialize_fmpz_mod_poly(veritext.e_, [VECTOR, 2], vericrypt.context),
-        "u": recursive_serialize_fmpz_mod_poly(veritext.u, [VECTOR], vericrypt.context_p)
+        "c": serialize_fmpz_mod_poly(veritext.c, primitives.vericrypt.context_p),
+        "r": recursive_serialize_fmpz_mod_poly(veritext.r, [VECTOR, DIM, 2], primitives.vericrypt.context),
+        "e": recursive_serialize_fmpz_mod_poly(veritext.e, [VECTOR, DIM, 2], primitives.vericrypt.context),
+        "e_": recursive_serialize_fmpz_mod_poly(veritext.e_, [VECTOR, 2], primitives.vericrypt.context),
+        "u": recursive_serialize_fmpz_mod_poly(veritext.u, [VECTOR], primitives.vericrypt.context_p)
     }
 
 def deserialize_veritext(d: dict[str, Any]) -> Veritext:
@@ -270,11 +517,11 @@ def deserialize_veritext(d: dict[str, Any]) -> Veritext:
     veritext = Veritext()
     for i in range(VECTOR):
         deserialize_ciphertext(d["cipher"][i], veritext.cipher[i])
-    veritext.c = deserialize_fmpz_mod_poly(d["c"], vericrypt.context_p)
-    recursive_deserialize_fmpz_mod_poly(veritext.r, d["r"], [VECTOR, DIM, 2], vericrypt.context)
-    recursive_deserialize_fmpz_mod_poly(veritext.e, d["e"], [VECTOR, DIM, 2], vericrypt.context)
-    recursive_deserialize_fmpz_mod_poly(veritext.e_, d["e_"], [VECTOR, 2], vericrypt.context)
-    recursive_deserialize_fmpz_mod_poly(veritext.u, d["u"], [VECTOR], vericrypt.context_p)
+    veritext.c = deserialize_fmpz_mod_poly(d["c"], primitives.vericrypt.context_p)
+    recursive_deserialize_fmpz_mod_poly(veritext.r, d["r"], [VECTOR, DIM, 2], primitives.vericrypt.context)
+    recursive_deserialize_fmpz_mod_poly(veritext.e, d["e"], [VECTOR, DIM, 2], primitives.vericrypt.context)
+    recursive_deserialize_fmpz_mod_poly(veritext.e_, d["e_"], [VECTOR, 2], primitives.vericrypt.context)
+    recursive_deserialize_fmpz_mod_poly(veritext.u, d["u"], [VECTOR], primitives.vericrypt.context_p)
     return veritext
 
 # commitment scheme
@@ -332,11 +579,11 @@ def serialize_pk(pk):
         "pk_R": serialize_public_key(pk_R)
     }
 
-def deserialize_pk(d):
+def deserialize_pk(d, owned=False):
     pk_C = deserialize_commitment_key(d["pk_C"])
     pk_V = deserialize_public_key(d["pk_V"])
     pk_R = deserialize_public_key(d["pk_R"])
-    return pk_C, pk_V, pk_R
+    return own((pk_C, pk_V, pk_R), PK, owned)
 
 def serialize_dk(dk):
     pk_C, dk_V = dk
@@ -345,10 +592,10 @@ def serialize_dk(dk):
         "dk_V": serialize_private_key(dk_V)
     }
 
-def deserialize_dk(d):
+def deserialize_dk(d, owned=False):
     pk_C = deserialize_commitment_key(d["pk_C"])
     dk_V = deserialize_private_key(d["dk_V"])
-    return pk_C, dk_V
+    return own((pk_C, dk_V), DK, owned)
 
 def serialize_ck(ck):
     pk_C, pk_V, dk_R = ck
@@ -358,19 +605,19 @@ def serialize_ck(ck):
         "dk_R": serialize_private_key(dk_R)
     }
 
-def deserialize_ck(d):
+def deserialize_ck(d, owned=False):
     pk_C = deserialize_commitment_key(d["pk_C"])
     pk_V = deserialize_public_key(d["pk_V"])
     dk_R = deserialize_private_key(d["dk_R"])
-    return pk_C, pk_V, dk_R
+    return own((pk_C, pk_V, dk_R), CK, owned)
 
 # register
 
 def serialize_vvk(vvk):
     return serialize_commitment(vvk)
 
-def deserialize_vvk(vvk):
-    return deserialize_commitment(vvk)
+def deserialize_vvk(vvk, owned=False):
+    return own(deserialize_commitment(vvk), VVK, owned)
 
 def serialize_vck(vck):
     a, c_a, d_a = vck
@@ -380,12 +627,12 @@ def serialize_vck(vck):
         "d_a": recursive_serialize_nmod_poly(d_a, [WIDTH, 2])
     }
 
-def deserialize_vck(vck):
+def deserialize_vck(vck, owned=False):
     a = deserialize_nmod_poly(vck["a"])
     c_a = deserialize_commitment(vck["c_a"])
     d_a = (NMOD_POLY_TYPE * 2 * WIDTH)()
     recursive_deserialize_nmod_poly(d_a, vck["d_a"], [WIDTH, 2])
-    return a, c_a, d_a
+    return own((a, c_a, d_a), VCK, owned)
 
 # cast
 
@@ -394,16 +641,16 @@ def serialize_encrypted_ballot(ev):
     return {
         "c": serialize_commitment(c),
         "cipher": [serialize_ciphertext(cipher[i]) for i in range(VECTOR)],
-        "e_c": serialize_fmpz_mod_poly(e_c, vericrypt.context_p),
+        "e_c": serialize_fmpz_mod_poly(e_c, primitives.vericrypt.context_p),
     }
 
-def deserialize_encrypted_ballot(ev):
+def deserialize_encrypted_ballot(ev, owned=False):
     c = deserialize_commitment(ev["c"])
     cipher = (Ciphertext * VECTOR)()
     for i in range(VECTOR):
         deserialize_ciphertext(ev["cipher"][i], cipher[i])
-    e_c = deserialize_fmpz_mod_poly(ev["e_c"], vericrypt.context_p)
-    return c, cipher, e_c
+    e_c = deserialize_fmpz_mod_poly(ev["e_c"], primitives.vericrypt.context_p)
+    return own((c, cipher, e_c), ENCRYPTED_BALLOT, owned)
 
 def serialize_sum_proof(proof):
     y1, y2, y3, t1, t2, t3, u = proof
@@ -417,7 +664,7 @@ def serialize_sum_proof(proof):
         "u": recursive_serialize_nmod_poly(u, [2])
     }
 
-def deserialize_sum_proof(proof):
+def deserialize_sum_proof(proof, owned=False):
     y1 = (NMOD_POLY_TYPE * 2 * WIDTH)()
     recursive_deserialize_nmod_poly(y1, proof["y1"], [WIDTH, 2])
     y2 = (NMOD_POLY_TYPE * 2 * WIDTH)()
@@ -433,43 +680,59 @@ def deserialize_sum_proof(proof):
     u = (NMOD_POLY_TYPE * 2)()
     recursive_deserialize_nmod_poly(u, proof["u"], [2])
 
-    return y1, y2, y3, t1, t2, t3, u
+    return own((y1, y2, y3, t1, t2, t3, u), SUM_PROOF, owned)
 
-def serialize_z(z):
+def serialize_z(z, centered=()):
     r, e, e_, u = z
     return {
-        "r": recursive_serialize_fmpz_mod_poly(r, [VECTOR, DIM, 2], vericrypt.context),
-        "e": recursive_serialize_fmpz_mod_poly(e, [VECTOR, DIM, 2], vericrypt.context),
-        "e_": recursive_serialize_fmpz_mod_poly(e_, [VECTOR, 2], vericrypt.context),
-        "u": recursive_serialize_fmpz_mod_poly(u, [VECTOR], vericrypt.context_p)
+        "r": recursive_serialize_fmpz_mod_poly(r, [VECTOR, DIM, 2], primitives.vericrypt.context, "r" in centered),
+        "e": recursive_serialize_fmpz_mod_poly(e, [VECTOR, DIM, 2], primitives.vericrypt.context, "e" in centered),
+        "e_": recursive_serialize_fmpz_mod_poly(e_, [VECTOR, 2], primitives.vericrypt.context, "e_" in centered),
+        "u": recursive_serialize_fmpz_mod_poly(u, [VECTOR], primitives.vericrypt.context_p, "u" in centered)
     }
 
 def deserialize_z(z):
     r = (FMPZ_MOD_POLY_T * 2 * DIM * VECTOR)()
-    recursive_deserialize_fmpz_mod_poly(r, z["r"], [VECTOR, DIM, 2], vericrypt.context)
+    recursive_deserialize_fmpz_mod_poly(r, z["r"], [VECTOR, DIM, 2], primitives.vericrypt.context)
     e = (FMPZ_MOD_POLY_T * 2 * DIM * VECTOR)()
-    recursive_deserialize_fmpz_mod_poly(e, z["e"], [VECTOR, DIM, 2], vericrypt.context)
+    recursive_deserialize_fmpz_mod_poly(e, z["e"], [VECTOR, DIM, 2], primitives.vericrypt.context)
     e_ = (FMPZ_MOD_POLY_T * 2 * VECTOR)()
-    recursive_deserialize_fmpz_mod_poly(e_, z["e_"], [VECTOR, 2], vericrypt.context)
+    recursive_deserialize_fmpz_mod_poly(e_, z["e_"], [VECTOR, 2], primitives.vericrypt.context)
     u = (FMPZ_MOD_POLY_T * VECTOR)()
-    recursive_deserialize_fmpz_mod_poly(u, z["u"], [VECTOR], vericrypt.context_p)
+    recursive_deserialize_fmpz_mod_poly(u, z["u"], [VECTOR], primitives.vericrypt.context_p)
     return r, e, e_, u
 
-def serialize_ballot_proof(proof):
+# fields of the ballot proof holding short or Gaussian polynomials, see serialize_ballot_proof. The sum proof and
+# the shuffle proof hold their polynomials in CRT form, whose residues are spread over [0, MODP) whatever the
+# polynomial: centered, they would take 5 bytes per coefficient instead of 4
+BALLOT_PROOF_CENTERED = ("z.r", "z.e", "z.e_")
+
+
+def _subfields(centered, prefix: str) -> set[str]:
+    return {field[len(prefix) + 1:] for field in centered if field.startswith(prefix + ".")}
+
+
+def serialize_ballot_proof(proof, centered=()):
+    """
+    Serialize a ballot proof
+    :param proof: the proof returned by cast
+    :param centered: the fields to write with the centered varint codec, as "part.field" names
+    (e.g. BALLOT_PROOF_CENTERED). Decoding detects the codec, so readers need no configuration
+    """
     z, c_r, e_r, sproof = proof
     return {
-        "z": serialize_z(z),
+        "z": serialize_z(z, _subfields(centered, "z")),
         "c_r": serialize_commitment(c_r),
         "e_r": serialize_veritext(e_r),
         "sproof": serialize_sum_proof(sproof)
     }
 
-def deserialize_ballot_proof(proof):
+def deserialize_ballot_proof(proof, owned=False):
     z = deserialize_z(proof["z"])
     c_r = deserialize_commitment(proof["c_r"])
     e_r = deserialize_veritext(proof["e_r"])
     sproof = deserialize_sum_proof(proof["sproof"])
-    return z, c_r, e_r, sproof
+    return own((z, c_r, e_r, sproof), BALLOT_PROOF, owned)
 
 def serialize_shuffle_proof(proof):
     y, _y, t, _t, u, d, s, rho = proof
@@ -486,7 +749,7 @@ def serialize_shuffle_proof(proof):
         "rho": serialize_nmod_poly(rho)
     }
 
-def deserialize_shuffle_proof(proof):
+def deserialize_shuffle_proof(proof, owned=False):
     length = len(proof["y"])
     y = (NMOD_POLY_TYPE * 2 * WIDTH * length)()
     recursive_deserialize_nmod_poly(y, proof["y"], [length, WIDTH, 2])
@@ -504,4 +767,4 @@ def deserialize_shuffle_proof(proof):
     s = (NMOD_POLY_TYPE * length)()
     recursive_deserialize_nmod_poly(s, proof["s"], [length])
     rho = deserialize_nmod_poly(proof["rho"])
-    return y, _y, t, _t, u, d, s, rho
\ No newline at end of file
+    return own((y, _y, t, _t, u, d, s, rho), SHUFFLE_PROOF, owned)
\ No newline at end of file
@@ -1,7 +1,10 @@
 from .compile import ctypes, MODP, WIDTH, DEGREE
 from .classes import (FLINT_RAND_T, NMOD_POLY_TYPE, CommitmentKey, COMMITMENT_SCHEME_TYPE, Commitment,
-                     OPENING_TYPE, PCRT_POLY_TYPE)
+                     OPENING_TYPE, PCRT_POLY_TYPE, register_protocols)
 from .commitment_scheme import CommitmentScheme
+from .arena import new_polys
+
+register_protocols()
 
 
 class Shuffle:
@@ -29,25 +32,15 @@ class Shuffle:
                m: ctypes.POINTER(NMOD_POLY_TYPE), _m: ctypes.POINTER(NMOD_POLY_TYPE),
                r: ctypes.POINTER(OPENING_TYPE), key: CommitmentKey, rand: FLINT_RAND_T, length: int):
         d = (Commitment * length)()
-        y = (OPENING_TYPE * length)()
-        _y = (OPENING_TYPE * length)()
-        t = (PCRT_POLY_TYPE * length)()
-        _t = (PCRT_POLY_TYPE * length)()
-        u = (PCRT_POLY_TYPE * length)()
-        s = (NMOD_POLY_TYPE * length)()
-
-        rho = NMOD_POLY_TYPE()
-
-        shared_library.nmod_poly_init(rho, MODP)
-        for i in range(length):
-            shared_library.nmod_poly_init(s[i], MODP)
-            for k in range(2):
-                shared_library.nmod_poly_init(t[i][k], MODP)
-                shared_library.nmod_poly_init(_t[i][k], MODP)
-                shared_library.nmod_poly_init(u[i][k], MODP)
-                for j in range(WIDTH):
-                    shared_library.nmod_poly_init(y[i][j][k], MODP)
-                    shared_library.nmod_poly_init(_y[i][j][k], MODP)
+        # 4 * WIDTH + 7 polynomials per message, built initialized instead of with a library call each
+        y = new_polys(OPENING_TYPE * length)
+        _y = new_polys(OPENING_TYPE * length)
+        t = new_polys(PCRT_POLY_TYPE * length)
+        _t = new_polys(PCRT_POLY_TYPE * length)
+        u = new_polys(PCRT_POLY_TYPE * length)
+        s = new_polys(NMOD_POLY_TYPE * length)
+
+        rho = new_polys(NMOD_POLY_TYPE)
 
         # Verifier samples rho that is different from the messages, and beta.
         flag = True
@@ -0,0 +1,69 @@
+"""
+Tally of the decrypted ballots of a count.
+
+Count shuffles the votes shifted by rho, so the tally of n ballots b_1, ..., b_n is sum(b_j + rho) = sum(b_j) + n rho.
+The coefficients of the ballots are copied in blocks of BLOCK ballots into a NumPy array and summed per column, and
+n rho is added once, instead of two nmod_poly_add per ballot and a string parse of the result.
+"""
+import ctypes
+
+import numpy as np
+
+from .compile import MODP, DEGREE
+from .classes import NMOD_POLY_TYPE
+from .ballot_layout import BallotLayout
+from .npview import as_ndarray
+
+# ballots summed at once: the column sums stay below BLOCK * MODP < 2 ** 64
+BLOCK = 4096
+
+
+def sum_polys(polys, width: int = DEGREE) -> np.ndarray:
+    """
+    The sum of nmod polynomials, as its first width coefficients reduced mod MODP
+    """
+    total = np.zeros(width, dtype=np.uint64)
+    block = np.zeros((min(BLOCK, max(len(polys), 1)), width), dtype=np.uint64)
+    row_bytes = width * block.itemsize
+    for start in range(0, len(polys), BLOCK):
+        count = min(BLOCK, len(polys) - start)
+        block[:count] = 0
+        address = block.ctypes.data
+        for i in range(count):
+            poly = polys[start + i][0]
+            length = min(poly.length, width)
+            if length:
+                ctypes.memmove(address + i * row_bytes, poly.coeffs, length * block.itemsize)
+        total += block[:count].sum(axis=0, dtype=np.uint64)
+        total %= MODP
+    return total
+
+
+def _shifted_sum(ballots, rho: NMOD_POLY_TYPE, width: int) -> np.ndarray:
+    shift = np.zeros(width, dtype=np.uint64)
+    coefficients = as_ndarray(rho)[:width]
+    shift[:coefficients.size] = coefficients
+    # both factors are below 2 ** 32
+    shift = shift * np.uint64(len(ballots) % MODP) % MODP
+    return (sum_polys(ballots, width) + shift) % MODP
+
+
+def tally(ballots, rho, layout: BallotLayout = None) -> list[list[int]]:
+    """
+    Sums the shuffled ballots of a count and removes the shift by rho
+    :param ballots: the shuffled ballots (votes) returned by count, or for a sharded count the ballots of every shard
+    :param rho: the shift of the ballots (proof[7] of the proof of shuffle), or for a sharded count the shift of
+    every shard
+    :param layout: the layout of packed ballots
+    :return: the count of every answer of every question the ballots hold: every question of the layout, or one
+    question, counted up to its last answer chosen at least once, for unpacked ballots
+    """
+    shards = [(ballots, rho)] if isinstance(rho, NMOD_POLY_TYPE) else list(zip(ballots, rho))
+    width = layout.size if layout is not None else DEGREE
+    total = np.zeros(width, dtype=np.uint64)
+    for shard_ballots, shard_rho in shards:
+        total = (total + _shifted_sum(shard_ballots, shard_rho, width)) % MODP
+    if layout is not None:
+        return layout.unpack(total.tolist())
+    non_zero = np.flatnonzero(total)
+    return [total[:int(non_zero[-1]) + 1 if non_zero.size else 0].tolist()]
@@ -1,10 +1,12 @@
 import itertools
+import math
 
 from Crypto.Random.random import StrongRandom
 
 from .compile import ctypes, MODP, WIDTH, VECTOR, DIM
 from .classes import (FLINT_RAND_T, NMOD_POLY_TYPE, FMPZ_MOD_POLY_T, PCRT_POLY_TYPE,
                      COMMITMENT_SCHEME_TYPE, FMPZ_MOD_CTX_T, Commitment, Ciphertext, Veritext)
+from .arena import PolyArena, new_polys
 
 random = StrongRandom()
 
@@ -16,6 +18,152 @@ def get_all_voting_combinations(answers, minimum, maximum) -> iter:
             for combination in itertools.combinations(range(len(answers)), i))
 
 
+def revolving_door(n: int, k: int) -> list[tuple]:
+    """
+    The k-combinations of range(n) in revolving door order: each one differs from the previous one by a single
+    element swapped, so two coefficients of their polynomials. Every combination is sorted
+    """
+    if k == 0:
+        return [()]
+    if k == n:
+        return [tuple(range(n))]
+    return revolving_door(n - 1, k) + [combination + (n - 1,) for combination in reversed(revolving_door(n - 1, k - 1))]
+
+
+def get_all_voting_combinations_gray(answers, minimum, maximum) -> iter:
+    """
+    The combinations of get_all_voting_combinations, in revolving door order within each size
+    """
+    return (combination for i in range(minimum, maximum + 1) for combination in revolving_door(len(answers), i))
+
+
+class CombinationSpace:
+    """
+    The combinations of get_all_voting_combinations, in the same order, without enumerating them: a combination is
+    computed from its index (unrank) and back (rank), with one binomial per answer, from the rank of its answers in
+    the combinatorial number system within its size. A slice is a CombinationSpace over a contiguous range of
+    indices, so workers can walk parts of a space without materializing it
+    """
+    def __init__(self, n_answers: int, minimum: int, maximum: int, start: int = 0, stop: int = None):
+        self.n_answers = n_answers
+        self.minimum = minimum
+        self.maximum = maximum
+        # the index of the first combination of every size, and the number of combinations
+        self.__offsets = {}
+        total = 0
+        for size in range(minimum, maximum + 1):
+            self.__offsets[size] = total
+            total += math.comb(n_answers, size)
+        self.__total = total
+        self.start = start
+        self.stop = total if stop is None else stop
+        if not 0 <= self.start <= self.stop <= total:
+            raise ValueError(f"Invalid range [{start}, {stop}) of {total} combinations")
+
+    @staticmethod
+    def from_question(question: dict) -> "CombinationSpace":
+        return CombinationSpace(len(question['answers']), question['min'], question['max'])
+
+    def __len__(self):
+        return self.stop - self.start
+
+    @property
+    def whole(self) -> bool:
+        """
+        Whether the space holds every combination, rather than a slice of them
+        """
+        return self.start == 0 and self.stop == self.__total
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            indices = range(len(self))[item]
+            if indices.step != 1:
+                raise ValueError("Only contiguous slices of a combination space are supported")
+            return CombinationSpace(self.n_answers, self.minimum, self.maximum,
+                                    self.start + indices.start, self.start + max(indices.stop, indices.start))
+        if item < 0:
+            item += len(self)
+        return self.unrank(item)
+
+    def __contains__(self, combination):
+        try:
+            self.rank(combination)
+        except ValueError:
+            return False
+        return True
+
+    def __iter__(self):
+        size = max(size for size, offset in self.__offsets.items() if offset <= self.start) if self else None
+        index = self.start
+        while index < self.stop:
+            first = index - self.__offsets[size]
+            count = min(self.stop - index, math.comb(self.n_answers, size) - first)
+            if first == 0:
+                yield from itertools.islice(itertools.combinations(range(self.n_answers), size), count)
+            else:
+                combination = list(self.unrank(index - self.start))
+                for _ in range(count):
+                    yield tuple(combination)
+                    # the next combination of the size in lexicographic order
+                    i = size - 1
+                    while i >= 0 and combination[i] == self.n_answers - size + i:
+                        i -= 1
+                    if i >= 0:
+                        combination[i:] = range(combination[i] + 1, combination[i] + 1 + size - i)
+            index += count
+            size += 1
+
+    def rank(self, combination) -> int:
+        """
+        The index of a combination in the space
+        """
+        n, k = self.n_answers, len(combination)
+        combination = sorted(combination)
+        valid = k in self.__offsets and len(set(combination)) == k
+        if not valid or (k and not 0 <= combination[0] <= combination[-1] < n):
+            raise ValueError(f"{tuple(combination)} is not a combination of the space")
+        # the lexicographic rank is the mirror of the rank of the combinatorial number system
+        rank = math.comb(n, k) - 1 - sum(math.comb(n - 1 - answer, k - i) for i, answer in enumerate(combination))
+        index = self.__offsets[k] + rank - self.start
+        if not 0 <= index < len(self):
+            raise ValueError(f"{tuple(combination)} is not a combination of the space")
+        return index
+
+    def unrank(self, index: int) -> tuple:
+        """
+        The combination at an index of the space
+        """
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        index += self.start
+        n = self.n_answers
+        k = max(size for size, offset in self.__offsets.items() if offset <= index)
+        rank = math.comb(n, k) - 1 - (index - self.__offsets[k])
+        combination = []
+        # greedy decomposition of the mirrored rank in the combinatorial number system
+        candidate = n
+        for i in range(k, 0, -1):
+            candidate -= 1
+            while math.comb(candidate, i) > rank:
+                candidate -= 1
+            combination.append(n - 1 - candidate)
+            rank -= math.comb(candidate, i)
+        return tuple(combination)
+
+    def sample(self, rng=None) -> tuple:
+        """
+        A uniformly random combination of the space
+        """
+        return self.unrank((rng or random).randrange(len(self)))
+
+    def split(self, parts: int) -> list["CombinationSpace"]:
+        """
+        The space cut in at most parts contiguous slices of nearly equal sizes
+        """
+        bounds = [len(self) * part // parts for part in range(parts + 1)]
+        return [self[start:stop] for start, stop in zip(bounds, bounds[1:]) if start < stop]
+
+
 def new_random_question(len_a=None, len_max=None, len_min=None, answers=None) -> dict:
     if answers is not None:
         len_a = len(answers)
@@ -56,63 +204,75 @@ def new_flint_random(shared_library) -> FLINT_RAND_T:
     return rand
 
 
-def nmod_poly_to_fmpz(shared_library, poly: NMOD_POLY_TYPE, ctx) -> FMPZ_MOD_POLY_T:
-    fmpz = FMPZ_MOD_POLY_T()
-    shared_library.fmpz_mod_poly_init(fmpz, ctx)
+# The conversions take an optional PolyArena: without one the result is a new value owned by the caller, with one
+# it is taken from the arena and only valid until the caller's scope ends.
+def _polys(ctype, arena):
+    return new_polys(ctype) if arena is None else arena.take(ctype)
+
+
+def _workspace(arena):
+    # temporaries go to a scope of the caller's arena, or to a throwaway one cleared on exit
+    return PolyArena() if arena is None else arena.scope()
+
+
+def nmod_poly_to_fmpz(shared_library, poly: NMOD_POLY_TYPE, ctx, arena: PolyArena = None) -> FMPZ_MOD_POLY_T:
+    fmpz = _polys(FMPZ_MOD_POLY_T, arena)
     shared_library.utils_nmod_to_fmpz(fmpz, poly)
     return fmpz
 
 
-def fmpz_to_nmod_poly(shared_library, fmpz: FMPZ_MOD_POLY_T) -> NMOD_POLY_TYPE:
-    poly = NMOD_POLY_TYPE()
-    shared_library.nmod_poly_init(poly, MODP)
+def fmpz_to_nmod_poly(shared_library, fmpz: FMPZ_MOD_POLY_T, arena: PolyArena = None) -> NMOD_POLY_TYPE:
+    poly = _polys(NMOD_POLY_TYPE, arena)
     shared_library.utils_fmpz_to_nmod(poly, fmpz)
     return poly
 
 
-def pcrt_poly_rec(shared_library, scheme: COMMITMENT_SCHEME_TYPE, poly: PCRT_POLY_TYPE) -> NMOD_POLY_TYPE:
-    c = NMOD_POLY_TYPE()
-    shared_library.nmod_poly_init(c, MODP)
+def pcrt_poly_rec(shared_library, scheme: COMMITMENT_SCHEME_TYPE, poly: PCRT_POLY_TYPE,
+                  arena: PolyArena = None) -> NMOD_POLY_TYPE:
+    c = _polys(NMOD_POLY_TYPE, arena)
     shared_library.pcrt_poly_rec(scheme, c, poly)
     return c
 
 
-def pcrt_poly_conv(shared_library, scheme: COMMITMENT_SCHEME_TYPE, poly: NMOD_POLY_TYPE) -> FMPZ_MOD_POLY_T:
-    c = PCRT_POLY_TYPE()
-    shared_library.nmod_poly_init(c[0], MODP)
-    shared_library.nmod_poly_init(c[1], MODP)
+def pcrt_poly_conv(shared_library, scheme: COMMITMENT_SCHEME_TYPE, poly: NMOD_POLY_TYPE,
+                   arena: PolyArena = None) -> PCRT_POLY_TYPE:
+    c = _polys(PCRT_POLY_TYPE, arena)
     shared_library.pcrt_poly_conv(scheme, c, poly)
     return c
 
 
 def opening_to_fmpz(shared_library, opening: PCRT_POLY_TYPE * WIDTH, scheme: COMMITMENT_SCHEME_TYPE,
-                    ctx: FMPZ_MOD_CTX_T) -> (FMPZ_MOD_POLY_T * WIDTH, FMPZ_MOD_POLY_T * WIDTH):
-    fmpz = (FMPZ_MOD_POLY_T * WIDTH)()
-    for i in range(WIDTH):
-        tmp = pcrt_poly_rec(shared_library, scheme, opening[i])
-        fmpz[i] = nmod_poly_to_fmpz(shared_library, tmp, ctx)
-        shared_library.nmod_poly_clear(tmp)
+                    ctx: FMPZ_MOD_CTX_T, arena: PolyArena = None) -> FMPZ_MOD_POLY_T * WIDTH:
+    fmpz = _polys(FMPZ_MOD_POLY_T * WIDTH, arena)
+    with _workspace(arena) as workspace:
+        tmp = workspace.take(NMOD_POLY_TYPE)
+        for i in range(WIDTH):
+            shared_library.pcrt_poly_rec(scheme, tmp, opening[i])
+            shared_library.utils_nmod_to_fmpz(fmpz[i], tmp)
 
     return fmpz
 
-def c1_to_fmpz(shared_library, c1, scheme, ctx):
-    tmp = pcrt_poly_rec(shared_library, scheme, c1)
-    fmpz = nmod_poly_to_fmpz(shared_library, tmp, ctx)
-    shared_library.nmod_poly_clear(tmp)
+def c1_to_fmpz(shared_library, c1, scheme, ctx, arena: PolyArena = None):
+    fmpz = _polys(FMPZ_MOD_POLY_T, arena)
+    with _workspace(arena) as workspace:
+        tmp = workspace.take(NMOD_POLY_TYPE)
+        shared_library.pcrt_poly_rec(scheme, tmp, c1)
+        shared_library.utils_nmod_to_fmpz(fmpz, tmp)
     return fmpz
 
 
-def b1_to_fmpz(shared_library, b1, scheme, ctx):
-    return opening_to_fmpz(shared_library, b1[0], scheme, ctx)
+def b1_to_fmpz(shared_library, b1, scheme, ctx, arena: PolyArena = None):
+    return opening_to_fmpz(shared_library, b1[0], scheme, ctx, arena)
 
 
 def fmpz_to_opening(shared_library, fmpz: FMPZ_MOD_POLY_T * WIDTH,
-                    scheme: COMMITMENT_SCHEME_TYPE) -> PCRT_POLY_TYPE * WIDTH:
-    opening = (PCRT_POLY_TYPE * WIDTH)()
-    for i in range(WIDTH):
-        tmp = fmpz_to_nmod_poly(shared_library, fmpz[i])
-        opening[i] = pcrt_poly_conv(shared_library, scheme, tmp)
-        shared_library.nmod_poly_clear(tmp)
+                    scheme: COMMITMENT_SCHEME_TYPE, arena: PolyArena = None) -> PCRT_POLY_TYPE * WIDTH:
+    opening = _polys(PCRT_POLY_TYPE * WIDTH, arena)
+    with _workspace(arena) as workspace:
+        tmp = workspace.take(NMOD_POLY_TYPE)
+        for i in range(WIDTH):
+            shared_library.utils_fmpz_to_nmod(tmp, fmpz[i])
+            shared_library.pcrt_poly_conv(scheme, opening[i], tmp)
 
     return opening
 
@@ -146,10 +306,18 @@ def print_opening(shared_library, opening: PCRT_POLY_TYPE * WIDTH, pretty=True):
     print()
 
 
+def take_string(shared_library, c_p) -> str:
+    """
+    Decodes a string allocated by the library and frees it
+    """
+    try:
+        return ctypes.string_at(c_p).decode('ascii')
+    finally:
+        shared_library.utils_flint_free(c_p)
+
+
 def nmod_poly_to_string(shared_library, poly: NMOD_POLY_TYPE) -> str:
-    c_p = shared_library.utils_nmod_poly_to_string(poly)
-    s = ctypes.string_at(c_p).decode('ascii')
-    return s
+    return take_string(shared_library, shared_library.utils_nmod_poly_to_string(poly))
 
 
 def nmod_poly_from_string(shared_library, s):
@@ -160,9 +328,11 @@ def nmod_poly_from_string(shared_library, s):
 
 
 def fmpz_mod_poly_to_string(shared_library, poly: FMPZ_MOD_POLY_T, ctx: FMPZ_MOD_CTX_T) -> str:
-    c_p = shared_library.utils_fmpz_mod_poly_to_string(poly, ctx)
-    s = ctypes.string_at(c_p).decode('ascii')
-    return s
+    return take_string(shared_library, shared_library.utils_fmpz_mod_poly_to_string(poly, ctx))
+
+
+def fmpz_to_string(shared_library, fmpz, base: int = 10) -> str:
+    return take_string(shared_library, shared_library.fmpz_get_str(None, base, fmpz))
 
 
 def fmpz_mod_poly_from_string(shared_library, s: str, ctx):
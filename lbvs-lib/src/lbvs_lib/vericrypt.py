@@ -1,6 +1,9 @@
 from .compile import ctypes, VECTOR, DEGREE
 from .encryption_scheme import EncryptionScheme
-from .classes import Veritext, FMPZ_MOD_POLY_T, PublicKey, FLINT_RAND_T, PrivateKey, FMPZ_MOD_CTX_T
+from .classes import Veritext, FMPZ_MOD_POLY_T, PublicKey, FLINT_RAND_T, PrivateKey, FMPZ_MOD_CTX_T, \
+    register_vericrypt
+
+register_vericrypt()
 
 
 class Vericrypt:
@@ -0,0 +1,54 @@
+import ctypes
+import types
+
+import pytest
+
+from lbvs_lib import accounting
+
+
+@pytest.fixture
+def library():
+    library = types.SimpleNamespace(fmpz_init=lambda fmpz: None, fmpz_clear=lambda fmpz: None,
+                                    fmpz_get_str=lambda buffer: ctypes.addressof(buffer),
+                                    utils_flint_free=lambda address: None)
+    accounting.reset()
+    accounting.enable(library)
+    yield library
+    accounting.disable()
+    accounting.reset()
+
+
+def test_live_objects_per_phase(library):
+    a, b, foreign = ctypes.c_long(), ctypes.c_long(), ctypes.c_long()
+    with accounting.phase("count"):
+        library.fmpz_init(a)
+        library.fmpz_init(ctypes.byref(b))
+        library.fmpz_clear(a)
+        library.fmpz_clear(foreign)
+    assert accounting.live() == {"fmpz": {"objects": 1, "bytes": 0}}
+    (snapshot,) = accounting.snapshots()
+    assert snapshot["label"] == "count"
+    assert snapshot["phases"]["count"]["fmpz"] == {"acquired": 2, "released": 1, "foreign": 1}
+    (row,) = accounting.live_objects()
+    assert row["phase"] == "count" and __file__ in row["caller"]
+    assert "test_live_objects_per_phase" in accounting.report()
+
+
+def test_strings_are_counted_in_bytes(library):
+    buffer = ctypes.create_string_buffer(b"12345")
+    address = library.fmpz_get_str(buffer)
+    assert accounting.live() == {"string": {"objects": 1, "bytes": 6}}
+    library.utils_flint_free(address)
+    assert accounting.live() == {}
+
+
+def test_disable(library):
+    hooked = library.fmpz_init
+    assert isinstance(hooked, accounting.AccountedCall)
+    # installing twice keeps one hook
+    accounting.enable(library)
+    assert library.fmpz_init is hooked
+    accounting.disable()
+    assert library.fmpz_init is hooked.function
+    library.fmpz_init(ctypes.c_long())
+    assert accounting.live() == {}
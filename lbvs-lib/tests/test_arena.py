@@ -0,0 +1,61 @@
+import ctypes
+
+import pytest
+
+from lbvs_lib import primitives
+from lbvs_lib.arena import PolyArena, new_polys, flat_polys
+from lbvs_lib.classes import NMOD_POLY_TYPE, FMPZ_MOD_POLY_T
+from lbvs_lib.compile import shared_library, MODP
+from lbvs_lib.npview import as_ndarray, fmpz_from_ndarray
+
+
+def test_new_polys_are_initialized():
+    ctype = NMOD_POLY_TYPE * 2 * 3
+    block = new_polys(ctype)
+    polys = list(flat_polys(block, ctype))
+    assert len(polys) == 6
+    for poly in polys:
+        assert poly[0].length == 0
+        assert poly[0].mod.n == MODP
+        shared_library.nmod_poly_set_coeff_ui(poly, 2, 5)
+        assert as_ndarray(poly).tolist() == [0, 0, 5]
+        shared_library.nmod_poly_clear(poly)
+
+    with pytest.raises(TypeError):
+        new_polys(ctypes.c_long * 2)
+
+
+def test_blocks_are_reused_zeroed():
+    with PolyArena() as arena:
+        with arena.scope():
+            first = arena.take(NMOD_POLY_TYPE * 2)
+            shared_library.nmod_poly_set_coeff_ui(first[1], 3, 1)
+        with arena.scope():
+            again = arena.take(NMOD_POLY_TYPE * 2)
+            assert ctypes.addressof(again) == ctypes.addressof(first)
+            assert again[1][0].length == 0
+            # nested scopes take the blocks after it
+            with arena.scope():
+                inner = arena.take(NMOD_POLY_TYPE)
+                assert ctypes.addressof(inner) != ctypes.addressof(again)
+
+
+def test_other_types_replace_the_blocks():
+    with PolyArena() as arena:
+        with arena.scope():
+            first = arena.take(NMOD_POLY_TYPE * 2)
+        with arena.scope():
+            other = arena.take(NMOD_POLY_TYPE * 3)
+            assert ctypes.addressof(other) != ctypes.addressof(first)
+
+
+def test_fmpz_blocks():
+    ctx = primitives.vericrypt.context
+    with PolyArena(ctx) as arena:
+        with arena.scope():
+            block = arena.take(FMPZ_MOD_POLY_T * 2)
+            fmpz_from_ndarray([0, 4], ctx, block[0])
+        with arena.scope():
+            again = arena.take(FMPZ_MOD_POLY_T * 2)
+            assert ctypes.addressof(again) == ctypes.addressof(block)
+            assert again[0][0].length == 0
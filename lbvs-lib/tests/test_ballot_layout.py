@@ -0,0 +1,53 @@
+import pytest
+
+from lbvs_lib.ballot_layout import BallotLayout, MAX_COMBINATIONS
+from lbvs_lib.compile import shared_library, DEGREE
+from lbvs_lib.utils import CombinationSpace
+
+
+def test_offsets():
+    layout = BallotLayout([2, 3, 1])
+    assert layout.offsets == [0, 2, 5]
+    assert layout.size == 6
+    assert list(layout.question_range(1)) == [2, 3, 4]
+    assert layout.to_global(1, (0, 2)) == (2, 4)
+    with pytest.raises(ValueError):
+        layout.to_global(1, (3,))
+    with pytest.raises(ValueError):
+        BallotLayout([2, 0])
+    with pytest.raises(ValueError):
+        BallotLayout([DEGREE, 1])
+
+
+def test_pack_and_unpack():
+    layout = BallotLayout([2, 3, 1])
+    poly = layout.pack([(1,), (0, 2), ()])
+    assert [shared_library.nmod_poly_get_coeff_ui(poly, i) for i in range(layout.size)] == [0, 1, 1, 0, 1, 0]
+    assert layout.read_tally(poly) == [[0, 1], [1, 0, 1], [0]]
+    # overwritten in place
+    layout.pack([(0,), (), (0,)], poly)
+    assert layout.read_tally(poly) == [[1, 0], [0, 0, 0], [1]]
+    shared_library.nmod_poly_clear(poly)
+    assert layout.unpack([4, 5, 6]) == [[4, 5], [6, 0, 0], [0]]
+    with pytest.raises(ValueError):
+        layout.pack([(0,)])
+
+
+def test_combinations():
+    layout = BallotLayout([2, 3])
+    combinations = [[(0,), (1,)], [(), (0,), (1,), (2,)]]
+    assert list(layout.combinations(combinations)) == [(0,), (0, 2), (0, 3), (0, 4), (1,), (1, 2), (1, 3), (1, 4)]
+    # or the spaces of the questions
+    spaces = [CombinationSpace(2, 1, 1), CombinationSpace(3, 0, 1)]
+    assert list(layout.combinations(spaces)) == list(layout.combinations(combinations))
+    assert layout.check_combinations(spaces) == 8
+
+
+def test_combinations_are_bounded():
+    # 10 ** 7 packed ballots
+    layout = BallotLayout([10] * 7)
+    spaces = [CombinationSpace(10, 1, 1)] * 7
+    assert 10 ** 7 > MAX_COMBINATIONS
+    with pytest.raises(ValueError, match="10000000 valid combinations"):
+        next(layout.combinations(spaces))
+    assert len(list(layout.combinations(spaces[:2], limit=100))) == 100
@@ -0,0 +1,52 @@
+import pytest
+
+from lbvs_lib import builds
+
+
+@pytest.fixture
+def directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(builds, "DIRECTORY", str(tmp_path))
+    monkeypatch.delenv(builds.LIBRARY_ENV, raising=False)
+    return tmp_path
+
+
+def _install(directory, *variants):
+    for variant in variants:
+        name = "shared_lib.so" if variant == builds.GENERIC else f"shared_lib.{variant}.so"
+        (directory / name).touch()
+
+
+def test_most_specific_supported_build(directory, monkeypatch):
+    _install(directory, builds.GENERIC, "avx2", "avx512")
+    assert builds.installed() == ["avx512", "avx2", builds.GENERIC]
+    monkeypatch.setattr(builds, "cpu_features", lambda: frozenset({"avx2", "bmi2", "fma", "sse4_2"}))
+    build = builds.select()
+    assert build.variant == "avx2"
+    assert build.path == str(directory / "shared_lib.avx2.so")
+    # a CPU missing one feature of a build falls back to the next one
+    monkeypatch.setattr(builds, "cpu_features", lambda: frozenset({"avx2", "fma"}))
+    assert builds.select().variant == builds.GENERIC
+
+
+def test_only_installed_builds(directory, monkeypatch):
+    monkeypatch.setattr(builds, "cpu_features", lambda: frozenset(builds.VARIANTS["avx512"]))
+    _install(directory, builds.GENERIC, "avx2")
+    assert builds.select().variant == "avx2"
+    # nothing installed leaves the missing generic build to the loader
+    for file in directory.iterdir():
+        file.unlink()
+    assert builds.select() == builds.Build(builds.GENERIC, str(directory / "shared_lib.so"), "default")
+
+
+def test_override(directory, monkeypatch):
+    monkeypatch.setattr(builds, "cpu_features", lambda: frozenset(builds.VARIANTS["avx512"]))
+    _install(directory, builds.GENERIC, "avx512")
+    monkeypatch.setenv(builds.LIBRARY_ENV, builds.GENERIC)
+    assert builds.select().variant == builds.GENERIC
+    custom = directory / "custom.so"
+    custom.touch()
+    monkeypatch.setenv(builds.LIBRARY_ENV, str(custom))
+    assert builds.select().path == str(custom)
+    monkeypatch.setenv(builds.LIBRARY_ENV, "avx2")
+    with pytest.raises(FileNotFoundError):
+        builds.select()
@@ -0,0 +1,90 @@
+import pytest
+
+from lbvs_lib import scheme_algorithms
+from lbvs_lib.classes import NMOD_POLY_TYPE
+from lbvs_lib.cleanup import clear_ev_and_proof
+from lbvs_lib.compile import shared_library, MODP
+from lbvs_lib.scheme_algorithms import (CastPrecomputationPool, ballot_to_precode, cast_online, code, precompute_cast,
+                                        register, setup)
+
+
+@pytest.fixture(scope="module")
+def keys():
+    pk, dk, ck = setup()
+    vvk, vck, _ = register(pk)
+    return pk, ck, vvk, vck
+
+
+def _vote(*answers):
+    vote = NMOD_POLY_TYPE()
+    shared_library.nmod_poly_init(vote, MODP)
+    for answer in answers:
+        shared_library.nmod_poly_set_coeff_ui(vote, answer, 1)
+    return vote
+
+
+def _assert_coded(keys, vote, ev, pv):
+    pk, ck, vvk, vck = keys
+    r, verdict = code(pk, ck, vvk, ev, pv)
+    assert verdict
+    expected = ballot_to_precode(vote, vck[0])
+    assert shared_library.nmod_poly_equal(r, expected)
+    shared_library.nmod_poly_clear(r)
+    shared_library.nmod_poly_clear(expected)
+
+
+def test_precomputed_cast(keys):
+    pk, ck, vvk, vck = keys
+    precomputation = precompute_cast(pk)
+    vote = _vote(1, 4)
+    ev, pv = cast_online(pk, vck, vote, precomputation)
+    assert precomputation.used
+    _assert_coded(keys, vote, ev, pv)
+    with pytest.raises(ValueError):
+        cast_online(pk, vck, vote, precomputation)
+    # the ballot owns the commitments and encryptions now, clear leaves them alone
+    precomputation.clear()
+    clear_ev_and_proof(ev, pv)
+    shared_library.nmod_poly_clear(vote)
+
+
+def test_failed_cast_frees_the_precomputation(keys, monkeypatch):
+    pk, ck, vvk, vck = keys
+    precomputation = precompute_cast(pk)
+    freed = []
+    free = precomputation.free
+    monkeypatch.setattr(precomputation, "free", lambda: freed.append(free()))
+
+    def prover(*args):
+        raise RuntimeError("prover failed")
+
+    monkeypatch.setattr(scheme_algorithms.ProtocolSum, "prover", prover)
+    vote = _vote(2)
+    with pytest.raises(RuntimeError):
+        cast_online(pk, vck, vote, precomputation)
+    assert freed == [None]
+    # neither freed twice nor used again
+    precomputation.clear()
+    assert freed == [None]
+    with pytest.raises(ValueError):
+        cast_online(pk, vck, vote, precomputation)
+    shared_library.nmod_poly_clear(vote)
+
+
+def test_pool(keys):
+    pk, ck, vvk, vck = keys
+    pool = CastPrecomputationPool(pk, 2)
+    pool.fill()
+    assert len(pool) == 2
+    vote = _vote(0)
+    ev, pv = pool.cast(vck, vote)
+    assert len(pool) == 1
+    _assert_coded(keys, vote, ev, pv)
+    clear_ev_and_proof(ev, pv)
+    # an empty pool computes on the spot
+    pool.clear()
+    assert len(pool) == 0
+    ev, pv = pool.cast(vck, vote)
+    _assert_coded(keys, vote, ev, pv)
+    clear_ev_and_proof(ev, pv)
+    shared_library.nmod_poly_clear(vote)
@@ -0,0 +1,108 @@
+import base64
+import json
+
+import numpy as np
+import pytest
+
+from lbvs_lib import primitives
+from lbvs_lib.ballot_layout import BallotLayout
+from lbvs_lib.classes import FMPZ_MOD_POLY_T
+from lbvs_lib.cleanup import clear_ev_and_proof
+from lbvs_lib.compile import shared_library, MODP
+from lbvs_lib.npview import as_ndarray, from_ndarray
+from lbvs_lib.scheme_algorithms import setup, register, cast
+from lbvs_lib.serializers2 import (BALLOT_PROOF_CENTERED, CENTERED_PREFIX, centered_encode, centered_decode,
+                                   centered_encode_ints, centered_decode_ints, context_modulus, is_centered,
+                                   serialize_nmod_poly, deserialize_nmod_poly, serialize_fmpz_mod_poly,
+                                   deserialize_fmpz_mod_poly, serialize_ballot_proof, deserialize_ballot_proof,
+                                   set_repr, _fmpz_mod_poly_set_coefficients)
+from lbvs_lib.utils import pv_equals
+
+
+def _payload(encoded: str) -> bytes:
+    return base64.b64decode(encoded[len(CENTERED_PREFIX):])
+
+
+def test_round_trip():
+    coefficients = np.array([0, 1, 2, MODP - 1, MODP - 2, MODP // 2, MODP // 2 + 1, 12345], dtype=np.uint64)
+    encoded = centered_encode(coefficients, MODP)
+    assert is_centered(encoded)
+    assert centered_decode(encoded, MODP).tolist() == coefficients.tolist()
+    assert centered_decode(centered_encode(np.zeros(0, dtype=np.uint64), MODP), MODP).size == 0
+
+
+def test_short_coefficients_take_one_byte():
+    # -1, 0 and 1 are the zigzag values 1, 0 and 2
+    assert _payload(centered_encode(np.array([MODP - 1, 0, 1]), MODP)) == b"\x01\x00\x02"
+    # the largest residue is the most negative centered value
+    assert len(_payload(centered_encode(np.array([MODP // 2 + 1]), MODP))) == 5
+
+
+def test_truncated():
+    truncated = CENTERED_PREFIX + base64.b64encode(b"\x02\x81").decode('ascii')
+    with pytest.raises(ValueError):
+        centered_decode(truncated, MODP)
+    with pytest.raises(ValueError):
+        centered_decode_ints(truncated, MODP)
+
+
+def test_ints_match_the_vectorized_codec():
+    modulus = (1 << 61) - 1
+    coefficients = [0, 1, 2, modulus - 1, modulus // 2, modulus // 2 + 1, 1 << 40]
+    encoded = centered_encode_ints(coefficients, modulus)
+    assert encoded == centered_encode(np.array(coefficients), modulus)
+    assert centered_decode_ints(encoded, modulus) == coefficients
+
+
+def test_ints_of_wide_moduli():
+    # past 2 ** 62 the int64 codec overflows
+    modulus = (1 << 100) + 277
+    coefficients = [0, 1, modulus - 1, modulus // 2, modulus // 2 + 1, 1 << 80]
+    assert centered_decode_ints(centered_encode_ints(coefficients, modulus), modulus) == coefficients
+
+
+def test_nmod_poly():
+    poly = from_ndarray([1, 0, MODP - 1, 3])
+    encoded = serialize_nmod_poly(poly, centered=True)
+    assert is_centered(encoded)
+    decoded = deserialize_nmod_poly(encoded)
+    assert as_ndarray(decoded).tolist() == [1, 0, MODP - 1, 3]
+    shared_library.nmod_poly_clear(poly)
+    shared_library.nmod_poly_clear(decoded)
+
+
+def test_fmpz_mod_poly():
+    ctx = primitives.vericrypt.context
+    modulus = context_modulus(ctx)
+    poly = FMPZ_MOD_POLY_T()
+    shared_library.fmpz_mod_poly_init(poly, ctx)
+    _fmpz_mod_poly_set_coefficients(poly, [1, 0, modulus - 1, modulus // 2, 2], ctx)
+    encoded = serialize_fmpz_mod_poly(poly, ctx, centered=True)
+    assert is_centered(encoded)
+    decoded = deserialize_fmpz_mod_poly(encoded, ctx)
+    assert shared_library.fmpz_mod_poly_equal(poly, decoded, ctx)
+    shared_library.fmpz_mod_poly_clear(poly, ctx)
+    shared_library.fmpz_mod_poly_clear(decoded, ctx)
+
+
+def test_ballot_proof_shrinks():
+    set_repr("bin")
+    try:
+        pk, dk, ck = setup()
+        vvk, vck, _ = register(pk)
+        vote = BallotLayout([4]).pack([(1,)])
+        ev, pv = cast(pk, vck, vote)
+        plain = serialize_ballot_proof(pv)
+        centered = serialize_ballot_proof(pv, BALLOT_PROOF_CENTERED)
+        # against the fixed-width coefficients of 'bin', every centered field is smaller
+        for field in BALLOT_PROOF_CENTERED:
+            part, name = field.split(".")
+            assert len(json.dumps(centered[part][name])) < len(json.dumps(plain[part][name])), field
+        assert len(json.dumps(centered)) < len(json.dumps(plain))
+
+        decoded = deserialize_ballot_proof(centered)
+        assert pv_equals(shared_library, pv, decoded, primitives.vericrypt.context)
+        shared_library.nmod_poly_clear(vote)
+        clear_ev_and_proof(ev, pv)
+    finally:
+        set_repr("str")
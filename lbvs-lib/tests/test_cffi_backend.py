@@ -0,0 +1,72 @@
+import ctypes
+import ctypes.util
+import locale
+
+import pytest
+
+pytest.importorskip("cffi")
+
+from lbvs_lib.cffi_backend import CffiLibrary
+
+
+@pytest.fixture
+def libc():
+    path = ctypes.util.find_library("c")
+    if path is None:
+        pytest.skip("libc not found")
+    return CffiLibrary(path)
+
+
+class AsParameter:
+    def __init__(self, value):
+        self._as_parameter_ = value
+
+
+def test_simple_arguments(libc):
+    libc.labs.argtypes = [ctypes.c_long]
+    libc.labs.restype = ctypes.c_long
+    assert libc.labs(-5) == 5
+    # ctypes instances, as utils.new_flint_random passes them to flint_randseed
+    assert libc.labs(ctypes.c_long(-6)) == 6
+    assert libc.labs(AsParameter(ctypes.c_long(-7))) == 7
+    assert libc.labs(AsParameter(-8)) == 8
+
+
+def test_char_p_arguments(libc):
+    libc.strlen.argtypes = [ctypes.c_char_p]
+    libc.strlen.restype = ctypes.c_size_t
+    assert libc.strlen(b"abc") == 3
+    assert libc.strlen(ctypes.c_char_p(b"abcd")) == 4
+    assert libc.strlen(ctypes.create_string_buffer(b"ab", 8)) == 2
+
+    # NULL queries the current locale, as fmpz_get_str(None, ...) allocates the string
+    libc.setlocale.argtypes = [ctypes.c_int, ctypes.c_char_p]
+    libc.setlocale.restype = ctypes.c_char_p
+    assert libc.setlocale(locale.LC_NUMERIC, None) == locale.setlocale(locale.LC_NUMERIC).encode()
+
+
+def test_buffers_are_written_in_place(libc):
+    libc.memset.argtypes = [ctypes.c_char_p, ctypes.c_int, ctypes.c_size_t]
+    libc.memset.restype = ctypes.c_void_p
+    buffer = ctypes.create_string_buffer(4)
+    libc.memset(buffer, ord("a"), 3)
+    assert buffer.raw == b"aaa\0"
+
+
+def test_array_through_as_parameter(libc):
+    # ThreadLocalRand passes its FLINT_RAND_T through _as_parameter_
+    array = (ctypes.c_char * 4)()
+    libc.memset.argtypes = [ctypes.c_char * 4, ctypes.c_int, ctypes.c_size_t]
+    libc.memset.restype = ctypes.c_void_p
+    libc.memset(AsParameter(array), ord("b"), 2)
+    assert array.raw == b"bb\0\0"
+
+
+def test_pointer_arguments(libc):
+    value = ctypes.c_long(0)
+    libc.memset.argtypes = [ctypes.POINTER(ctypes.c_long), ctypes.c_int, ctypes.c_size_t]
+    libc.memset.restype = ctypes.c_void_p
+    libc.memset(ctypes.byref(value), 1, 1)
+    assert value.value == 1
+    libc.memset(AsParameter(ctypes.pointer(value)), 2, 1)
+    assert value.value == 2
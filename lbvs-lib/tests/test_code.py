@@ -0,0 +1,77 @@
+import pytest
+
+from lbvs_lib.ballot_layout import BallotLayout
+from lbvs_lib.cleanup import clear_ev_and_proof
+from lbvs_lib.compile import shared_library
+from lbvs_lib.election_context import ElectionContext, unpack
+from lbvs_lib.scheme_algorithms import setup, register, cast, code, code_batch, ballot_to_precode
+
+LAYOUT = BallotLayout([4])
+
+
+@pytest.fixture(scope="module")
+def election():
+    pk, dk, ck = setup()
+    voters, items, votes = [], [], []
+    for answer in range(3):
+        vvk, vck, _ = register(pk)
+        vote = LAYOUT.pack([(answer,)])
+        ev, pv = cast(pk, vck, vote)
+        voters.append(vck)
+        items.append((vvk, ev, pv))
+        votes.append(vote)
+    yield pk, dk, ck, voters, items, votes
+    for (_, ev, pv), vote in zip(items, votes):
+        clear_ev_and_proof(ev, pv)
+        shared_library.nmod_poly_clear(vote)
+
+
+def _precode_of(precode, vote, vck) -> bool:
+    expected = ballot_to_precode(vote, vck[0])
+    equal = shared_library.nmod_poly_equal(precode, expected)
+    shared_library.nmod_poly_clear(expected)
+    return equal
+
+
+def _check(results, election):
+    _, _, _, voters, _, votes = election
+    assert [verdict for _, verdict in results] == [True] * len(votes)
+    for (precode, _), vote, vck in zip(results, votes, voters):
+        assert _precode_of(precode, vote, vck)
+        shared_library.nmod_poly_clear(precode)
+
+
+def test_code_batch(election):
+    pk, dk, ck, voters, items, votes = election
+    _check(code_batch(pk, ck, items), election)
+    _check([code(pk, ck, *item) for item in items], election)
+
+    # a ballot checked against the verification key of another voter
+    vvk, ev, pv = items[0]
+    results = code_batch(pk, ck, [items[1], (items[2][0], ev, pv)])
+    assert [verdict for _, verdict in results] == [True, False]
+    for precode, _ in results:
+        shared_library.nmod_poly_clear(precode)
+
+
+def test_election_context(election):
+    pk, dk, ck, voters, items, votes = election
+    with ElectionContext(pk=pk, ck=ck) as context:
+        assert unpack(context, 'pk') == (pk, context)
+        with pytest.raises(ValueError):
+            unpack(context, 'dk')
+        _check(code_batch(context, context, items), election)
+        # a ballot cast with the context is coded as one cast with the keys
+        vote = LAYOUT.pack([(3,)])
+        ev, pv = cast(context, voters[0], vote)
+        (precode, verdict), = code_batch(pk, ck, [(items[0][0], ev, pv)])
+        assert verdict and _precode_of(precode, vote, voters[0])
+        shared_library.nmod_poly_clear(precode)
+        clear_ev_and_proof(ev, pv)
+        shared_library.nmod_poly_clear(vote)
+    assert context.cleared
+    # clearing twice does nothing
+    context.clear()
+    assert unpack(pk, 'pk') == (pk, None)
+    with pytest.raises(ValueError):
+        ElectionContext()
@@ -0,0 +1,90 @@
+import itertools
+import random
+
+import pytest
+
+from lbvs_lib.utils import (CombinationSpace, revolving_door, get_all_voting_combinations,
+                            get_all_voting_combinations_gray)
+
+SPACES = [(1, 0, 1), (4, 1, 2), (5, 0, 5), (6, 3, 3), (7, 2, 4)]
+
+
+@pytest.mark.parametrize("n, k", [(1, 0), (1, 1), (4, 2), (6, 3), (7, 1), (7, 6)])
+def test_revolving_door(n, k):
+    combinations = revolving_door(n, k)
+    assert sorted(combinations) == list(itertools.combinations(range(n), k))
+    for previous, combination in zip(combinations, combinations[1:]):
+        assert len(set(previous) ^ set(combination)) == 2
+
+
+def test_gray_enumeration_covers_every_combination():
+    answers = list(range(6))
+    assert (sorted(get_all_voting_combinations_gray(answers, 1, 4))
+            == sorted(get_all_voting_combinations(answers, 1, 4)))
+
+
+@pytest.mark.parametrize("n_answers, minimum, maximum", SPACES)
+def test_space_follows_the_enumeration(n_answers, minimum, maximum):
+    combinations = list(get_all_voting_combinations(range(n_answers), minimum, maximum))
+    space = CombinationSpace(n_answers, minimum, maximum)
+    assert space.whole
+    assert len(space) == len(combinations)
+    assert list(space) == combinations
+    for index, combination in enumerate(combinations):
+        assert space.rank(combination) == index
+        assert space.unrank(index) == combination
+        assert space[index] == combination
+        assert combination in space
+    assert space[-1] == combinations[-1]
+
+
+def test_rank_rejects_other_combinations():
+    space = CombinationSpace(4, 1, 2)
+    for combination in [(), (0, 1, 2), (4,), (0, 0), (-1, 2)]:
+        assert combination not in space
+        with pytest.raises(ValueError):
+            space.rank(combination)
+    # answers in any order
+    assert space.rank((3, 1)) == space.rank((1, 3))
+    with pytest.raises(IndexError):
+        space.unrank(len(space))
+    with pytest.raises(ValueError):
+        CombinationSpace(4, 1, 2, 3, 20)
+
+
+@pytest.mark.parametrize("n_answers, minimum, maximum", SPACES)
+def test_slices(n_answers, minimum, maximum):
+    space = CombinationSpace(n_answers, minimum, maximum)
+    combinations = list(space)
+    for start in range(len(space) + 1):
+        for stop in range(start, len(space) + 1):
+            part = space[start:stop]
+            assert len(part) == stop - start
+            assert list(part) == combinations[start:stop]
+            assert [part.rank(combination) for combination in part] == list(range(len(part)))
+            assert part.whole == (start == 0 and stop == len(space))
+    with pytest.raises(ValueError):
+        space[::2]
+
+
+@pytest.mark.parametrize("parts", [1, 2, 3, 7, 100])
+def test_split(parts):
+    space = CombinationSpace(7, 2, 4)
+    slices = space.split(parts)
+    assert len(slices) == min(parts, len(space))
+    assert [combination for part in slices for combination in part] == list(space)
+    assert max(map(len, slices)) - min(map(len, slices)) <= 1
+
+
+def test_sample():
+    space = CombinationSpace(5, 1, 3)
+    rng = random.Random(1)
+    samples = [space.sample(rng) for _ in range(2000)]
+    assert all(sample in space for sample in samples)
+    assert set(samples) == set(space)
+    assert space.sample() in space
+
+
+def test_from_question():
+    space = CombinationSpace.from_question({'answers': ["a", "b", "c"], 'min': 1, 'max': 2})
+    assert list(space) == list(get_all_voting_combinations(["a", "b", "c"], 1, 2))
@@ -0,0 +1,117 @@
+import base64
+
+import pytest
+
+from lbvs_lib import return_code_table
+from lbvs_lib.ballot_layout import BallotLayout
+from lbvs_lib.compact_table import CompactTable, MAGIC, OLD_MAGICS, _b64_slice, _count
+from lbvs_lib.compile import shared_library
+from lbvs_lib.return_code_table import CombinationEncoder, ReturnCodeTable
+from lbvs_lib.utils import get_all_voting_combinations
+
+QUESTIONS = [(4, 1, 2), (3, 0, 1)]
+
+
+def _table(questions, code_size=2) -> CompactTable:
+    """
+    A table whose codes are their own index
+    """
+    codes = b"".join(index.to_bytes(code_size, 'big') for index in range(_count(questions)))
+    return CompactTable(questions, codes, code_size)
+
+
+def _question(answers, minimum, maximum) -> dict:
+    return {'answers': [f"answer {i}" for i in range(answers)], 'min': minimum, 'max': maximum}
+
+
+def test_index_of_packed_ballots():
+    table = _table(QUESTIONS)
+    # 10 combinations of the first question times 4 of the second, the first question most significant
+    assert len(table) == 40
+    first = list(get_all_voting_combinations(range(4), 1, 2))
+    second = list(get_all_voting_combinations(range(3), 0, 1))
+    for i, a in enumerate(first):
+        for j, b in enumerate(second):
+            index = table.index([a, b])
+            assert index == i * len(second) + j
+            assert table.unrank(index) == [a, b]
+            assert table.lookup([a, b]) == index.to_bytes(2, 'big')
+
+    with pytest.raises(ValueError):
+        table.index([(0,)])
+    with pytest.raises(ValueError):
+        table.index([(0, 1, 2), ()])
+    with pytest.raises(IndexError):
+        table.unrank(len(table))
+
+
+def test_serialization():
+    table = _table(QUESTIONS, code_size=3)
+    data = table.to_bytes()
+    assert data.startswith(MAGIC)
+    decoded = CompactTable.from_bytes(data)
+    assert decoded.questions == table.questions
+    assert decoded.code_size == 3
+    assert decoded.codes == table.codes
+    assert CompactTable.decode(table.encode()).codes == table.codes
+
+    with pytest.raises(ValueError):
+        CompactTable(QUESTIONS, table.codes[:-1], 3)
+    with pytest.raises(ValueError):
+        CompactTable.from_bytes(b"XXXX" + data[4:])
+
+
+def test_old_formats_are_rejected():
+    # the ranking of RCT1 tables differs, reading them would return the code of another combination
+    data = _table(QUESTIONS).to_bytes()
+    for magic in OLD_MAGICS:
+        with pytest.raises(ValueError, match="recomputed"):
+            CompactTable.from_bytes(magic + data[len(MAGIC):])
+        with pytest.raises(ValueError, match="recomputed"):
+            CompactTable.lookup_encoded(base64.b64encode(magic + data[len(MAGIC):]).decode('ascii'), [(0,), ()])
+
+
+def test_b64_slice():
+    data = bytes(range(50))
+    encoded = base64.b64encode(data).decode('ascii')
+    for start in range(len(data)):
+        for end in range(start, len(data) + 1):
+            assert _b64_slice(encoded, start, end) == data[start:end]
+
+
+def test_lookup_encoded():
+    for code_size in (1, 2, 5):
+        table = _table(QUESTIONS, code_size)
+        encoded = table.encode()
+        for index in range(len(table)):
+            votes = table.unrank(index)
+            assert CompactTable.lookup_encoded(encoded, votes) == table.lookup(votes)
+
+
+def test_compute_truncates_the_return_codes():
+    key = ReturnCodeTable.new_key()
+    questions = [_question(*question) for question in QUESTIONS]
+    tables = CompactTable.compute(key, questions, code_size=8)
+    assert [table.questions for table in tables] == [[question] for question in QUESTIONS]
+    (packed,) = CompactTable.compute(key, questions, packed=True, code_size=8)
+    layout = BallotLayout.from_questions(questions)
+    for index in range(len(packed)):
+        votes = packed.unrank(index)
+        poly = layout.pack(votes)
+        assert packed.lookup(votes) == ReturnCodeTable.nmod_prf(key, poly)[:8]
+        shared_library.nmod_poly_clear(poly)
+        for table, answers in zip(tables, votes):
+            poly = BallotLayout([table.questions[0][0]]).pack([answers])
+            assert table.lookup([answers]) == ReturnCodeTable.nmod_prf(key, poly)[:8]
+            shared_library.nmod_poly_clear(poly)
+
+
+def test_compute_without_the_string_encoder(monkeypatch):
+    key = ReturnCodeTable.new_key()
+    questions = [_question(*question) for question in QUESTIONS]
+    fast = CompactTable.compute(key, questions, packed=True)
+    # where the encoder differs from the library, the codes are computed from the polynomials
+    monkeypatch.setattr(CombinationEncoder, "matches_library", lambda self: False)
+    monkeypatch.setattr(return_code_table, "_codes", None)
+    slow = CompactTable.compute(key, questions, packed=True)
+    assert [table.to_bytes() for table in slow] == [table.to_bytes() for table in fast]
@@ -0,0 +1,91 @@
+import pytest
+
+from lbvs_lib.ballot_layout import BallotLayout
+from lbvs_lib.classes import NMOD_POLY_TYPE
+from lbvs_lib.cleanup import clear_ev_and_proof
+from lbvs_lib.compile import shared_library, MODP
+from lbvs_lib.npview import as_ndarray
+from lbvs_lib.scheme_algorithms import setup, register, cast, count, verify, shard_ranges
+from lbvs_lib.shuffle import Shuffle
+
+LAYOUT = BallotLayout([4])
+ANSWERS = [0, 1, 2, 3, 1, 1, 0]
+
+
+@pytest.fixture(scope="module")
+def keys():
+    pk, dk, ck = setup()
+    return pk, dk, [register(pk)[1] for _ in ANSWERS]
+
+
+@pytest.fixture
+def ballots(keys):
+    """
+    Fresh encrypted ballots, the proof of shuffle shifts the commitments it is given
+    """
+    pk, dk, voters = keys
+    cast_ballots = []
+    for answer, vck in zip(ANSWERS, voters):
+        vote = LAYOUT.pack([(answer,)])
+        cast_ballots.append(cast(pk, vck, vote))
+        shared_library.nmod_poly_clear(vote)
+    yield [ev for ev, _ in cast_ballots]
+    for ev, pv in cast_ballots:
+        clear_ev_and_proof(ev, pv)
+
+
+def _answers(votes, rho) -> list[int]:
+    """
+    The answers of the shuffled votes, sorted
+    """
+    answers = []
+    vote = NMOD_POLY_TYPE()
+    shared_library.nmod_poly_init(vote, MODP)
+    for shuffled in votes:
+        shared_library.nmod_poly_add(vote, shuffled, rho)
+        answers.append(as_ndarray(vote).tolist().index(1))
+    shared_library.nmod_poly_clear(vote)
+    return sorted(answers)
+
+
+def _clear(votes, proof):
+    Shuffle.proof_clear(shared_library, *proof, len(votes))
+    for vote in votes:
+        shared_library.nmod_poly_clear(vote)
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_count_and_verify(keys, ballots, workers):
+    pk, dk, _ = keys
+    votes, proof = count(dk, ballots, workers=workers)
+    assert _answers(votes, proof[7]) == sorted(ANSWERS)
+    assert verify(pk, ballots, votes, proof)
+    _clear(votes, proof)
+
+
+def test_shard_ranges():
+    assert shard_ranges(7, 3) == [range(0, 3), range(3, 6), range(6, 7)]
+    assert shard_ranges(6, 3) == [range(0, 3), range(3, 6)]
+    assert shard_ranges(0, 3) == []
+    with pytest.raises(ValueError):
+        shard_ranges(7, 0)
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_sharded_count_and_verify(keys, ballots, workers):
+    pk, dk, _ = keys
+    votes, proofs = count(dk, ballots, shard_size=3, workers=workers)
+    shards = shard_ranges(len(ballots), 3)
+    assert [len(shard_votes) for shard_votes in votes] == [len(shard) for shard in shards]
+    for shard, shard_votes, proof in zip(shards, votes, proofs):
+        # a vote is only hidden among the votes of its shard
+        assert _answers(shard_votes, proof[7]) == sorted(ANSWERS[i] for i in shard)
+    # the shards are counted on copies, the ballots are verified as cast
+    assert verify(pk, ballots, votes, proofs, shard_size=3, workers=workers)
+
+    # the proofs must match the shards
+    assert not verify(pk, ballots, votes, proofs, shard_size=2)
+    assert not verify(pk, ballots, [votes[1], votes[0], votes[2]], [proofs[1], proofs[0], proofs[2]],
+                      shard_size=3)
+    for shard_votes, proof in zip(votes, proofs):
+        _clear(shard_votes, proof)
@@ -1,3 +1,4 @@
+from lbvs_lib import primitives
 from lbvs_lib.cleanup import clear_ev_and_proof
 from lbvs_lib.scheme_algorithms import *
 from lbvs_lib.serializers2 import *
@@ -31,10 +32,10 @@ if __name__ == '__main__':
     _, _, dk_R2 = ck2
 
     assert CommitmentKey.equals(pk_C, pk_C2)
-    assert PublicKey.equals(pk_V, pk_V2, vericrypt.context)
-    assert PublicKey.equals(pk_R, pk_R2, vericrypt.context)
-    assert PrivateKey.equals(dk_V, dk_V2, vericrypt.context)
-    assert PrivateKey.equals(dk_R, dk_R2, vericrypt.context)
+    assert PublicKey.equals(pk_V, pk_V2, primitives.vericrypt.context)
+    assert PublicKey.equals(pk_R, pk_R2, primitives.vericrypt.context)
+    assert PrivateKey.equals(dk_V, dk_V2, primitives.vericrypt.context)
+    assert PrivateKey.equals(dk_R, dk_R2, primitives.vericrypt.context)
 
     evs = []
     pvs = []
@@ -70,8 +71,8 @@ if __name__ == '__main__':
         print("Deserializing proof")
         pv2 = deserialize_ballot_proof(pv_s)
 
-        assert pv_equals(shared_library, pv, pv2, vericrypt.context)
-        assert ev_equals(shared_library, ev, ev2, vericrypt.context)
+        assert pv_equals(shared_library, pv, pv2, primitives.vericrypt.context)
+        assert ev_equals(shared_library, ev, ev2, primitives.vericrypt.context)
 
         print("Attempting to verify vote with deserialized objects")
 
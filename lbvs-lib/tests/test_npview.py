@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from lbvs_lib import primitives
+from lbvs_lib.classes import FMPZ_MOD_POLY_T
+from lbvs_lib.compile import shared_library, MODP
+from lbvs_lib.npview import (COEFF_MAX, as_ndarray, from_ndarray, to_ndarray, fmpz_as_ndarray,
+                             fmpz_from_ndarray)
+
+
+def test_nmod_round_trip():
+    poly = from_ndarray([1, 0, MODP + 2, 0, 0])
+    # reduced mod MODP, trailing zeros dropped
+    assert as_ndarray(poly).tolist() == [1, 0, 2]
+    shared_library.nmod_poly_clear(poly)
+
+
+def test_nmod_view_aliases_the_polynomial():
+    poly = from_ndarray([1, 2, 3])
+    as_ndarray(poly)[1] = 7
+    assert shared_library.nmod_poly_get_coeff_ui(poly, 1) == 7
+    shared_library.nmod_poly_zero(poly)
+    assert as_ndarray(poly).size == 0
+    shared_library.nmod_poly_clear(poly)
+
+
+def test_nmod_rows():
+    polys = from_ndarray([[1, 2, 3], [4, 0, 0]])
+    assert to_ndarray(polys).tolist() == [[1, 2, 3], [4, 0, 0]]
+    assert to_ndarray(polys, 2).tolist() == [[1, 2], [4, 0]]
+    assert to_ndarray(polys, 4).tolist() == [[1, 2, 3, 0], [4, 0, 0, 0]]
+    # overwritten in place
+    from_ndarray(np.array([[5], [6]]), polys)
+    assert to_ndarray(polys).tolist() == [[5], [6]]
+    for poly in polys:
+        shared_library.nmod_poly_clear(poly)
+
+    with pytest.raises(ValueError):
+        from_ndarray(np.zeros((1, 1, 1)))
+
+
+def test_fmpz_round_trip():
+    ctx = primitives.vericrypt.context
+    poly = fmpz_from_ndarray([5, 0, 6, 0], ctx)
+    assert fmpz_as_ndarray(poly).tolist() == [5, 0, 6]
+    fmpz_from_ndarray([7], ctx, poly)
+    assert fmpz_as_ndarray(poly).tolist() == [7]
+
+    with pytest.raises(ValueError):
+        fmpz_from_ndarray([-1], ctx, poly)
+    with pytest.raises(ValueError):
+        fmpz_from_ndarray([COEFF_MAX + 1], ctx, poly)
+    shared_library.fmpz_mod_poly_clear(poly, ctx)
+
+
+def test_fmpz_rows():
+    ctx = primitives.vericrypt.context
+    polys = fmpz_from_ndarray([[1, 2], [0, 3]], ctx)
+    assert isinstance(polys[0], FMPZ_MOD_POLY_T)
+    assert [fmpz_as_ndarray(poly).tolist() for poly in polys] == [[1, 2], [0, 3]]
+    for poly in polys:
+        shared_library.fmpz_mod_poly_clear(poly, ctx)
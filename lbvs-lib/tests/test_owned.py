@@ -0,0 +1,54 @@
+import gc
+
+import pytest
+
+from lbvs_lib import owned
+from lbvs_lib.ballot_layout import BallotLayout
+from lbvs_lib.classes import NMOD_POLY_TYPE
+from lbvs_lib.layouts import Field, ENCRYPTED_BALLOT, BALLOT_PROOF
+from lbvs_lib.owned import Owned, own
+from lbvs_lib.scheme_algorithms import setup, register, cast
+
+
+@pytest.fixture
+def cleared(monkeypatch):
+    cleared = []
+    monkeypatch.setattr(owned, "clear", lambda value, layout: cleared.append((value, layout)))
+    return cleared
+
+
+def test_cleared_once(cleared):
+    handle = Owned("value", "layout")
+    assert handle.alive
+    handle.close()
+    handle.close()
+    assert cleared == [("value", "layout")]
+    assert not handle.alive and handle.value is None
+
+    with Owned("block", "layout") as value:
+        assert value == "block"
+    assert cleared[-1] == ("block", "layout")
+
+    Owned("collected", "layout")
+    gc.collect()
+    assert cleared[-1] == ("collected", "layout")
+
+
+def test_detach(cleared):
+    handle = own("value", "layout")
+    assert handle.detach() == "value"
+    del handle
+    gc.collect()
+    assert cleared == []
+    assert own("value", "layout", owned=False) == "value"
+
+
+def test_owned_ballot():
+    pk, dk, ck = setup()
+    _, vck, _ = register(pk)
+    with Owned(BallotLayout([4]).pack([(1,)]), Field(NMOD_POLY_TYPE)) as vote:
+        ballot = own(cast(pk, vck, vote), (ENCRYPTED_BALLOT, BALLOT_PROOF))
+        ev, pv = ballot.value
+        assert ev[0].c1[0][0].length > 0
+        ballot.close()
+        assert not ballot.alive
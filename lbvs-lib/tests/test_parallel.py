@@ -0,0 +1,55 @@
+from lbvs_lib import parallel, primitives
+from lbvs_lib.ballot_layout import BallotLayout
+from lbvs_lib.classes import NMOD_POLY_TYPE
+from lbvs_lib.cleanup import clear_ev_and_proof
+from lbvs_lib.compile import shared_library
+from lbvs_lib.layouts import Field, Sequence, FLAG, ENCRYPTED_BALLOT, BALLOT_PROOF, clear
+from lbvs_lib.parallel import pack, unpack, map_cast, map_code
+from lbvs_lib.scheme_algorithms import setup, register, cast, code_batch
+from lbvs_lib.utils import ev_equals, pv_equals
+
+
+def test_default_workers(monkeypatch):
+    monkeypatch.setenv(parallel.WORKERS_ENV, "3")
+    assert parallel.default_workers() == 3
+    monkeypatch.delenv(parallel.WORKERS_ENV)
+    assert parallel.default_workers() >= 1
+
+
+def test_pack_and_unpack():
+    pk, dk, ck = setup()
+    _, vck, _ = register(pk)
+    vote = BallotLayout([4]).pack([(1,)])
+    ballot = cast(pk, vck, vote)
+    layout = (Sequence(Field(NMOD_POLY_TYPE)), (ENCRYPTED_BALLOT, BALLOT_PROOF), FLAG)
+    data = pack(([vote, vote], ballot, True), layout)
+    votes, (ev, pv), flag = unpack(data, layout)
+    assert flag is True
+    assert len(votes) == 2 and all(shared_library.nmod_poly_equal(v, vote) for v in votes)
+    assert ev_equals(shared_library, ballot[0], ev, primitives.vericrypt.context)
+    assert pv_equals(shared_library, ballot[1], pv, primitives.vericrypt.context)
+    # packing is deterministic
+    assert pack((votes, (ev, pv), flag), layout) == data
+    clear((votes, (ev, pv), flag), layout)
+    clear_ev_and_proof(*ballot)
+    shared_library.nmod_poly_clear(vote)
+
+
+def test_map_cast_and_code():
+    pk, dk, ck = setup()
+    layout = BallotLayout([4])
+    voters = [register(pk) for _ in range(3)]
+    votes = [layout.pack([(i,)]) for i in range(3)]
+    ballots = map_cast(pk, [(vck, vote) for (_, vck, _), vote in zip(voters, votes)], workers=2)
+    items = [(vvk, ev, pv) for (vvk, _, _), (ev, pv) in zip(voters, ballots)]
+    results = map_code(pk, ck, items, workers=2)
+    assert [verdict for _, verdict in results] == [True] * 3
+    in_process = code_batch(pk, ck, items)
+    for (precode, _), (expected, _) in zip(results, in_process):
+        assert shared_library.nmod_poly_equal(precode, expected)
+        shared_library.nmod_poly_clear(precode)
+        shared_library.nmod_poly_clear(expected)
+    for ev, pv in ballots:
+        clear_ev_and_proof(ev, pv)
+    for vote in votes:
+        shared_library.nmod_poly_clear(vote)
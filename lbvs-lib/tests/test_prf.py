@@ -0,0 +1,75 @@
+import hashlib
+import hmac
+import struct
+
+import pytest
+
+from lbvs_lib.ballot_layout import BallotLayout
+from lbvs_lib.compile import shared_library, MODP
+from lbvs_lib.prf import (ENGINES, DEFAULT_ENGINE, CompactEncoder, StringEncoder, encode_compact, encode_string,
+                          new_engine)
+from lbvs_lib.return_code_table import ReturnCodeTable, _codes
+from lbvs_lib.utils import revolving_door
+
+WIDTH = 6
+# every combination of each size in revolving door order, then in lexicographic order, so the encoders flip
+# one pair of coefficients as well as many
+COMBINATIONS = ([combination for size in range(WIDTH + 1) for combination in revolving_door(WIDTH, size)]
+                + [combination for size in range(WIDTH + 1) for combination in sorted(revolving_door(WIDTH, size))])
+
+
+def _poly(combination):
+    return BallotLayout([WIDTH]).pack([combination])
+
+
+def test_compact_encoding():
+    poly = _poly((0, 2))
+    assert encode_compact(poly) == struct.pack("<4I", 3, 1, 0, 1)
+    shared_library.nmod_poly_zero(poly)
+    assert encode_compact(poly) == struct.pack("<I", 0)
+    shared_library.nmod_poly_set_coeff_ui(poly, 1, MODP - 1)
+    assert encode_compact(poly) == struct.pack("<3I", 2, 0, MODP - 1)
+    shared_library.nmod_poly_clear(poly)
+
+
+@pytest.mark.parametrize("encoder, encode", [(StringEncoder, encode_string), (CompactEncoder, encode_compact)])
+def test_combination_encoders(encoder, encode):
+    encoder = encoder(WIDTH)
+    for combination in COMBINATIONS:
+        poly = _poly(combination)
+        assert encoder.encode(combination) == encode(poly), combination
+        shared_library.nmod_poly_clear(poly)
+
+
+def test_engines():
+    key = ReturnCodeTable.new_key()
+    message = b"1 3906450253  1"
+    assert new_engine(key).name == DEFAULT_ENGINE
+    assert new_engine(key, "hmac-sha512").digest(message) == hmac.new(key, message, hashlib.sha512).digest()
+    assert new_engine(key, "blake2b").digest(message) == hashlib.blake2b(message, key=key).digest()
+    # keys longer than BLAKE2b takes are hashed first
+    long_key = bytes(100)
+    assert (new_engine(long_key, "blake2b").digest(message)
+            == hashlib.blake2b(message, key=hashlib.blake2b(long_key).digest()).digest())
+    with pytest.raises(ValueError):
+        new_engine(key, "md5")
+
+    for name in ENGINES:
+        engine = new_engine(key, name)
+        # the keyed state is copied, not consumed
+        assert engine.digest_many([message, b"", message]) == [engine.digest(message), engine.digest(b""),
+                                                                engine.digest(message)]
+
+
+@pytest.mark.parametrize("name", list(ENGINES))
+def test_table_codes_are_the_codes_of_the_polynomials(name):
+    key = ReturnCodeTable.new_key()
+    engine = new_engine(key, name)
+    codes = _codes(key, COMBINATIONS, WIDTH, name)
+    polys = [_poly(combination) for combination in COMBINATIONS]
+    assert [codes[combination][1] for combination in COMBINATIONS] == engine.polys(polys)
+    assert engine.poly(polys[1]) == ReturnCodeTable.nmod_prf(key, polys[1], engine=name)
+    if name == DEFAULT_ENGINE:
+        assert engine.poly(polys[1]) == ReturnCodeTable.prf(key, encode_string(polys[1]))
+    for poly in polys:
+        shared_library.nmod_poly_clear(poly)
@@ -0,0 +1,66 @@
+import subprocess
+import sys
+import threading
+import types
+
+import pytest
+
+from lbvs_lib import primitives
+
+
+def _run(code: str):
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_primitives_are_set_up_on_first_use():
+    _run("from lbvs_lib import primitives, serializers2\n"
+         "assert not primitives.is_initialized()\n"
+         "primitives.commitment_scheme\n"
+         "assert primitives.is_initialized() and primitives.vericrypt is primitives.get_primitives().vericrypt\n")
+
+
+def test_thread_safe_mode_is_set_before_use():
+    primitives.get_primitives()
+    with pytest.raises(RuntimeError):
+        primitives.set_thread_safe(not primitives.get_primitives().thread_safe)
+    # setting the current mode again is allowed
+    primitives.set_thread_safe(primitives.get_primitives().thread_safe)
+
+
+def test_serialized_calls():
+    inside = []
+
+    def sample(i):
+        inside.append(i)
+        assert len(inside) == 1
+        inside.pop()
+        return i
+
+    library = types.SimpleNamespace(sample=sample)
+    primitives.serialize_calls(library, ["sample", "missing"])
+    assert isinstance(library.sample, primitives.SerializedCall)
+    threads = [threading.Thread(target=lambda: [library.sample(i) for i in range(1000)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert library.sample(3) == 3
+
+
+def test_casts_from_threads():
+    # a process of its own, the mode is chosen before the primitives are set up
+    _run("from concurrent.futures import ThreadPoolExecutor\n"
+         "from lbvs_lib import primitives\n"
+         "primitives.set_thread_safe()\n"
+         "from lbvs_lib.ballot_layout import BallotLayout\n"
+         "from lbvs_lib.election_context import ElectionContext\n"
+         "from lbvs_lib.scheme_algorithms import setup, register, cast, code\n"
+         "pk, dk, ck = setup()\n"
+         "context = ElectionContext(pk=pk, ck=ck)\n"
+         "voters = [register(pk) for _ in range(8)]\n"
+         "def cast_and_code(voter):\n"
+         "    vvk, vck, _ = voter\n"
+         "    ev, pv = cast(context, vck, BallotLayout([4]).pack([(1,)]))\n"
+         "    return code(context, context, vvk, ev, pv)[1]\n"
+         "with ThreadPoolExecutor(4) as executor:\n"
+         "    assert all(executor.map(cast_and_code, voters))\n")
@@ -0,0 +1,56 @@
+import pytest
+
+from lbvs_lib import profiler
+
+
+class Library:
+    """
+    Binds its functions on first lookup, as ctypes.CDLL does
+    """
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+
+        def function(*args):
+            return sum(args)
+
+        setattr(self, name, function)
+        return function
+
+
+@pytest.fixture
+def library():
+    library = Library()
+    yield library
+    profiler.disable()
+    profiler.reset()
+
+
+def test_profiled_calls(library):
+    bound = library.add
+    with profiler.profiling(library):
+        assert profiler.is_enabled()
+        assert library.add(1, 2) == 3
+        # functions looked up for the first time are wrapped too
+        assert [library.add_all(2, i) for i in range(2)] == [2, 3]
+    assert not profiler.is_enabled()
+    assert type(library) is Library
+    assert library.add is bound
+
+    rows = {row["function"]: row for row in profiler.results()}
+    assert rows["add"]["calls"] == 1 and rows["add_all"]["calls"] == 2
+    assert rows["add_all"]["callers"][0]["calls"] == 2
+    assert __file__ in rows["add_all"]["callers"][0]["caller"]
+    assert "add_all" in profiler.report()
+
+
+def test_statistics_are_kept_until_reset(library, tmp_path):
+    with profiler.profiling(library):
+        library.add(1)
+    with profiler.profiling(library, reset_stats=False):
+        library.add(1)
+    assert profiler.results()[0]["calls"] == 2
+    profiler.dump(str(tmp_path / "profile.json"))
+    assert (tmp_path / "profile.json").read_text().startswith("[")
+    profiler.reset()
+    assert profiler.results() == []
@@ -0,0 +1,50 @@
+import io
+import json
+
+import pytest
+
+from lbvs_lib.compile import shared_library, MODP
+from lbvs_lib.classes import NMOD_POLY_TYPE
+from lbvs_lib.return_code_table import ReturnCodeTable
+
+QUESTIONS = [
+    {'answers': ["a", "b", "c", "d"], 'min': 1, 'max': 2},
+    {'answers': ["yes", "no"], 'min': 0, 'max': 1},
+]
+
+
+@pytest.fixture
+def blinding_key():
+    poly = NMOD_POLY_TYPE()
+    shared_library.nmod_poly_init(poly, MODP)
+    shared_library.nmod_poly_set_coeff_ui(poly, 0, 7)
+    yield poly
+    shared_library.nmod_poly_clear(poly)
+
+
+def test_shared_tables_are_the_tables_of_every_question(blinding_key):
+    key = ReturnCodeTable.new_key()
+    received = {}
+    n = ReturnCodeTable.compute_shared_tables(key, 3, questions=QUESTIONS, workers=1,
+                                              sink=lambda voter, tables: received.update({voter: tables}))
+    assert n == 3
+    assert list(received) == [0, 1, 2]
+    assert received[0] == [ReturnCodeTable.compute_table(key, blinding_key, question=question)
+                           for question in QUESTIONS]
+    # computed once, every voter holds the same tables
+    assert received[1] is received[0] and received[2] is received[0]
+    assert ReturnCodeTable.compute_shared_tables(key, 0, questions=QUESTIONS, sink=received.update) == 0
+
+
+def test_shared_tables_written_as_json_lines(blinding_key):
+    key = ReturnCodeTable.new_key()
+    with pytest.raises(ValueError):
+        ReturnCodeTable.compute_shared_tables(key, 2, questions=QUESTIONS)
+    with pytest.raises(ValueError):
+        ReturnCodeTable.compute_shared_tables(key, 2, questions=QUESTIONS, sink=io.StringIO())
+
+    file = io.StringIO()
+    ReturnCodeTable.compute_shared_tables(key, 2, questions=QUESTIONS, workers=1, sink=file, b64=True)
+    lines = [json.loads(line) for line in file.getvalue().splitlines()]
+    tables = [ReturnCodeTable.compute_table(key, blinding_key, question=question, b64=True) for question in QUESTIONS]
+    assert lines == [{"voter": 0, "tables": tables}, {"voter": 1, "tables": tables}]
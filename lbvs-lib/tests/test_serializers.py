@@ -0,0 +1,50 @@
+import ctypes
+import json
+
+import pytest
+
+from lbvs_lib import primitives
+from lbvs_lib.ballot_layout import BallotLayout
+from lbvs_lib.classes import Commitment, Veritext, NMOD_POLY_TYPE
+from lbvs_lib.cleanup import clear_ev_and_proof
+from lbvs_lib.compile import shared_library
+from lbvs_lib.scheme_algorithms import setup, register, cast
+from lbvs_lib.serializers import (compile_plan, serialize_pk, deserialize_pk, serialize_vvk, deserialize_vvk,
+                                  serialize_encrypted_ballot, deserialize_encrypted_ballot, serialize_ballot_proof,
+                                  deserialize_ballot_proof)
+from lbvs_lib.utils import ev_equals, pv_equals, nmod_poly_to_string
+
+
+def test_plans_are_compiled_once():
+    plan = compile_plan(Commitment)
+    assert compile_plan(Commitment) is plan
+    assert compile_plan(Commitment * 2).element is plan
+    assert compile_plan(Veritext, 'p') is not compile_plan(Veritext)
+    with pytest.raises(TypeError):
+        compile_plan(ctypes.c_int * 2)
+
+
+def test_ballot_round_trip():
+    pk, dk, ck = setup()
+    vvk, vck, _ = register(pk)
+    vote = BallotLayout([4]).pack([(2,)])
+    ev, pv = cast(pk, vck, vote)
+
+    # through JSON, as the players exchange them
+    decoded_ev = deserialize_encrypted_ballot(json.loads(json.dumps(serialize_encrypted_ballot(ev))))
+    decoded_pv = deserialize_ballot_proof(json.loads(json.dumps(serialize_ballot_proof(pv))))
+    assert ev_equals(shared_library, ev, decoded_ev, primitives.vericrypt.context)
+    assert pv_equals(shared_library, pv, decoded_pv, primitives.vericrypt.context)
+    assert serialize_pk(deserialize_pk(serialize_pk(pk))) == serialize_pk(pk)
+
+    # the format of the reflective serializer: dicts of fields, nested lists and FLINT strings
+    serialized = serialize_vvk(vvk)
+    assert list(serialized) == ["c1", "c2"]
+    assert serialized["c2"][1] == nmod_poly_to_string(shared_library, vvk.c2[1])
+    decoded_vvk = deserialize_vvk(serialized)
+    assert isinstance(decoded_vvk.c1[0], NMOD_POLY_TYPE)
+    assert serialize_vvk(decoded_vvk) == serialized
+
+    shared_library.nmod_poly_clear(vote)
+    clear_ev_and_proof(ev, pv)
+    clear_ev_and_proof(decoded_ev, decoded_pv)
@@ -0,0 +1,87 @@
+import base64
+
+import pytest
+
+from lbvs_lib.classes import FMPZ_T, FMPZ_MOD_CTX_T, FMPZ_MOD_POLY_T
+from lbvs_lib.compile import shared_library, MODP
+from lbvs_lib.npview import as_ndarray, from_ndarray
+from lbvs_lib.serializers2 import NmodRepr, FmpzRepr
+
+# the moduli of the fmpz_mod round trips: word sized ones are read as NumPy arrays, residues of 2 ** 62 and above
+# are mpz pointers
+MODULI = [MODP, (1 << 40) + 15, (1 << 62) - 57, (1 << 63) + 29, (1 << 64) - 59, (1 << 100) + 277]
+
+
+def _fmpz(value: int) -> FMPZ_T:
+    fmpz = FMPZ_T()
+    shared_library.fmpz_init(fmpz)
+    shared_library.fmpz_set_str(fmpz, format(value, 'x').encode('ascii'), 16)
+    return fmpz
+
+
+@pytest.fixture
+def new_ctx():
+    contexts = []
+
+    def new(modulus: int) -> FMPZ_MOD_CTX_T:
+        n = _fmpz(modulus)
+        ctx = FMPZ_MOD_CTX_T()
+        shared_library.fmpz_mod_ctx_init(ctx, n)
+        shared_library.fmpz_clear(n)
+        contexts.append(ctx)
+        return ctx
+
+    yield new
+    for ctx in contexts:
+        shared_library.fmpz_mod_ctx_clear(ctx)
+
+
+def _fmpz_mod_poly(coefficients, ctx) -> FMPZ_MOD_POLY_T:
+    poly = FMPZ_MOD_POLY_T()
+    shared_library.fmpz_mod_poly_init(poly, ctx)
+    FmpzRepr('list').deserialize(poly, [[i, str(coefficient)] for i, coefficient in enumerate(coefficients)], ctx)
+    return poly
+
+
+def _coefficients(poly: FMPZ_MOD_POLY_T, ctx) -> list[int]:
+    coefficients = [0] * poly[0].length
+    for i, coefficient in FmpzRepr('list').serialize(poly, ctx):
+        coefficients[i] = int(coefficient)
+    return coefficients
+
+
+def test_nmod_bin_round_trip():
+    repr = NmodRepr('bin')
+    poly = from_ndarray([1, 0, MODP - 1, 7])
+    encoded = repr.serialize(poly)
+    # 4 bytes per coefficient
+    assert len(base64.b64decode(encoded)) == 16
+    decoded = from_ndarray([5, 5, 5, 5, 5, 5])
+    repr.deserialize(decoded, encoded)
+    assert as_ndarray(decoded).tolist() == [1, 0, MODP - 1, 7]
+    shared_library.nmod_poly_clear(poly)
+    shared_library.nmod_poly_clear(decoded)
+
+
+@pytest.mark.parametrize("modulus", MODULI)
+def test_fmpz_bin_round_trip(new_ctx, modulus):
+    ctx = new_ctx(modulus)
+    width = FmpzRepr.coeff_width(ctx)
+    assert width == (modulus.bit_length() + 7) // 8
+    repr = FmpzRepr('bin')
+    coefficients = [1, 0, modulus - 1, modulus // 2, 2]
+    poly = _fmpz_mod_poly(coefficients, ctx)
+    encoded = repr.serialize(poly, ctx)
+    assert len(base64.b64decode(encoded)) == len(coefficients) * width
+    decoded = _fmpz_mod_poly([3] * 8, ctx)
+    repr.deserialize(decoded, encoded, ctx)
+    assert _coefficients(decoded, ctx) == coefficients
+    shared_library.fmpz_mod_poly_clear(poly, ctx)
+    shared_library.fmpz_mod_poly_clear(decoded, ctx)
+
+
+def test_unknown_representation():
+    with pytest.raises(ValueError):
+        NmodRepr('hex')
+    with pytest.raises(ValueError):
+        FmpzRepr('hex')
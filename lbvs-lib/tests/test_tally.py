@@ -0,0 +1,62 @@
+import numpy as np
+
+from lbvs_lib import tally as tally_module
+from lbvs_lib.ballot_layout import BallotLayout
+from lbvs_lib.compile import shared_library, MODP
+from lbvs_lib.npview import from_ndarray
+from lbvs_lib.tally import sum_polys, tally
+
+
+def _clear(polys):
+    for poly in polys:
+        shared_library.nmod_poly_clear(poly)
+
+
+def _shuffled(votes, rho):
+    """
+    The ballots count returns for the votes, shifted by rho
+    """
+    return from_ndarray((np.array(votes, dtype=np.uint64) + np.array(rho, dtype=np.uint64)) % MODP)
+
+
+def test_sum_polys():
+    polys = from_ndarray([[1, 2, 3, 0], [MODP - 1, 0, 1, 0], [0, 0, 0, 4]])
+    assert sum_polys(polys, 4).tolist() == [0, 2, 4, 4]
+    # coefficients past the width are ignored
+    assert sum_polys(polys, 2).tolist() == [0, 2]
+    assert sum_polys(polys[:0], 3).tolist() == [0, 0, 0]
+    _clear(polys)
+
+
+def test_sum_polys_in_blocks(monkeypatch):
+    rows = np.random.default_rng(1).integers(0, MODP, size=(7, 5), dtype=np.uint64)
+    polys = from_ndarray(rows)
+    expected = [sum(int(value) for value in column) % MODP for column in rows.T]
+    monkeypatch.setattr(tally_module, "BLOCK", 3)
+    assert sum_polys(polys, 5).tolist() == expected
+    _clear(polys)
+
+
+def test_tally():
+    votes = [[1, 0, 1], [0, 0, 1], [1, 0, 0]]
+    rho_coefficients = [5, MODP - 1, 7, 3]
+    rho = from_ndarray(rho_coefficients)
+    ballots = _shuffled([vote + [0] for vote in votes], rho_coefficients)
+    assert tally(ballots, rho) == [[2, 0, 2]]
+    _clear(ballots)
+    shared_library.nmod_poly_clear(rho)
+
+
+def test_tally_of_shards_and_packed_ballots():
+    layout = BallotLayout([2, 3])
+    shards, rhos = [], []
+    for votes, rho_coefficients in [([[0], [1, 2]], [1, 2, 3]), ([[1], [0]], [MODP - 2, 0, 0, 0, 9])]:
+        vote = np.zeros(5, dtype=np.uint64)
+        vote[list(layout.to_global(0, votes[0]) + layout.to_global(1, votes[1]))] = 1
+        rho_coefficients = rho_coefficients + [0] * (5 - len(rho_coefficients))
+        shards.append(_shuffled([vote, vote], rho_coefficients))
+        rhos.append(from_ndarray(rho_coefficients))
+    assert tally(shards, rhos, layout) == [[2, 2], [2, 2, 2]]
+    for shard, rho in zip(shards, rhos):
+        _clear(shard)
+        shared_library.nmod_poly_clear(rho)
@@ -1,7 +1,9 @@
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from db.engine import SessionDep, create_db_and_tables
+from lbvs_lib import accounting
+from lbvs_lib.compile import selected_build
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -9,3 +11,20 @@ async def lifespan(app: FastAPI):
     yield
 
 app = FastAPI(lifespan=lifespan)
+
+
+@app.get("/build")
+def library_build() -> dict:
+    # the build of the lattice library loaded on this host, see lbvs_lib.builds
+    return selected_build()._asdict()
+
+if accounting.from_env():
+    # LBVS_ACCOUNTING: every request is a phase of the library heap accounting
+    @app.middleware("http")
+    async def account_request(request: Request, call_next):
+        with accounting.phase(f"{request.method} {request.url.path}"):
+            return await call_next(request)
+
+    @app.get("/accounting")
+    def accounting_report() -> dict:
+        return {**accounting.snapshot(), "live_objects": accounting.live_objects()}
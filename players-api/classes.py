@@ -103,10 +103,23 @@ class ElectionInstance(BaseModel):
     ballot_box_url: str
     election_uuid: str
     ballot_box_uuid: str
+    # number of answers per question when every question is packed in a single ballot
+    layout: list[int] | None = None
+
+class BallotQuestion(BaseModel):
+    answers: int
+    min: int
+    max: int
 
 class ReturnCodeSetup(BaseModel):
     instance: ElectionInstance
     ck: ElectionCK
+    # the name of the PRF engine of the return codes (lbvs_lib.prf.ENGINES), the default engine if None
+    prf_engine: str | None = None
+    # the size of the return codes when the phones hold compact tables (lbvs_lib.compact_table), full codes if None.
+    # The tables of the questions are then computed at setup and sent to the phone of every voter registered
+    code_size: int | None = None
+    questions: list[BallotQuestion] | None = None
 
 class ShuffleServerSetup(BaseModel):
     instance: ElectionInstance
@@ -117,6 +130,11 @@ class AuditorSetup(BaseModel):
 
 class PrfKey(BaseModel):
     key: str
+    engine: str
+
+class CompactTables(BaseModel):
+    # per question, or for packed ballots once, a CompactTable encoded in base64
+    tables: list[str]
 
 ########################################
 # Registration Phase
@@ -139,7 +157,9 @@ class VoterRegistration(BaseModel):
 
 class PhoneRegistration(BaseModel):
     voter_uuid: str
-    rct: list[dict]
+    # per question, or for packed ballots once: a ReturnCodeTable, or a CompactTable encoded in base64
+    rct: list[dict | str]
+    layout: list[int] | None = None
 
 ########################################
 # Casting Phase
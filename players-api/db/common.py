@@ -19,6 +19,8 @@ class PlayerInstance(SQLModel, table=False):
     return_code_server_url: str = Field(nullable=False)
     ballot_box_url: str = Field(nullable=False)
     state: str = Field(nullable=False, default="setup")
+    # number of answers per question for packed ballots, empty when every question is cast separately
+    layout: list[int] = ListType(nullable=True)
 
     def next_state(self):
         self.set_state(STATES.index(self.state) + 1)
@@ -7,5 +7,6 @@ class PhoneInstance(SQLModel, table=True):
     __tablename__ = "phone"
     id: int | None = Field(default=None, primary_key=True)
     voter_uuid: str = Field(nullable=False)
-    rct: list[dict] = ListType()
+    rct: list[dict | str] = ListType()
+    layout: list[int] = ListType(nullable=True)
     expected_return_codes: list[str] = ListType()
\ No newline at end of file
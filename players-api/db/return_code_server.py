@@ -2,7 +2,9 @@ from typing import Dict
 
 from sqlmodel import Field, SQLModel, Column, Table, Relationship
 
-from .common import PlayerInstance, SerializableType, Vote
+from lbvs_lib.prf import DEFAULT_ENGINE
+
+from .common import PlayerInstance, SerializableType, ListType, Vote
 
 class ReturnCodeVoteLink(SQLModel, table=True):
     __tablename__ = "return_code_vote_link"
@@ -13,6 +15,11 @@ class ReturnCodeServerInstance(PlayerInstance, table=True):
     __tablename__ = "return_code_server"
     ck: Dict | None = SerializableType()
     prf_key: str = Field(nullable=False, unique=True)
+    prf_engine: str = Field(default=DEFAULT_ENGINE, nullable=False)
+    # the size of the return codes of the compact tables of the phones, None for full codes
+    code_size: int | None = Field(default=None, nullable=True)
+    # the compact tables of the phones, in base64, the same for every voter
+    compact_tables: list[str] = ListType(nullable=True)
     votes: list[Vote] = Relationship(link_model=ReturnCodeVoteLink)
     election_uuid: str = Field(nullable=False, unique=True)
     ballot_box_uuid: str = Field(nullable=False, unique=True)
\ No newline at end of file
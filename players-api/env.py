@@ -1,6 +1,14 @@
 import os
 
 port = int(os.environ.get("PORT", "8080"))
+# Polynomial representation on the wire and in the database, every player must use the same one
+poly_repr = os.environ.get("POLY_REPR", "str")
+# Write the short polynomials of ballot proofs with the centered varint codec
+centered_proofs = os.environ.get("CENTERED_PROOFS", "0") == "1"
+# Processes used by the shuffle server to decrypt ballots, 0 or 1 decrypts in the server process
+count_workers = int(os.environ.get("COUNT_WORKERS", "0"))
+# Ballots per shuffle proof, 0 proves every ballot of a question at once. Votes are only hidden within their shard
+count_shard_size = int(os.environ.get("COUNT_SHARD_SIZE", "0"))
 
 # Load only required modules
 modules = ["SHUFFLE_SERVER", "RETURN_CODE_SERVER", "AUDITOR", "VOTER", "PHONE"]
@@ -1,5 +1,5 @@
 # import env firt to load routes and tables
-from env import port
+from env import port, poly_repr
 from lbvs_lib.serializers2 import set_repr
 
 import uvicorn
@@ -7,7 +7,7 @@ import os
 from app import app
 
 if __name__ == "__main__":
-    set_repr("str")
+    set_repr(poly_repr)
     kwargs = {
         "app": app,
         "port": port,
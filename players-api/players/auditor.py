@@ -1,11 +1,16 @@
 import requests
 from lbvs_lib.compile import shared_library, MODP
 from lbvs_lib.classes import NMOD_POLY_TYPE
+from lbvs_lib.ballot_layout import BallotLayout
 from lbvs_lib.cleanup import clear_ev_and_proof
 from lbvs_lib.serializers2 import deserialize_shuffle_proof, deserialize_nmod_poly, deserialize_encrypted_ballot, \
     recursive_deserialize_nmod_poly, deserialize_pk, serialize_nmod_poly, deserialize_ballot_proof
-from lbvs_lib.primitives import vericrypt
+from lbvs_lib import primitives
+from lbvs_lib.layouts import Sequence, ENCRYPTED_BALLOT
+from lbvs_lib.npview import from_ndarray
+from lbvs_lib.owned import Owned
 from lbvs_lib.scheme_algorithms import verify
+from lbvs_lib.tally import tally
 from lbvs_lib.utils import ev_equals, pv_equals
 from requests import session
 
@@ -56,9 +61,9 @@ def verify_ballots(ev_and_proof_from_bb: EncryptedBallotProofList, session: Sess
             ev_code_server = deserialize_encrypted_ballot(ev_rcs)
             proof_code_server = deserialize_ballot_proof(proof_rcs)
 
-            if not ev_equals(shared_library, ev_ballot_box, ev_code_server, vericrypt.context):
+            if not ev_equals(shared_library, ev_ballot_box, ev_code_server, primitives.vericrypt.context):
                 equal_ballots = False
-            if not pv_equals(shared_library, proof_ballot_box, proof_code_server, vericrypt.context):
+            if not pv_equals(shared_library, proof_ballot_box, proof_code_server, primitives.vericrypt.context):
                 equal_ballots = False
 
             clear_ev_and_proof(ev_ballot_box, proof_ballot_box)
@@ -96,36 +101,63 @@ def ready(election_uuid: str, session: SessionDep) -> dict[str, bool]:
 @app.get("/auditor/verify_shuffle")
 def counting_phase(election_uuid: str,session: SessionDep) -> dict:
     instance = session.query(AuditorInstance).filter_by(election_uuid=election_uuid).first()
-    pk = deserialize_pk(instance.pk)
+    keys = deserialize_pk(instance.pk, owned=True)
+    pk = keys.value
 
     result = True
     election_count = []
     election_ballots = []
+    election_tally = []
     for i in range(len(instance.shuffle_proofs)):
-        proof = deserialize_shuffle_proof(instance.shuffle_proofs[i])
-        n_votes = len(instance.ballots[i])
-        ballots = (NMOD_POLY_TYPE * n_votes)()
-        recursive_deserialize_nmod_poly(ballots, instance.ballots[i], [n_votes])
-        evs = [deserialize_encrypted_ballot(ev) for ev in instance.evs[i]]
-        result &= verify(pk, evs, ballots, proof)
+        # a sharded count has one proof per shard and the votes of all shards in shard order
+        sharded = "shards" in instance.shuffle_proofs[i]
+        serialized_proofs = instance.shuffle_proofs[i]["shards"] if sharded else [instance.shuffle_proofs[i]]
+        owned_proofs = [deserialize_shuffle_proof(proof, owned=True) for proof in serialized_proofs]
+        proofs = [proof.value for proof in owned_proofs]
+        shard_ballots = []
+        offset = 0
+        for proof in proofs:
+            shard_length = len(proof[0])
+            ballots = (NMOD_POLY_TYPE * shard_length)()
+            recursive_deserialize_nmod_poly(ballots, instance.ballots[i][offset:offset + shard_length], [shard_length])
+            shard_ballots.append(ballots)
+            offset += shard_length
+        owned_evs = Owned([deserialize_encrypted_ballot(ev) for ev in instance.evs[i]], Sequence(ENCRYPTED_BALLOT))
+        evs = owned_evs.value
+        if sharded:
+            result &= verify(pk, evs, shard_ballots, proofs, shard_size=len(proofs[0][0]))
+        else:
+            result &= verify(pk, evs, shard_ballots[0], proofs[0])
 
         aux = NMOD_POLY_TYPE()
-        aux2 = NMOD_POLY_TYPE()
         shared_library.nmod_poly_init(aux, MODP)
-        shared_library.nmod_poly_init(aux2, MODP)
-        shared_library.nmod_poly_zero(aux2)
         election_ballots.append([])
-        for j in range(n_votes):
-            shared_library.nmod_poly_add(aux, ballots[j], proof[7])
-            shared_library.nmod_poly_add(aux2, aux2, aux)
-            election_ballots[i].append(serialize_nmod_poly(aux))
-            shared_library.nmod_poly_clear(ballots[j])
-        election_count.append(serialize_nmod_poly(aux2))
+        for ballots, proof in zip(shard_ballots, proofs):
+            for j in range(len(ballots)):
+                shared_library.nmod_poly_add(aux, ballots[j], proof[7])
+                election_ballots[i].append(serialize_nmod_poly(aux))
+        layout = BallotLayout(instance.layout) if instance.layout else None
+        counts = tally(shard_ballots, [proof[7] for proof in proofs], layout)
+        count = from_ndarray([answer_count for question in counts for answer_count in question])
+        election_count.append(serialize_nmod_poly(count))
+        shared_library.nmod_poly_clear(count)
+        if layout is not None:
+            # packed ballots: the count of every question is read back by range
+            election_tally.extend(counts)
+        for ballots in shard_ballots:
+            for j in range(len(ballots)):
+                shared_library.nmod_poly_clear(ballots[j])
         shared_library.nmod_poly_clear(aux)
-        shared_library.nmod_poly_clear(aux2)
+        owned_evs.close()
+        for proof in owned_proofs:
+            proof.close()
+    keys.close()
 
-    return {
+    returnable = {
         "result": result,
         "election_count": election_count,
         "ballots": election_ballots
-    }
\ No newline at end of file
+    }
+    if instance.layout:
+        returnable["tally"] = election_tally
+    return returnable
\ No newline at end of file
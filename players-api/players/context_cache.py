@@ -0,0 +1,74 @@
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from lbvs_lib.election_context import ElectionContext
+
+# The keys of an election never change after setup, so their deserialized and precomputed forms are kept
+# per election and player instead of being rebuilt on every request
+MAX_CONTEXTS = 32
+
+
+class _Entry:
+    def __init__(self, context: ElectionContext):
+        self.context = context
+        # the requests using the context
+        self.users = 0
+        self.evicted = False
+
+
+_contexts: OrderedDict[tuple, _Entry] = OrderedDict()
+_lock = threading.Lock()
+
+
+def _release(entry: _Entry) -> bool:
+    """
+    Drops a user of an entry, under _lock. Returns whether the context must be cleared
+    """
+    entry.users -= 1
+    return entry.evicted and entry.users == 0
+
+
+@contextmanager
+def get_context(election_uuid: str, player: str, pk=None, ck=None, dk=None):
+    """
+    The cached ElectionContext of an election, built from the serialized keys on first use, for the duration of a
+    with block. A context evicted from the cache is cleared once the last request using it is done
+    :param election_uuid: the election
+    :param player: the player asking for it, as every player holds different keys
+    """
+    key = (election_uuid, player)
+    with _lock:
+        entry = _contexts.get(key)
+        if entry is not None:
+            entry.users += 1
+            _contexts.move_to_end(key)
+
+    if entry is None:
+        context = ElectionContext.deserialize(pk=pk, ck=ck, dk=dk)
+        evicted = []
+        with _lock:
+            entry = _contexts.get(key)
+            if entry is None:
+                entry = _contexts[key] = _Entry(context)
+                context = None
+            entry.users += 1
+            _contexts.move_to_end(key)
+            while len(_contexts) > MAX_CONTEXTS:
+                _, oldest = _contexts.popitem(last=False)
+                oldest.evicted = True
+                if oldest.users == 0:
+                    evicted.append(oldest.context)
+        if context is not None:
+            # another request built the context meanwhile
+            context.clear()
+        for old in evicted:
+            old.clear()
+
+    try:
+        yield entry.context
+    finally:
+        with _lock:
+            clear = _release(entry)
+        if clear:
+            entry.context.clear()
@@ -1,8 +1,12 @@
+import base64
+
 from app import app
 from classes import *
 from lbvs_lib.compile import shared_library, MODP
 from lbvs_lib.classes import NMOD_POLY_TYPE
+from lbvs_lib.ballot_layout import BallotLayout
 from lbvs_lib.return_code_table import ReturnCodeTable
+from lbvs_lib.compact_table import CompactTable
 
 from db.engine import SessionDep
 from db.phone import PhoneInstance
@@ -22,9 +26,24 @@ def expected_return_codes(tbcast: TBCastVote, session: SessionDep):
 
     phone_instance: PhoneInstance = session.query(PhoneInstance).filter(PhoneInstance.voter_uuid == voter_uuid).first()
 
+    if phone_instance.rct and all(isinstance(table, str) for table in phone_instance.rct):
+        # compact tables, read at the rank of the answers
+        if phone_instance.layout:
+            codes = [CompactTable.lookup_encoded(phone_instance.rct[0], votes)]
+        else:
+            codes = [CompactTable.lookup_encoded(phone_instance.rct[i], [question]) for i, question in enumerate(votes)]
+        phone_instance.expected_return_codes = [base64.b64encode(code).decode('utf-8') for code in codes]
+        session.add(phone_instance)
+        session.commit()
+        return
+
     poly = NMOD_POLY_TYPE()
     shared_library.nmod_poly_init(poly, MODP)
     return_codes = []
+    if phone_instance.layout:
+        # a single ballot covers every question
+        BallotLayout(phone_instance.layout).pack(votes, poly)
+        votes = [[]]
     for i, question in enumerate(votes):
         for choice in question:
             shared_library.nmod_poly_set_coeff_ui(poly, choice, 1)
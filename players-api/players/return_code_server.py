@@ -2,11 +2,17 @@ import requests
 from sqlalchemy import func
 
 from app import app
-from lbvs_lib.serializers2 import deserialize_ballot_proof, deserialize_encrypted_ballot, deserialize_pk, deserialize_vvk, deserialize_ck
-from lbvs_lib.scheme_algorithms import code
+from lbvs_lib.serializers2 import deserialize_ballot_proof, deserialize_encrypted_ballot, deserialize_vvk
+from lbvs_lib.scheme_algorithms import code_batch
 from lbvs_lib.return_code_table import ReturnCodeTable
+from lbvs_lib.prf import new_engine, DEFAULT_ENGINE
+from lbvs_lib.compact_table import CompactTable
+from lbvs_lib.compile import shared_library
+from lbvs_lib.layouts import Sequence, ENCRYPTED_BALLOT, BALLOT_PROOF
+from lbvs_lib.owned import Owned
 
 from classes import *
+from players.context_cache import get_context
 
 import base64
 
@@ -19,9 +25,23 @@ from db.engine import SessionDep
 async def setup(setup_params: ReturnCodeSetup, session: SessionDep):
     key = ReturnCodeTable.new_key()
     b64key = ReturnCodeTable.encode_key(key)
+    # fails on an unknown engine
+    engine = new_engine(key, setup_params.prf_engine).name
+    tables = []
+    if setup_params.code_size:
+        assert setup_params.questions, "Compact return code tables need the questions of the ballot"
+        # the tables do not depend on the voter, they are computed once for the election
+        questions = [{'answers': range(question.answers), 'min': question.min, 'max': question.max}
+                     for question in setup_params.questions]
+        tables = [table.encode() for table in CompactTable.compute(key, questions,
+                                                                   packed=bool(setup_params.instance.layout),
+                                                                   code_size=setup_params.code_size, engine=engine)]
 
     instance = ReturnCodeServerInstance(ck=setup_params.ck.model_dump(mode='json'),
                                         prf_key=b64key,
+                                        prf_engine=engine,
+                                        code_size=setup_params.code_size,
+                                        compact_tables=tables,
                                         **setup_params.instance.model_dump(mode='json'))
     session.add(instance)
     session.commit()
@@ -29,7 +49,13 @@ async def setup(setup_params: ReturnCodeSetup, session: SessionDep):
 @app.get("/code/key")
 async def get_key(election_uuid, session: SessionDep) -> PrfKey:
     instance = get_instance(election_uuid, session)
-    return PrfKey(key=instance.prf_key)
+    return PrfKey(key=instance.prf_key, engine=instance.prf_engine or DEFAULT_ENGINE)
+
+@app.get("/code/compact_tables")
+async def compact_tables(election_uuid, session: SessionDep) -> CompactTables:
+    instance = get_instance(election_uuid, session)
+    assert instance.code_size, "The election does not use compact return code tables"
+    return CompactTables(tables=instance.compact_tables)
 
 @app.post("/code/register")
 async def register(voter: VoterRegistration, session: SessionDep):
@@ -40,25 +66,37 @@ async def register(voter: VoterRegistration, session: SessionDep):
     session.add(voter_data)
     session.commit()
 
+    instance = get_instance(voter.election_uuid, session)
+    if instance.code_size and voter.voter_phone_address:
+        # the phone gets the compact tables of the election, and expects codes of code_size bytes (see casting_phase)
+        requests.post(voter.voter_phone_address + "/phone/register",
+                      json=PhoneRegistration(voter_uuid=voter.voter_uuid, rct=instance.compact_tables,
+                                             layout=instance.layout or None).model_dump(mode='json'))
+
 
 @app.post("/code/casting")
 async def casting_phase(vote: Vote, session: SessionDep) -> VoteConfirmation:
     instance = get_instance(vote.election_uuid, session)
-    prf_key_bytes = base64.b64decode(instance.prf_key)
+    prf = new_engine(base64.b64decode(instance.prf_key), instance.prf_engine)
     voter_data: VoterPublicData = session.query(VoterPublicData).filter_by(voter_uuid=vote.voter_uuid).first()
-    pk = deserialize_pk(instance.pk)
-    ck = deserialize_ck(instance.ck)
-    vvk = deserialize_vvk(voter_data.vvk)
-
-    return_codes = []
-    for question in vote.questions:
-        ev = deserialize_encrypted_ballot(question.ev)
-        proof = deserialize_ballot_proof(question.proof)
-        precode, result = code(pk, ck, vvk, ev, proof)
-        return_code = ReturnCodeTable.nmod_prf(prf_key_bytes, precode, b64=True)
-        return_codes.append(return_code)
-
-    # clear keys
+    vvk = deserialize_vvk(voter_data.vvk, owned=True)
+    ballots = Owned([(deserialize_encrypted_ballot(question.ev), deserialize_ballot_proof(question.proof))
+                     for question in vote.questions], Sequence((ENCRYPTED_BALLOT, BALLOT_PROOF)))
+
+    items = [(vvk.value, ev, proof) for ev, proof in ballots.value]
+    with get_context(vote.election_uuid, "code", pk=instance.pk, ck=instance.ck) as context:
+        precodes = [precode for precode, result in code_batch(context, context, items)]
+    codes = ReturnCodeTable.nmod_prfs(prf, precodes)
+    if instance.code_size:
+        # the phones hold compact tables, whose codes are truncated
+        codes = [code[:instance.code_size] for code in codes]
+    return_codes = [base64.b64encode(code).decode('utf-8') for code in codes]
+    for precode in precodes:
+        shared_library.nmod_poly_clear(precode)
+
+    # the keys are cached with the election context, only the ballots are freed
+    ballots.close()
+    vvk.close()
     return send_to_voter(return_codes, voter_data, vote, session)
 
 
@@ -4,8 +4,11 @@ from lbvs_lib.scheme_algorithms import count
 from lbvs_lib.serializers2 import deserialize_encrypted_ballot, serialize_shuffle_proof, deserialize_pk, deserialize_dk, \
     recursive_serialize_nmod_poly
 from lbvs_lib.shuffle import Shuffle
+from lbvs_lib.layouts import Sequence, ENCRYPTED_BALLOT
+from lbvs_lib.owned import Owned
 
 from app import app
+from env import count_workers, count_shard_size
 from classes import *
 from db.engine import SessionDep
 from db.shuffle_server import ShuffleServerInstance
@@ -21,29 +24,45 @@ def setup(setup_params: ShuffleServerSetup, session: SessionDep):
 @app.post("/shuffler/counting")
 def counting_phase(ballot_list: EncryptedBallotList, session: SessionDep):
     instance: ShuffleServerInstance = session.query(ShuffleServerInstance).filter_by(election_uuid=ballot_list.election_uuid).first()
-    dk = deserialize_dk(instance.dk)
+    # freed by close, or when the handles are collected if counting fails
+    keys = deserialize_dk(instance.dk, owned=True)
+    dk = keys.value
     evs = ballot_list.ballots
     proofs = []
     votes = []
     for evs_per_question in evs:
-        dec_evs = []
-        for ev in evs_per_question:
-            dec_evs.append(deserialize_encrypted_ballot(ev))
+        ballots = Owned([deserialize_encrypted_ballot(ev) for ev in evs_per_question], Sequence(ENCRYPTED_BALLOT))
+        dec_evs = ballots.value
         n_votes = len(dec_evs)
-        votes_question, proof = count(dk, dec_evs)
+        if count_shard_size > 0:
+            # the votes of all shards are sent in shard order, the auditor splits them by proof length
+            shard_votes, shard_proofs = count(dk, dec_evs, workers=count_workers, shard_size=count_shard_size)
+            votes.append([])
+            proofs.append({"shards": []})
+            for votes_shard, proof in zip(shard_votes, shard_proofs):
+                shard_length = len(votes_shard)
+                votes[-1].extend(recursive_serialize_nmod_poly(votes_shard, [shard_length]))
+                proofs[-1]["shards"].append(serialize_shuffle_proof(proof))
+                Shuffle.proof_clear(shared_library, *proof, shard_length)
+                for i in range(shard_length):
+                    shared_library.nmod_poly_clear(votes_shard[i])
+            ballots.close()
+            continue
+
+        votes_question, proof = count(dk, dec_evs, workers=count_workers)
         votes.append(recursive_serialize_nmod_poly(votes_question, [n_votes]))
         proofs.append(serialize_shuffle_proof(proof))
 
         y, _y, t, _t, u, d, s, rho = proof
 
         Shuffle.proof_clear(shared_library, y, _y, t, _t, u, d, s, rho, n_votes)
-        # clear ballots
-        # TODO
-        for i in range(len(dec_evs)):
+        for i in range(n_votes):
             shared_library.nmod_poly_clear(votes_question[i])
+        # clear ballots
+        ballots.close()
 
-        # clear keys
-        # TODO
+    # clear keys
+    keys.close()
 
     # send to the auditors
     proofs_and_ballots = {
@@ -6,11 +6,15 @@ import requests
 
 from db.engine import SessionDep
 from db.voter import VoterInstance
+from players.context_cache import get_context
 
-from lbvs_lib.serializers2 import deserialize_vck, deserialize_pk, serialize_encrypted_ballot, serialize_ballot_proof
+from env import centered_proofs
+from lbvs_lib.serializers2 import deserialize_vck, serialize_encrypted_ballot, serialize_ballot_proof, \
+    BALLOT_PROOF_CENTERED
 from lbvs_lib.scheme_algorithms import cast as libcast
 from lbvs_lib.compile import shared_library, MODP
 from lbvs_lib.classes import NMOD_POLY_TYPE
+from lbvs_lib.ballot_layout import BallotLayout
 from lbvs_lib.cleanup import clear_ev_and_proof, clear_voter
 
 
@@ -47,22 +51,26 @@ def register(registration: VoterToRegister, session: SessionDep):
 
 def cast(instance: VoterInstance, votes: list[list[int]]) -> Vote:
     vck = deserialize_vck(instance.vck)
-    pk = deserialize_pk(instance.pk)
 
     returnable = Vote(voter_uuid=instance.voter_uuid, election_uuid=instance.election_uuid, questions=[])
 
     poly = NMOD_POLY_TYPE()
     shared_library.nmod_poly_init(poly, MODP)
-    for vote in votes:
-        for choice in vote:
-            shared_library.nmod_poly_set_coeff_ui(poly, choice, 1)
-        ev, pv = libcast(pk, vck, poly)
-        ev_ser = serialize_encrypted_ballot(ev)
-        pv_ser = serialize_ballot_proof(pv)
-        clear_ev_and_proof(ev, pv)
-        returnable.questions.append(Question(ev=ev_ser, proof=pv_ser))
-
-        shared_library.nmod_poly_zero(poly)
+    if instance.layout:
+        # a single ballot covers every question
+        BallotLayout(instance.layout).pack(votes, poly)
+        votes = [[]]
+    with get_context(instance.election_uuid, "voter", pk=instance.pk) as context:
+        for vote in votes:
+            for choice in vote:
+                shared_library.nmod_poly_set_coeff_ui(poly, choice, 1)
+            ev, pv = libcast(context, vck, poly)
+            ev_ser = serialize_encrypted_ballot(ev)
+            pv_ser = serialize_ballot_proof(pv, BALLOT_PROOF_CENTERED if centered_proofs else ())
+            clear_ev_and_proof(ev, pv)
+            returnable.questions.append(Question(ev=ev_ser, proof=pv_ser))
+
+            shared_library.nmod_poly_zero(poly)
 
     shared_library.nmod_poly_clear(poly)
     clear_voter((None, vck, None))